@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2023 BlueRock Security, Inc.
+
+import argparse
+import random
+import time
+from coq_lint import COQ_LINTERS, GENERIC_COQ_LINTER_COMMON
+from coq_sentence_parser import SentenceParser, SourceBuffer
+from linter import RuntimeError_PartialLint
+from util import *
+
+DESCRIPTION = f"""
+Generate a seeded, synthetic corpus of [.v] files (for measuring how [SentenceParser] and [CoqLinter]
+scale); optionally report the parsing/linting throughput over the corpus and/or over a single file
+of increasing size.
+"""
+
+# NOTE: the generated files are lexically valid and properly nested (so the linter never raises a
+# [RuntimeError]), but they are not meant to be accepted by [coqc].
+
+IDENTS  = ['foo', 'bar', 'baz', 'qux', 'ptr', 'val', 'mem', 'heap', 'frame', 'spec', 'wp', 'inv']
+TERMS   = ['x', 'y', 'z', 'n', '(S n)', '(f x)', '(g y z)', 'Vint 0', 'nullptr', '[]', '(x :: xs)']
+TACTICS = [
+    'intros', 'simpl', 'auto', 'eauto', 'lia', 'done', 'reflexivity', 'split', 'constructor',
+    'apply', 'rewrite', 'destruct', 'induction', 'iIntros', 'iFrame', 'iApply', 'iSplit', 'wp_call',
+]
+BULLETS = ['-', '+', '*', '--', '++']
+
+# v-- [--mix] weights of the blocks which [mk_block] can produce
+DEFAULT_MIX = 'lemma=8,definition=4,section=2,module=1,module_type=1,nes=1,program=1,string=1'
+BLOCK_KINDS = ['lemma', 'definition', 'section', 'module', 'module_type', 'nes', 'program', 'string']
+
+def mk_ident(rng, prefix=''):
+    return f'{prefix}{rng.choice(IDENTS)}_{rng.randrange(1 << 20)}'
+
+# A comment which contains (up to [depth]) nested comments, and strings which themselves contain
+# comment delimiters.
+def mk_comment(rng, args, depth=None):
+    if depth is None:
+        depth = rng.randint(1, max(1, args.max_comment_depth))
+
+    words = [rng.choice(IDENTS + TACTICS) for _ in range(rng.randint(1, 8))]
+    if rng.random() < args.string_density:
+        words.insert(rng.randrange(len(words) + 1), '"(* not a nested comment *)"')
+    if 1 < depth:
+        words.insert(rng.randrange(len(words) + 1), mk_comment(rng, args, depth - 1))
+    return f'(* {" ".join(words)} *)'
+
+# A term of roughly [args.sentence_words] words which is (occasionally) split across lines.
+def mk_term(rng, args, indent):
+    words = []
+    for _ in range(max(1, int(rng.expovariate(1 / max(1, args.sentence_words))))):
+        words.append(rng.choice(TERMS + IDENTS))
+        if rng.random() < 0.1:
+            words.append('\n' + indent + '  ')
+        elif rng.random() < 0.2:
+            words.append(rng.choice(['->', '/\\', '\\/', '=', '|--', '**']))
+    return ' '.join(words).replace(' \n', '\n')
+
+# Emit [sentence] on its own line, surrounded by comments (cf. [args.comment_density]).
+def emit(rng, args, out, indent, sentence):
+    if rng.random() < args.comment_density:
+        out.append(f'{indent}{mk_comment(rng, args)}\n')
+    if rng.random() < args.comment_density:
+        out.append(f'{indent}{sentence} {mk_comment(rng, args)}\n')
+    else:
+        out.append(f'{indent}{sentence}\n')
+
+def mk_proof_body(rng, args, out, indent):
+    for _ in range(rng.randint(1, 2 * args.proof_length)):
+        tactic = f'{rng.choice(TACTICS)} {mk_term(rng, args, indent)}.'
+        if rng.random() < 0.2:
+            tactic = f'{rng.choice(BULLETS)} {tactic}'
+        elif rng.random() < 0.05:
+            tactic = f'{{ {tactic} }}'
+        emit(rng, args, out, indent, tactic)
+
+def mk_lemma(rng, args, out, indent):
+    emit(rng, args, out, indent, f'Lemma {mk_ident(rng)} : {mk_term(rng, args, indent)}.')
+    emit(rng, args, out, indent, rng.choice(['Proof.', 'Proof using.', 'Proof using Type*.']))
+    mk_proof_body(rng, args, out, indent + '  ')
+    emit(rng, args, out, indent, rng.choice(['Qed.', 'Qed.', 'Defined.', 'Admitted.']))
+
+def mk_definition(rng, args, out, indent):
+    emit(rng, args, out, indent, rng.choice([
+        f'Definition {mk_ident(rng)} := {mk_term(rng, args, indent)}.',
+        f'#[local] Definition {mk_ident(rng)} : nat := {mk_term(rng, args, indent)}.',
+        f'Instance {mk_ident(rng)} : Proper (eq ==> eq) {mk_ident(rng)} := _.',
+        f'#[local] Hint Resolve {mk_ident(rng)} : core.',
+        f'Notation "\'{rng.choice(IDENTS)}\' x" := (S x) (at level 10).',
+    ]))
+
+# A [#[program]] definition followed by a chain of [Next Obligation]s.
+def mk_program(rng, args, out, indent):
+    emit(rng, args, out, indent, f'#[program] Definition {mk_ident(rng)} : nat := _.')
+    for _ in range(rng.randint(1, args.obligations)):
+        emit(rng, args, out, indent, 'Next Obligation.')
+        mk_proof_body(rng, args, out, indent + '  ')
+        emit(rng, args, out, indent, 'Qed.')
+
+def mk_string(rng, args, out, indent):
+    emit(rng, args, out, indent, rng.choice([
+        f'Definition {mk_ident(rng)} := "(* not a comment *)".',
+        f'Definition {mk_ident(rng)} := "a ""quoted"" *) string".',
+        f'Definition {mk_ident(rng)} := "{mk_term(rng, args, indent)}. (* .".',
+    ]))
+
+# A nested block ([Section]/[Module]/[Module Type]/[NES]) containing further blocks.
+def mk_nested(rng, args, out, indent, kind, depth):
+    nm = mk_ident(rng)
+    emit(rng, args, out, indent, {
+        'section':     f'Section {nm}.',
+        'module':      f'Module {nm}.',
+        'module_type': f'Module Type {nm}.',
+        'nes':         f'NES.Begin {nm}.',
+    }[kind])
+    for _ in range(rng.randint(1, 6)):
+        mk_block(rng, args, out, indent + '  ', depth + 1)
+    emit(rng, args, out, indent, f'NES.End {nm}.' if kind == 'nes' else f'End {nm}.')
+
+def mk_block(rng, args, out, indent, depth=0):
+    weights = [args.mix[kind] for kind in BLOCK_KINDS]
+    kind = rng.choices(BLOCK_KINDS, weights)[0]
+    # v-- NOTE: bound the nesting depth; deeply nested blocks fall back to lemmas
+    if kind in ['section', 'module', 'module_type', 'nes'] and args.max_nesting_depth <= depth:
+        kind = 'lemma'
+
+    if   kind == 'lemma':      mk_lemma(rng, args, out, indent)
+    elif kind == 'definition': mk_definition(rng, args, out, indent)
+    elif kind == 'program':    mk_program(rng, args, out, indent)
+    elif kind == 'string':     mk_string(rng, args, out, indent)
+    else:                      mk_nested(rng, args, out, indent, kind, depth)
+
+# The contents of the [i]th file of the corpus, of (at least) [size] bytes.
+#
+# NOTE: each file has its own [random.Random] instance so that the [i]th file only depends on
+# [args.seed] (and not on [args.files]).
+def mk_file(args, i, size):
+    rng = random.Random(f'{args.seed}-{i}')
+    out = [
+        '(*\n * Copyright (C) BlueRock Security, Inc. 2024\n *)\n',
+        'Require Import bedrock.lang.cpp.\n',
+        '\n',
+    ]
+    n_bytes = sum(map(len, out))
+    while n_bytes < size:
+        block = []
+        mk_block(rng, args, block, '')
+        block.append('\n')
+        out.extend(block)
+        n_bytes += sum(len(line.encode('UTF-8')) for line in block)
+    return ''.join(out)
+
+def parse_mix(mix):
+    weights = {kind: 0 for kind in BLOCK_KINDS}
+    for entry in mix.split(','):
+        kind, _, weight = entry.partition('=')
+        if kind not in weights:
+            raise argparse.ArgumentTypeError(f'unknown block kind [{kind}]; should be one of {", ".join(BLOCK_KINDS)}')
+        weights[kind] = float(weight)
+    if not any(weights.values()):
+        raise argparse.ArgumentTypeError('at least one block kind needs a positive weight')
+    return weights
+
+# Time [SentenceParser] and [CoqLinter] over [contents]; returns [(parse seconds, lint seconds)].
+def time_contents(contents, linter):
+    data = contents.encode('UTF-8')
+
+    start = time.perf_counter()
+    for _ in SentenceParser(SourceBuffer(data, '<generated>')).spans(): pass
+    parse_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        linter.lint(SourceBuffer(data, '<generated>'))
+    except RuntimeError_PartialLint as e:
+        print(format_ansi_msg('Warning:', ANSI_RED), f'the generated corpus could not be linted: {e}')
+    lint_time = time.perf_counter() - start
+
+    return parse_time, lint_time
+
+def fmt_throughput(n_bytes, seconds):
+    return f'{n_bytes / (1 << 20) / max(seconds, 1e-9):8.2f} MB/s'
+
+# NOTE: [args] comes from [args = parser.parse_args()] within [main]
+def main_bench(args, linter, corpus):
+    n_bytes = parse_time = lint_time = 0
+    for contents in corpus:
+        file_parse_time, file_lint_time = time_contents(contents, linter)
+        n_bytes += len(contents.encode('UTF-8'))
+        parse_time += file_parse_time
+        lint_time += file_lint_time
+
+    print(f'{format_ansi_msg("Corpus:", ANSI_BOLD)} {len(corpus)} files, {n_bytes / (1 << 20):.2f} MB')
+    print(f'- parse: {fmt_throughput(n_bytes, parse_time)} ({parse_time:.2f}s)')
+    print(f'- lint:  {fmt_throughput(n_bytes, lint_time)} ({lint_time:.2f}s)')
+
+# Time a single file of [args.file_kb * 2^k]KB for each [k < args.scaling], and flag superlinear
+# behaviour: i.e. a throughput which drops below [1 / args.max_slowdown] of the smallest file's.
+#
+# NOTE: [args] comes from [args = parser.parse_args()] within [main]
+def main_scaling(args, linter):
+    baseline = None
+    superlinear = False
+    print(format_ansi_msg('Scaling:', ANSI_BOLD))
+    for k in range(args.scaling):
+        contents = mk_file(args, 0, (args.file_kb << k) * 1024)
+        n_bytes = len(contents.encode('UTF-8'))
+        parse_time, lint_time = time_contents(contents, linter)
+
+        throughputs = (n_bytes / max(parse_time, 1e-9), n_bytes / max(lint_time, 1e-9))
+        if baseline is None:
+            baseline = throughputs
+        slow = [
+            nm for nm, throughput, baseline_throughput in zip(['parse', 'lint'], throughputs, baseline)
+            if throughput * args.max_slowdown < baseline_throughput
+        ]
+        superlinear = superlinear or bool(slow)
+
+        print(' '.join(filter(None, [
+            f'- {n_bytes / 1024:10.0f} KB:',
+            f'parse {fmt_throughput(n_bytes, parse_time)},',
+            f'lint {fmt_throughput(n_bytes, lint_time)}',
+            format_ansi_msg(f'(superlinear: {", ".join(slow)})', ANSI_RED) if slow else None,
+        ])))
+    return 1 if superlinear else 0
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog=f'{Path(__file__).name}',
+        description=DESCRIPTION,
+    )
+    parser.add_argument(
+        'output_dir',
+        metavar='OUTPUT_DIR',
+        type=Path,
+        nargs='?',
+        help='write the corpus to OUTPUT_DIR/gen_<i>.v',
+    )
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the corpus')
+    parser.add_argument('--files', metavar='N', type=int, default=10, help='number of files')
+    parser.add_argument('--file-kb', metavar='KB', type=int, default=64, dest='file_kb', help='(minimum) size of each file')
+    parser.add_argument(
+        '--comment-density',
+        metavar='P',
+        type=float,
+        default=0.1,
+        dest='comment_density',
+        help='probability of a comment before (and, independently, after) each sentence',
+    )
+    parser.add_argument(
+        '--max-comment-depth',
+        metavar='D',
+        type=int,
+        default=3,
+        dest='max_comment_depth',
+        help='maximum nesting depth of comments',
+    )
+    parser.add_argument(
+        '--string-density',
+        metavar='P',
+        type=float,
+        default=0.2,
+        dest='string_density',
+        help='probability of a comment containing a string with comment delimiters',
+    )
+    parser.add_argument(
+        '--sentence-words',
+        metavar='W',
+        type=int,
+        default=6,
+        dest='sentence_words',
+        help='mean number of words in a term (sentence lengths are exponentially distributed)',
+    )
+    parser.add_argument(
+        '--proof-length',
+        metavar='L',
+        type=int,
+        default=10,
+        dest='proof_length',
+        help='mean number of tactics in a proof',
+    )
+    parser.add_argument(
+        '--obligations',
+        metavar='N',
+        type=int,
+        default=3,
+        help='maximum length of a [Next Obligation] chain',
+    )
+    parser.add_argument(
+        '--max-nesting-depth',
+        metavar='D',
+        type=int,
+        default=3,
+        dest='max_nesting_depth',
+        help='maximum nesting depth of [Section]s/[Module]s/[Module Type]s/[NES] blocks',
+    )
+    parser.add_argument(
+        '--mix',
+        type=parse_mix,
+        default=parse_mix(DEFAULT_MIX),
+        help=f'comma-separated weights of the generated blocks (default: {DEFAULT_MIX})',
+    )
+    parser.add_argument(
+        '--bench',
+        action='store_true',
+        help='report the parsing/linting throughput over the corpus',
+    )
+    parser.add_argument(
+        '--scaling',
+        metavar='STEPS',
+        type=int,
+        default=0,
+        help='report the throughput for a single file of FILE_KB * 2^k KB (for k < STEPS)',
+    )
+    parser.add_argument(
+        '--max-slowdown',
+        metavar='X',
+        type=float,
+        default=2.0,
+        dest='max_slowdown',
+        help='fail [--scaling] if the throughput drops by more than a factor of X',
+    )
+    parser.add_argument(
+        '--category',
+        choices=COQ_PROOF_ARTIFACT_CATEGORIES,
+        help='benchmark using the policy for this proof-artifact category (default: the common policy)',
+    )
+
+    args = parser.parse_args()
+    linter = COQ_LINTERS[args.category] if args.category else GENERIC_COQ_LINTER_COMMON
+
+    if not (args.output_dir or args.bench or args.scaling):
+        parser.print_help()
+        return 0
+
+    corpus = []
+    if args.output_dir or args.bench:
+        corpus = [mk_file(args, i, args.file_kb * 1024) for i in range(args.files)]
+
+    if args.output_dir:
+        args.output_dir.mkdir(parents=True, exist_ok=True)
+        for i, contents in enumerate(corpus):
+            with open(args.output_dir / f'gen_{i:04d}.v', 'w', encoding='UTF-8') as f:
+                f.write(contents)
+
+    if args.bench:
+        main_bench(args, linter, corpus)
+
+    if args.scaling:
+        return main_scaling(args, linter)
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
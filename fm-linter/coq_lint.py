@@ -3,8 +3,19 @@
 # Copyright (c) 2023 BlueRock Security, Inc.
 
 import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from coq_lint_cache import ResultCache
+from coq_policy import MATCHER_STATS
+from coq_sentence_cache import SpanCache
+from coq_sentence_parser import SourceBuffer
 from linter_util import *
-from linter import CoqLinter, RuntimeError_PartialLint
+from linter import CoqLinter, PARALLEL_LINT_THRESHOLD, RuntimeError_PartialLint, SENTENCE_TIMEOUT
+from linter import VERDICT_CACHE_ENTRIES, VerdictCache
 from util import *
 from os.path import abspath, basename, exists, isfile, isdir, join
 
@@ -41,6 +52,8 @@ GLOBAL_ALLOW_DENY_POLICY_COMMON = mk_allow_deny_policy(
         (SentenceMatchers.EXPORT, err_fmt_prohibited_use_of_from),
     ],
 )
+# NOTE: a [CoqLinter] only holds its (immutable) [CompiledPolicy] and lints each file in a fresh
+# [LintSession], so these linters are safely shared by every file.
 GENERIC_COQ_LINTER_NO_RESTRICTIONS = CoqLinter(mk_policy(GLOBAL_ALLOW_DENY_POLICY_NO_RESTRICTIONS))
 GENERIC_COQ_LINTER_COMMON = CoqLinter(mk_policy(GLOBAL_ALLOW_DENY_POLICY_COMMON))
 COQ_LINTERS = {
@@ -81,21 +94,74 @@ if set(COQ_PROOF_ARTIFACT_CATEGORIES) != COQ_LINTERS.keys():
 
 IMPORT_EXPORT_PASS_CATEGORY = '<IMPORT-EXPORT-PASS>'
 # NOTE: we already test that the file exists before we attempt to open it
-def lint_coq_file(validated_coq_filepath, category, fail_on_runtime_error=False):
+#
+# NOTE: [span_cache] is an optional [coq_sentence_cache.SpanCache] which the linters use to avoid
+# re-parsing unchanged files.
+#
+# NOTE: very large files are split across [intra_file_jobs] worker processes, and sentences which
+# take longer than [sentence_timeout] seconds to match are reported and skipped (cf. [CoqLinter.run]).
+#
+# NOTE: [verdict_cache] is an optional [linter.VerdictCache] which the linters use to reuse the
+# classification/verdicts of sentences already seen in other files.
+#
+# NOTE: [result_cache] is an optional [coq_lint_cache.ResultCache] (or [MemoryResultCache]) which
+# holds the errors of files which were already linted (with the same category and policy).
+#
+# NOTE: [buffers] optionally maps (resolved) filepaths to texts which are linted in place of the
+# contents of those files (i.e. the unsaved buffers of an editor, cf. [coq_lint_daemon]).
+def lint_coq_file(
+        validated_coq_filepath,
+        category,
+        fail_on_runtime_error=False,
+        span_cache=None,
+        intra_file_jobs=1,
+        sentence_timeout=SENTENCE_TIMEOUT,
+        verdict_cache=None,
+        result_cache=None,
+        buffers=None,
+):
+    def run(linter, f):
+        if buffers and str(validated_coq_filepath) in buffers:
+            f = SourceBuffer.from_text(buffers[str(validated_coq_filepath)], str(validated_coq_filepath))
+        if result_cache and not isinstance(f, SourceBuffer):
+            # v-- NOTE: the file is read once, both for its key and to be linted
+            with SourceBuffer.from_file(f) as buffer:
+                return run(linter, buffer)
+
+        key = None
+        if result_cache:
+            key = ResultCache.key_for(f, category, linter.compiled_policy())
+            errors = result_cache.get(key)
+            if errors is not None:
+                return [error._replace(category=category) for error in errors]
+
+        errors = linter.run(
+            f,
+            span_cache=span_cache,
+            jobs=intra_file_jobs,
+            sentence_timeout=sentence_timeout,
+            verdict_cache=verdict_cache,
+        )
+        if key: result_cache.put(key, errors)
+        return [error._replace(category=category) for error in errors]
+
     # v-- NOTE: special-case to support "common" linting which doesn't infer proof artifact category
     if category == IMPORT_EXPORT_PASS_CATEGORY:
         with open(validated_coq_filepath, 'r', encoding='UTF-8') as f:
             # v-- NOTE: simply warn if a file can't be processed
             if fail_on_runtime_error:
-                return GENERIC_COQ_LINTER_COMMON.run(f)
+                return run(GENERIC_COQ_LINTER_COMMON, f)
             else:
                 try:
-                    return GENERIC_COQ_LINTER_COMMON.run(f)
+                    return run(GENERIC_COQ_LINTER_COMMON, f)
                 except RuntimeError_PartialLint as e:
-                    err_fmt = err_fmt_likely_nested_comment if e.parsing_issue else err_fmt_unknown
-                    return e.partial_linting_errors + [(err_fmt(str(e)), -1, -1)]
+                    err_fmt = err_fmt_parsing_issue if e.parsing_issue else err_fmt_unknown
+                    return [
+                        error._replace(category=category)
+                        for error in e.partial_linting_errors + [LintError(err_fmt, -1, -1, str(e))]
+                    ]
                 except RuntimeError as e:
-                    return [(err_fmt_unknown(str(e)), -1, -1)]
+                    return [LintError(err_fmt_unknown, -1, -1, str(e), category=category)]
 
     # NOTE: for now we lint every file (and use a trivial allow-anything policy for uncategorized files).
     # In the future we could log the uncategorized files so that we can determine a more specific policy
@@ -104,7 +170,7 @@ def lint_coq_file(validated_coq_filepath, category, fail_on_runtime_error=False)
     # NOTE: '<UNRECOGNIZED>' should match the sentinel used by [util.py#enumerage_coq_file_hierarchy]
     if category == '<UNRECOGNIZED>':
         with open(validated_coq_filepath, 'r', encoding='UTF-8') as f:
-            return GENERIC_COQ_LINTER_NO_RESTRICTIONS.run(f)
+            return run(GENERIC_COQ_LINTER_NO_RESTRICTIONS, f)
 
     if category not in COQ_PROOF_ARTIFACT_CATEGORIES:
         msg = ' '.join([
@@ -114,32 +180,190 @@ def lint_coq_file(validated_coq_filepath, category, fail_on_runtime_error=False)
         raise RuntimeError(msg)
 
     with open(validated_coq_filepath, 'r', encoding='UTF-8') as f:
-        return COQ_LINTERS[category].run(f)
+        return run(COQ_LINTERS[category], f)
+
+# v-- the options of the [lint_coq_files] whose worker processes run [_lint_coq_file_job] (set
+#     before the workers are [fork]ed)
+_lint_coq_files_options = None
+
+# Lint [job] - an [(index, filepath, category)] - within a worker process of [lint_coq_files].
+# Returns the index together with the errors (or the [RuntimeError] raised instead), the records of
+# [MATCHER_STATS] (cf. [MatcherStats.take]) and the change in the [stats] of the worker's copies of
+# the [VerdictCache] and of the [ResultCache] (i.e. its [(hits, misses)]).
+def _lint_coq_file_job(job):
+    index, filepath, category = job
+    fail_on_runtime_error, span_cache, sentence_timeout, verdict_cache, result_cache, buffers = _lint_coq_files_options
+
+    verdict_stats = verdict_cache.stats() if verdict_cache else None
+    result_stats = (result_cache.hits, result_cache.misses) if result_cache else None
+    try:
+        result = lint_coq_file(
+            filepath,
+            category,
+            fail_on_runtime_error,
+            span_cache=span_cache,
+            sentence_timeout=sentence_timeout,
+            verdict_cache=verdict_cache,
+            result_cache=result_cache,
+            buffers=buffers,
+        )
+    except RuntimeError as e:
+        result = e
+    if verdict_cache:
+        verdict_stats = tuple(after - before for before, after in zip(verdict_stats, verdict_cache.stats()))
+    if result_cache:
+        result_stats = (result_cache.hits - result_stats[0], result_cache.misses - result_stats[1])
+    return index, result, MATCHER_STATS.take(), verdict_stats, result_stats
+
+# Lint the [(filepath, category)]s of [targets] - cf. [lint_coq_file] - using [jobs] worker
+# processes, yielding [(index in targets, errors)] as soon as each file has been linted; a file
+# which raises a [RuntimeError] yields it in place of its errors (cf. [lint_coq_files]).
+#
+# NOTES:
+# - the files are dispatched largest first, so that no large file is left to finish long after
+#   all of the others; the files are yielded in the order in which they finish (which is the order
+#   of [targets] if they are linted sequentially)
+# - the workers inherit the (compiled) [COQ_LINTERS] - and the caches - by [fork]ing, so every
+#   policy is compiled once; where [fork] is unavailable the files are linted sequentially
+# - a worker process can't split a file across further processes, so [intra_file_jobs] only
+#   applies when the files are linted sequentially
+def iter_lint_coq_files(
+        targets,
+        fail_on_runtime_error=False,
+        jobs=1,
+        span_cache=None,
+        intra_file_jobs=1,
+        sentence_timeout=SENTENCE_TIMEOUT,
+        verdict_cache=None,
+        result_cache=None,
+        buffers=None,
+):
+    global _lint_coq_files_options
+
+    if jobs <= 1 or len(targets) <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        for index, (filepath, category) in enumerate(targets):
+            try:
+                result = lint_coq_file(
+                    filepath,
+                    category,
+                    fail_on_runtime_error,
+                    span_cache=span_cache,
+                    intra_file_jobs=intra_file_jobs,
+                    sentence_timeout=sentence_timeout,
+                    verdict_cache=verdict_cache,
+                    result_cache=result_cache,
+                    buffers=buffers,
+                )
+            except RuntimeError as e:
+                result = e
+            yield index, result
+        return
+
+    def size_of(job):
+        try:
+            return os.path.getsize(job[1])
+        except OSError:
+            return 0
+    lint_jobs = sorted(
+        ((index, filepath, category) for index, (filepath, category) in enumerate(targets)),
+        key=size_of,
+        reverse=True,
+    )
+
+    _lint_coq_files_options = (fail_on_runtime_error, span_cache, sentence_timeout, verdict_cache, result_cache, buffers)
+    try:
+        with multiprocessing.get_context('fork').Pool(
+                min(jobs, len(targets)),
+                initializer=MATCHER_STATS.enter_worker,
+        ) as pool:
+            for index, result, matcher_records, verdict_stats, result_stats in pool.imap_unordered(
+                    _lint_coq_file_job,
+                    lint_jobs,
+            ):
+                MATCHER_STATS.merge(matcher_records)
+                if verdict_stats: verdict_cache.merge_stats(*verdict_stats)
+                if result_stats:
+                    result_cache.hits += result_stats[0]
+                    result_cache.misses += result_stats[1]
+                yield index, result
+    finally:
+        _lint_coq_files_options = None
+
+# Lint [targets] as [iter_lint_coq_files] does and return their errors in the order of [targets].
+#
+# NOTE: a [RuntimeError] is re-raised once every file has been linted, and only if no earlier file
+# (in the order of [targets]) raised one, so the outcome doesn't depend on [jobs].
+def lint_coq_files(targets, fail_on_runtime_error=False, **kwargs):
+    results = [None] * len(targets)
+    for index, result in iter_lint_coq_files(targets, fail_on_runtime_error, **kwargs):
+        results[index] = result
+
+    for result in results:
+        if isinstance(result, RuntimeError): raise result
+    return results
 
 COQ_LINT_DISALLOWED_TARGET = 'disallowed_target'
 COQ_LINT_CODE_PROOF        = 'code_proof'
-def lint_proof_dir(validated_proof_dir):
-    coq_file_hierarchy = enumerate_coq_file_hierarchy(validated_proof_dir)
+# v-- the [(filepath, category)]s to lint within [validated_proof_dir] (cf. [lint_coq_files]), sorted
+#     so that the order of the reports (and of the [--format jsonl] stream) doesn't depend on the
+#     (randomized) order of the sets of [enumerate_coq_file_hierarchy]
+def proof_dir_targets(validated_proof_dir):
+    return sorted(
+        (resolved_coq_filepath, category)
+        for category, resolved_coq_filepaths in enumerate_coq_file_hierarchy(validated_proof_dir).items()
+        for resolved_coq_filepath in resolved_coq_filepaths
+    )
+
+# v-- the errors of a proof directory given the errors of each of its [proof_dir_targets]
+def proof_dir_errors(targets, targets_errors):
     errors = {}
 
-    for category, resolved_coq_filepaths in coq_file_hierarchy.items():
-        for resolved_coq_filepath in resolved_coq_filepaths:
-            # NOTE: for now we lint every file (and use a trivial allow-anything policy for uncategorized files).
-            # In the future we could log the uncategorized files so that we can determine a more specific policy
-            # to apply.
-            #
-            # if not category in COQ_PROOF_ARTIFACT_CATEGORIES:
-            #     errors.setdefault(COQ_LINT_DISALLOWED_TARGET, []).append(resolved_coq_filepath)
-            # else:
-                coq_lint_errors = lint_coq_file(resolved_coq_filepath, category)
-                if coq_lint_errors:
-                    errors.setdefault(
-                        COQ_LINT_CODE_PROOF,
-                        {}
-                    )[resolved_coq_filepath] = coq_lint_errors
+    for (resolved_coq_filepath, category), coq_lint_errors in zip(targets, targets_errors):
+        # NOTE: for now we lint every file (and use a trivial allow-anything policy for uncategorized files).
+        # In the future we could log the uncategorized files so that we can determine a more specific policy
+        # to apply.
+        #
+        # if not category in COQ_PROOF_ARTIFACT_CATEGORIES:
+        #     errors.setdefault(COQ_LINT_DISALLOWED_TARGET, []).append(resolved_coq_filepath)
+        # else:
+            if coq_lint_errors:
+                errors.setdefault(
+                    COQ_LINT_CODE_PROOF,
+                    {}
+                )[resolved_coq_filepath] = coq_lint_errors
 
     return errors
 
+def lint_proof_dir(
+        validated_proof_dir,
+        jobs=1,
+        span_cache=None,
+        intra_file_jobs=1,
+        sentence_timeout=SENTENCE_TIMEOUT,
+        verdict_cache=None,
+        result_cache=None,
+        buffers=None,
+):
+    targets = proof_dir_targets(validated_proof_dir)
+    targets_errors = lint_coq_files(
+        targets,
+        jobs=jobs,
+        span_cache=span_cache,
+        intra_file_jobs=intra_file_jobs,
+        sentence_timeout=sentence_timeout,
+        verdict_cache=verdict_cache,
+        result_cache=result_cache,
+        buffers=buffers,
+    )
+    return proof_dir_errors(targets, targets_errors)
+
+# v-- [format_ansi_msg], but without ANSI escapes for [--use-ci-output-format]
+def format_report_msg(msg, ANSI_CODE, use_ci_output_format):
+    return msg if use_ci_output_format else format_ansi_msg(msg, ANSI_CODE)
+
+# NOTE: [errors] are [LintError]s, which are only formatted here (cf. [render_error]); the CI output
+# format uses neither ANSI escapes nor hyperlinks.
+#
 # TODO: port to [pathlib]
 def report_code_proof_errors(filename, errors, use_ci_output_format, nested=False):
     if nested:
@@ -154,13 +378,14 @@ def report_code_proof_errors(filename, errors, use_ci_output_format, nested=Fals
     absolute_filename = abspath(filename)
     print(f'{header_prefix} {format_file_hyperlink(absolute_filename, absolute_filename, no_hyperlinks=use_ci_output_format)}')
 
-    for (error, starting_lineno, ending_lineno) in errors:
+    for error in errors:
+        starting_lineno, ending_lineno = error.starting_lineno, error.ending_lineno
         if starting_lineno == ending_lineno:
             line_str = f'line {starting_lineno}'
         else:
             line_str = f'lines {starting_lineno}-{ending_lineno}'
         # v-- make sure the code listing is aligned properly
-        formatted_error = error.replace('\n', error_newline_replacement)
+        formatted_error = render_error(error, plain=use_ci_output_format).replace('\n', error_newline_replacement)
         formatted_line_str = format_file_hyperlink(
             absolute_filename,
             line_str,
@@ -176,7 +401,7 @@ def report_proof_dir_errors(resolved_dirpath, errors, use_ci_output_format):
 
     for disallowed_target in errors.get(COQ_LINT_DISALLOWED_TARGET, []):
         msg = ' '.join([
-            f'{format_ansi_msg(disallowed_target.relative_to(resolved_dirpath), ANSI_BOLD)}',
+            f'{format_report_msg(disallowed_target.relative_to(resolved_dirpath), ANSI_BOLD, use_ci_output_format)}',
             f'does not clearly fall into one of the supported proof categories:',
             ', '.join(COQ_LINTERS.keys()),
         ])
@@ -199,7 +424,7 @@ def report_errors(
         return False
 
     if missing_targets or non_coq_code_proof_files or non_dir_proof_dirs or non_proof_proof_dirs:
-        print(f'{format_ansi_msg("Argument Errors:", ANSI_BOLD)}')
+        print(f'{format_report_msg("Argument Errors:", ANSI_BOLD, use_ci_output_format)}')
 
         if missing_targets:
             print('- Missing Targets:')
@@ -222,7 +447,7 @@ def report_errors(
                 print(f'\t+ {non_proof_proof_dir}')
 
     if linting_results:
-        print(f'{format_ansi_msg("Linting Errors:", ANSI_BOLD)}')
+        print(f'{format_report_msg("Linting Errors:", ANSI_BOLD, use_ci_output_format)}')
         for resolved_path, errors in linting_results.items():
             if resolved_path.is_file():
                 report_code_proof_errors(resolved_path, errors, use_ci_output_format)
@@ -231,8 +456,155 @@ def report_errors(
 
     return True
 
+# Stream the errors of [targets] (cf. [iter_lint_coq_files]) to stdout as JSON Lines - the
+# records of the errors of each file as soon as it has been linted - followed by a summary record,
+# and return the exit code (as [report_errors] would); [lint_options] are passed on to
+# [iter_lint_coq_files] and [started] is the [time.perf_counter] at which the run started.
+#
+# Records (each with a ["type"]):
+# - ["argument_error"]: the [kind] of error (i.e. [missing_target]) and the [path]
+# - ["finding"]: the [path], [category], [rule] (cf. [error_rule_id]), [starting_lineno] and
+#   [ending_lineno] ([-1] if unknown), [message] (cf. [error_message]) and [sentence]
+# - ["summary"]: the number of [files] linted, of [files_with_findings] and of [findings] (in
+#   total and [by_rule]), the number of [argument_errors], the [status] and the [lint_seconds]
+#   (spent linting) and [elapsed_seconds] (since [started])
+#
+# NOTES:
+# - only the counts are kept, so memory doesn't grow with the number of findings
+# - with [--jobs] the files are reported in the order in which they finish
+# - a [RuntimeError] is re-raised (without a summary) as [lint_coq_files] would
+def report_jsonl(argument_errors, targets, lint_options, started):
+    def emit(record):
+        sys.stdout.write(json.dumps(record) + '\n')
+
+    for kind, path in argument_errors:
+        emit({'type': 'argument_error', 'kind': kind, 'path': str(path)})
+    sys.stdout.flush()
+
+    files = 0
+    files_with_findings = 0
+    by_rule = Counter()
+    # v-- [index -> RuntimeError] (cf. [lint_coq_files])
+    failures = {}
+    lint_started = time.perf_counter()
+    for index, errors in iter_lint_coq_files(targets, **lint_options):
+        if isinstance(errors, RuntimeError):
+            failures[index] = errors
+            continue
+
+        files += 1
+        if errors: files_with_findings += 1
+        path = str(targets[index][0])
+        for error in errors:
+            rule = error_rule_id(error)
+            by_rule[rule] += 1
+            emit({
+                'type':            'finding',
+                'path':            path,
+                'category':        error.category,
+                'rule':            rule,
+                'starting_lineno': error.starting_lineno,
+                'ending_lineno':   error.ending_lineno,
+                'message':         error_message(error),
+                'sentence':        error.sentence,
+            })
+        sys.stdout.flush()
+    lint_seconds = time.perf_counter() - lint_started
+
+    if failures: raise failures[min(failures)]
+
+    status = 1 if argument_errors or files_with_findings else 0
+    emit({
+        'type':                'summary',
+        'files':               files,
+        'files_with_findings': files_with_findings,
+        'findings':            sum(by_rule.values()),
+        'by_rule':             dict(by_rule),
+        'argument_errors':     len(argument_errors),
+        'status':              status,
+        'lint_seconds':        round(lint_seconds, 3),
+        'elapsed_seconds':     round(time.perf_counter() - started, 3),
+    })
+    sys.stdout.flush()
+    return status
+
 # NOTE: [args] comes from [args = parser.parse_args()] within [main]
-def main_infer_categorizations(args):
+def mk_span_cache(args):
+    if not args.sentence_cache_dir:
+        return None
+    return SpanCache(args.sentence_cache_dir, max_bytes=args.sentence_cache_max_mb << 20)
+
+# NOTE: [args] comes from [args = parser.parse_args()] within [main]
+def mk_result_cache(args):
+    if not args.lint_cache_dir:
+        return None
+    return ResultCache(args.lint_cache_dir, max_bytes=args.lint_cache_max_mb << 20)
+
+# NOTE: [args] comes from [args = parser.parse_args()] within [main]
+#
+# v-- the [.v] files within [resolved_targets] which changed since [--changed-since] (cf.
+#     [changed_coq_files]), or [None] if every file should be linted
+def mk_changed_coq_files(args, resolved_targets):
+    if not args.changed_since:
+        return None
+    try:
+        return changed_coq_files(args.changed_since, resolved_targets)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        exit(2)
+
+# NOTE: [args] comes from [args = parser.parse_args()] within [main]
+def mk_verdict_cache(args):
+    if not args.verdict_cache_entries:
+        return None
+    return VerdictCache(max_entries=args.verdict_cache_entries)
+
+# NOTE: [args] comes from [args = parser.parse_args()] within [main]
+def report_stats(args, verdict_cache, result_cache=None):
+    report_matcher_stats(args)
+    if not args.stats: return
+
+    print(format_ansi_msg('Statistics:', ANSI_BOLD), file=sys.stderr)
+    if verdict_cache:
+        hits, misses, entries = verdict_cache.stats()
+        lookups = hits + misses
+        hit_rate = 100 * hits / lookups if lookups else 0
+        print(f'- verdict cache: {hits}/{lookups} hits ({hit_rate:.1f}%), {entries} entries', file=sys.stderr)
+    else:
+        print('- verdict cache: disabled', file=sys.stderr)
+    if result_cache:
+        lookups = result_cache.hits + result_cache.misses
+        hit_rate = 100 * result_cache.hits / lookups if lookups else 0
+        print(f'- lint cache: {result_cache.hits}/{lookups} files reused ({hit_rate:.1f}%)', file=sys.stderr)
+    else:
+        print('- lint cache: disabled', file=sys.stderr)
+
+# NOTE: [args] comes from [args = parser.parse_args()] within [main]
+def report_matcher_stats(args):
+    if not args.matcher_stats: return
+
+    print(format_ansi_msg('Matcher statistics (slowest first):', ANSI_BOLD), file=sys.stderr)
+    print(f'{"calls":>9} {"hits":>9} {"total ms":>10} {"max ms":>8}  matcher', file=sys.stderr)
+    for name, calls, hits, total, max_time, max_sentence in MATCHER_STATS.report():
+        print(f'{calls:>9} {hits:>9} {1000 * total:>10.2f} {1000 * max_time:>8.2f}  {name}', file=sys.stderr)
+        if max_sentence is not None:
+            if isinstance(max_sentence, bytes): max_sentence = max_sentence.decode('UTF-8', 'replace')
+            # v-- the first line of the sentence behind [max ms]
+            first_line = max_sentence.strip().split('\n', 1)[0]
+            print(f'{"":>40}| {first_line if len(first_line) <= 80 else first_line[:77] + "..."}', file=sys.stderr)
+
+# v-- the fully qualified path of [target] (as supplied by the user), resolved against [cwd] - or
+#     the current directory if [None] (cf. [coq_lint_daemon]); the messages about [target] keep
+#     the spelling of the user
+def resolve_target(target, cwd=None):
+    return (target if cwd is None else cwd / target).resolve(strict=True)
+
+# NOTE: [args] comes from [args = parser.parse_args()] within [main]
+#
+# NOTE: [verdict_cache]/[result_cache] replace those of [args], [buffers] is passed on to
+# [lint_coq_file] and the targets are resolved against [cwd] (cf. [coq_lint_daemon]).
+def main_infer_categorizations(args, verdict_cache=None, result_cache=None, buffers=None, cwd=None):
+    started = time.perf_counter()
     missing_targets = []
     non_coq_code_proof_files = []
     non_dir_proof_dirs = []
@@ -246,9 +618,10 @@ def main_infer_categorizations(args):
     # in [proof/]
     for relative_proof_dirpath in args.proof_dirs or []:
         try:
-            resolved_proof_dirpath = relative_proof_dirpath.resolve(strict=True)
+            resolved_proof_dirpath = resolve_target(relative_proof_dirpath, cwd)
         except FileNotFoundError:
             missing_targets.append(str(relative_proof_dirpath))
+            continue
 
         if resolved_proof_dirpath.is_dir():
 #            if relative_proof_dirpath.parts[-1] != 'proof':
@@ -260,23 +633,67 @@ def main_infer_categorizations(args):
 
     for relative_code_proof_filepath in args.code_proof_files or []:
         try:
-            resolved_code_proof_filepath = relative_code_proof_filepath.resolve(strict=True)
+            resolved_code_proof_filepath = resolve_target(relative_code_proof_filepath, cwd)
         except FileNotFoundError:
             missing_targets.append(str(relative_code_proof_filepath))
+            continue
 
         if is_coq_file(resolved_code_proof_filepath):
             validated_code_proof_filepaths.append(resolved_code_proof_filepath)
         else:
             non_coq_code_proof_files.append(str(relative_code_proof_filepath))
 
-    for validated_proof_dirpath in validated_proof_dirpaths:
-        results = lint_proof_dir(validated_proof_dirpath)
+    # v-- NOTE: the files of every target are linted together (cf. [lint_coq_files]); with
+    #     [--changed-since] only the changed files are, but each keeps its inferred category
+    changed = mk_changed_coq_files(args, validated_proof_dirpaths + validated_code_proof_filepaths)
+    if changed is not None:
+        validated_code_proof_filepaths = [
+            filepath for filepath in validated_code_proof_filepaths if filepath in changed
+        ]
+    proof_dirs_targets = [
+        (
+            validated_proof_dirpath,
+            [
+                target for target in proof_dir_targets(validated_proof_dirpath)
+                if changed is None or target[0] in changed
+            ],
+        )
+        for validated_proof_dirpath in validated_proof_dirpaths
+    ]
+    targets = [target for _, dir_targets in proof_dirs_targets for target in dir_targets]
+    targets.extend((validated_code_proof_filepath, 'proof') for validated_code_proof_filepath in validated_code_proof_filepaths)
+
+    if verdict_cache is None: verdict_cache = mk_verdict_cache(args)
+    if result_cache is None: result_cache = mk_result_cache(args)
+    lint_options = dict(
+        jobs=args.jobs,
+        span_cache=mk_span_cache(args),
+        intra_file_jobs=args.intra_file_jobs,
+        sentence_timeout=args.sentence_timeout,
+        verdict_cache=verdict_cache,
+        result_cache=result_cache,
+        buffers=buffers,
+    )
+    if args.format == 'jsonl':
+        argument_errors = (
+              [('missing_target', path) for path in missing_targets]
+            + [('non_coq_code_proof_file', path) for path in non_coq_code_proof_files]
+            + [('non_dir_proof_dir', path) for path in non_dir_proof_dirs]
+            + [('non_proof_proof_dir', path) for path in non_proof_proof_dirs]
+        )
+        status = report_jsonl(argument_errors, targets, lint_options, started)
+        report_stats(args, verdict_cache, result_cache)
+        return status
+
+    targets_errors = iter(lint_coq_files(targets, **lint_options))
+
+    for validated_proof_dirpath, dir_targets in proof_dirs_targets:
+        results = proof_dir_errors(dir_targets, [next(targets_errors) for _ in dir_targets])
         if results:
             linting_results[validated_proof_dirpath] = results
 
-    for validated_code_proof_filepath in validated_code_proof_filepaths:
-        results = lint_coq_file(validated_code_proof_filepath, 'proof')
-        if errors:
+    for validated_code_proof_filepath, results in zip(validated_code_proof_filepaths, targets_errors):
+        if results:
             linting_results[validated_code_proof_filepath] = results
 
     any_errors = report_errors(
@@ -287,10 +704,15 @@ def main_infer_categorizations(args):
         linting_results,
         args.use_ci_output_format,
     )
+    report_stats(args, verdict_cache, result_cache)
     return 1 if any_errors else 0
 
 # NOTE: [args] comes from [args = parser.parse_args()] within [main]
-def main_common_policy(args):
+#
+# NOTE: [verdict_cache]/[result_cache] replace those of [args], [buffers] is passed on to
+# [lint_coq_file] and the targets are resolved against [cwd] (cf. [coq_lint_daemon]).
+def main_common_policy(args, verdict_cache=None, result_cache=None, buffers=None, cwd=None):
+    started = time.perf_counter()
     unresolved_common_targets      = []
     resolved_common_file_targets   = []
     resolved_common_dir_targets    = []
@@ -299,7 +721,7 @@ def main_common_policy(args):
     #    file vs. dir)
     for relative_common_target in args.common_targets:
         try:
-            resolved_common_target = relative_common_target.resolve(strict=True)
+            resolved_common_target = resolve_target(relative_common_target, cwd)
         except FileNotFoundError:
             unresolved_common_targets.append(str(relative_common_target))
             continue
@@ -322,15 +744,41 @@ def main_common_policy(args):
     # 2.b) recursively gather all [.v] files contained within [resolved_common_dir_targets]
     for resolved_common_dir_target in resolved_common_dir_targets:
         resolved_v_file_targets.extend(resolved_common_dir_target.rglob('*.v'))
+    # 2.c) with [--changed-since], keep only the files which changed
+    changed = mk_changed_coq_files(args, resolved_common_file_targets + resolved_common_dir_targets)
+    if changed is not None:
+        resolved_v_file_targets = [
+            resolved_v_file_target for resolved_v_file_target in resolved_v_file_targets
+            if resolved_v_file_target in changed
+        ]
+
+    # 3) lint all of the [.v] files using the [GLOBAL_ALLOW_DENY_POLICY_COMMON] (streaming the
+    #    errors of each file with [--format jsonl])
+    targets = [(resolved_v_file_target, IMPORT_EXPORT_PASS_CATEGORY) for resolved_v_file_target in resolved_v_file_targets]
+    if verdict_cache is None: verdict_cache = mk_verdict_cache(args)
+    if result_cache is None: result_cache = mk_result_cache(args)
+    lint_options = dict(
+        fail_on_runtime_error=args.fail_on_runtime_error,
+        jobs=args.jobs,
+        span_cache=mk_span_cache(args),
+        intra_file_jobs=args.intra_file_jobs,
+        sentence_timeout=args.sentence_timeout,
+        verdict_cache=verdict_cache,
+        result_cache=result_cache,
+        buffers=buffers,
+    )
+    if args.format == 'jsonl':
+        argument_errors = (
+              [('missing_target', path) for path in unresolved_common_targets]
+            + [('non_coq_code_proof_file', path) for path in non_v_file_targets]
+        )
+        status = report_jsonl(argument_errors, targets, lint_options, started)
+        report_stats(args, verdict_cache, result_cache)
+        return status
 
-    # 3) lint all of the [.v] files using the [GLOBAL_ALLOW_DENY_POLICY_COMMON]
     linting_results = {}
-    for resolved_v_file_target in resolved_v_file_targets:
-        linting_result = lint_coq_file(
-            resolved_v_file_target,
-            IMPORT_EXPORT_PASS_CATEGORY,
-            args.fail_on_runtime_error
-        )
+    linting_results_in_order = lint_coq_files(targets, **lint_options)
+    for resolved_v_file_target, linting_result in zip(resolved_v_file_targets, linting_results_in_order):
         if linting_result:
             linting_results[resolved_v_file_target] = linting_result
 
@@ -343,9 +791,26 @@ def main_common_policy(args):
         linting_results,
         args.use_ci_output_format,
     )
+    report_stats(args, verdict_cache, result_cache)
     return 1 if any_errors else 0
 
-def main():
+# NOTE: [args] comes from [args = parser.parse_args()] within [main]
+def main_check_policies(args):
+    # v-- [id(linter) -> (linter, categories)]; most categories share a linter
+    linters = {}
+    for category, linter in [('<COMMON>', GENERIC_COQ_LINTER_COMMON)] + list(COQ_LINTERS.items()):
+        linters.setdefault(id(linter), (linter, []))[1].append(category)
+
+    for linter, categories in linters.values():
+        findings = linter.policy_findings()
+        if not findings: continue
+
+        print(f'- {", ".join(format_report_msg(category, ANSI_BOLD, args.use_ci_output_format) for category in categories)}')
+        for ctx, message in findings:
+            print(f'\t+ [{ctx}] {message}')
+    return 0
+
+def mk_arg_parser():
     parser = argparse.ArgumentParser(
         prog=f'{basename(__file__)}',
         description=DESCRIPTION,
@@ -373,20 +838,119 @@ def main():
         dest='code_proof_files',
         help='lint specific code-proof files in addition to proof directories; NO [COMMON_TARGETS]',
     )
+    parser.add_argument(
+        '--changed-since',
+        metavar='REV',
+        dest='changed_since',
+        help='only lint the [.v] files which were added or modified since REV (according to the local git)',
+    )
+    parser.add_argument(
+        '--format',
+        choices=['text', 'jsonl'],
+        default='text',
+        dest='format',
+        help='report the errors as text once every file has been linted, or stream them as JSON Lines (one record per error, then a summary record)',
+    )
     parser.add_argument(
         '--use-ci-output-format',
         action='store_true',
         dest='use_ci_output_format',
         help='tweak the output format so that it fits better with CI tooling',
     )
+    parser.add_argument(
+        '--sentence-cache',
+        metavar='CACHE_DIR',
+        type=Path,
+        dest='sentence_cache_dir',
+        help='cache the parsed sentences of each file in CACHE_DIR (keyed by content hash) across runs',
+    )
+    parser.add_argument(
+        '--sentence-cache-max-mb',
+        metavar='MB',
+        type=int,
+        default=256,
+        dest='sentence_cache_max_mb',
+        help='evict the least recently used entries once [--sentence-cache] exceeds MB megabytes',
+    )
+    parser.add_argument(
+        '--lint-cache',
+        metavar='CACHE_DIR',
+        type=Path,
+        nargs='?',
+        const=Path('.coq_lint_cache'),
+        dest='lint_cache_dir',
+        help='only re-lint the files whose contents, category or policy changed since they were linted with the same CACHE_DIR (default: .coq_lint_cache)',
+    )
+    parser.add_argument(
+        '--lint-cache-max-mb',
+        metavar='MB',
+        type=int,
+        default=64,
+        dest='lint_cache_max_mb',
+        help='evict the least recently used entries once [--lint-cache] exceeds MB megabytes',
+    )
+    parser.add_argument(
+        '--jobs',
+        metavar='N',
+        type=int,
+        default=1,
+        dest='jobs',
+        help='lint the files using N worker processes (largest files first); the output is unchanged',
+    )
+    parser.add_argument(
+        '--intra-file-jobs',
+        metavar='N',
+        type=int,
+        default=1,
+        dest='intra_file_jobs',
+        help=f'lint each file of at least {PARALLEL_LINT_THRESHOLD >> 20}MB using N worker processes (only without [--jobs])',
+    )
+    parser.add_argument(
+        '--sentence-timeout',
+        metavar='SECONDS',
+        type=float,
+        default=SENTENCE_TIMEOUT,
+        dest='sentence_timeout',
+        help='report and skip any sentence which takes longer than SECONDS to match (0 disables the limit)',
+    )
+    parser.add_argument(
+        '--verdict-cache-entries',
+        metavar='N',
+        type=int,
+        default=VERDICT_CACHE_ENTRIES,
+        dest='verdict_cache_entries',
+        help='reuse the verdicts of the N most recently seen distinct sentences across files (0 disables the cache)',
+    )
+    parser.add_argument(
+        '--stats',
+        action='store_true',
+        dest='stats',
+        help='report statistics (i.e. the hit rate of the verdict cache) on stderr',
+    )
+    parser.add_argument(
+        '--matcher-stats',
+        action='store_true',
+        dest='matcher_stats',
+        help='report the calls, hits and total/max time of each matcher (and the sentence behind the max time) on stderr',
+    )
+    parser.add_argument(
+        '--check-policies',
+        action='store_true',
+        dest='check_policies',
+        help='report the contexts of each policy which allow anything and the policy rules which can never apply',
+    )
     parser.add_argument(
         '--fail-on-runtime-error',
         action='store_true',
         dest='fail_on_runtime_error',
         help='fail if the linter experiences a runtime error',
     )
+    return parser
 
-    args = parser.parse_args()
+# Lint as requested by [args] (cf. [mk_arg_parser]) and return the exit code; the remaining
+# arguments are passed on to [main_common_policy]/[main_infer_categorizations].
+def run_args(parser, args, **kwargs):
+    if args.matcher_stats: MATCHER_STATS.enable()
 
     any_common_targets = (args.common_targets and args.common_targets != [])
     any_inferred_targets = (
@@ -395,15 +959,21 @@ def main():
     )
 
     # NOTE: [len(sys.argv) == 1] check ensures that
-    if any_common_targets and any_inferred_targets:
+    if args.check_policies:
+        return main_check_policies(args)
+    elif any_common_targets and any_inferred_targets:
         print(fr'If [--proof-dirs] and/or [--extra-code-proofs] are supplied, no unnamed targets may be supplied to [{basename(__file__)}]; this can be relaxed in the future')
     elif any_common_targets:
-        return main_common_policy(args)
+        return main_common_policy(args, **kwargs)
     elif any_inferred_targets:
-        return main_infer_categorizations(args)
+        return main_infer_categorizations(args, **kwargs)
     else:
         parser.print_help()
         return 0
 
+def main():
+    parser = mk_arg_parser()
+    return run_args(parser, parser.parse_args())
+
 if __name__ == "__main__":
     exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2023 BlueRock Security, Inc.
+import hashlib
+import importlib
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from coq_sentence_cache import DiskCache
+from linter_util import ERR_FMTS, LintError, err_fmt_sentence_timeout
+
+# On-disk cache of the errors found in each file (cf. [coq_lint.lint_coq_file]), keyed by the
+# sha256 of the file contents, the category of the file, the fingerprint of the policy it is linted
+# against (cf. [CompiledPolicy.fingerprint]) and [linter_version].
+#
+# Each entry is a single file in [<cache dir>/<key[:2]>/<key>.errors]:
+# - [LINT_CACHE_MAGIC]
+# - a zlib-compressed JSON list of [[rule_id, starting_lineno, ending_lineno, sentence, args]]
+#
+# NOTES:
+# - a change to a policy only changes the key of the categories which are linted against it; a
+#   change to the linter itself (i.e. to the context handling) changes every key
+# - only the errors of files which were linted completely are stored, and only if every error
+#   has one of the [ERR_FMTS] (and JSON arguments); a sentence which timed out depends on the
+#   load of the machine, so neither are the errors of a file in which one did
+# - entries are written and evicted exactly as those of [coq_sentence_cache.SpanCache]
+LINT_CACHE_MAGIC = b'CQLINT\x00\x01'
+# v-- NOTE: bump whenever the errors of a file change for reasons which [linter_version] misses
+LINT_CACHE_VERSION = 1
+# v-- the modules which (together with the policy) determine the errors of a file
+LINTER_MODULES = ['coq_policy', 'coq_prefilter', 'coq_regexes', 'coq_sentence_parser', 'linter']
+
+_linter_version = None
+
+# v-- a digest of [LINT_CACHE_VERSION] and the sources of the [LINTER_MODULES]
+def linter_version():
+    global _linter_version
+    if _linter_version is None:
+        digest = hashlib.sha256(f'v{LINT_CACHE_VERSION}'.encode('UTF-8'))
+        for module in LINTER_MODULES:
+            with open(importlib.import_module(module).__file__, 'rb') as f:
+                digest.update(f.read())
+        _linter_version = digest.hexdigest()
+    return _linter_version
+
+class ResultCache(DiskCache):
+    SUFFIX = '.errors'
+
+    def key_for(buffer, category, compiled_policy):
+        digest = hashlib.sha256(buffer.data())
+        for part in (category, compiled_policy.fingerprint(), linter_version()):
+            digest.update(b'\x00' + part.encode('UTF-8'))
+        return digest.hexdigest()
+
+    # v-- the [LintError]s stored for [key] (or [None] if there are none)
+    def get(self, key):
+        contents = self._read(key)
+        if contents is None or not contents.startswith(LINT_CACHE_MAGIC):
+            self.misses += 1
+            return None
+        try:
+            records = json.loads(zlib.decompress(contents[len(LINT_CACHE_MAGIC):]))
+            errors = [
+                LintError(ERR_FMTS[rule_id], starting_lineno, ending_lineno, sentence, tuple(args))
+                for rule_id, starting_lineno, ending_lineno, sentence, args in records
+            ]
+        except (zlib.error, ValueError, TypeError, KeyError):
+            # v-- a corrupt (or outdated) entry is treated as a miss
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return errors
+
+    # Store [errors] - the [LintError]s of a file which was linted completely - for [key], unless
+    # they can't be stored (cf. the notes above).
+    def put(self, key, errors):
+        records = []
+        for error in errors:
+            rule_id = getattr(error.err_fmt, 'rule_id', None)
+            if ERR_FMTS.get(rule_id) is not error.err_fmt or error.err_fmt is err_fmt_sentence_timeout:
+                return
+            records.append([rule_id, error.starting_lineno, error.ending_lineno, error.sentence, list(error.args)])
+        try:
+            serialized = json.dumps(records).encode('UTF-8')
+        except (TypeError, ValueError):
+            return
+        self._write(key, LINT_CACHE_MAGIC + zlib.compress(serialized, 1))
+
+# An in-memory [ResultCache] (with the same keys) which holds the errors of the [max_entries] most
+# recently linted files; it may be shared by concurrent requests (cf. [coq_lint_daemon]).
+#
+# NOTE: the key of a file changes with its contents, so an edited file is never served stale errors;
+# its previous entry is evicted once it is the least recently used.
+class MemoryResultCache:
+    def __init__(self, max_entries=4096):
+        self._max_entries = max_entries
+        # v-- [key -> errors], least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            errors = self._entries.get(key)
+            if errors is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return errors
+
+    def put(self, key, errors):
+        # v-- NOTE: as for [ResultCache.put]
+        if any(error.err_fmt is err_fmt_sentence_timeout for error in errors): return
+        with self._lock:
+            self._entries[key] = tuple(errors)
+            while self._max_entries < len(self._entries):
+                self._entries.popitem(last=False)
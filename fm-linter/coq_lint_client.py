@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2023 BlueRock Security, Inc.
+
+# NOTE: only the standard library is imported so that a request costs little more than the
+# startup of the interpreter; the linting itself happens in [coq_lint_daemon.py].
+import argparse
+import json
+import os
+import socket
+import sys
+from os.path import basename
+
+DESCRIPTION = f"""
+Send a [coq_lint.py] request to a running [coq_lint_daemon.py] and print its
+output; the exit code is that of [coq_lint.py].
+"""
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog=f'{basename(__file__)}',
+        description=DESCRIPTION,
+    )
+    parser.add_argument(
+        '--socket',
+        metavar='SOCKET',
+        default=os.environ.get('COQ_LINT_SOCKET'),
+        dest='socket_path',
+        help='the Unix socket of the daemon (default: $COQ_LINT_SOCKET)',
+    )
+    parser.add_argument(
+        '--stdin-buffer',
+        metavar='PATH',
+        dest='stdin_buffer',
+        help='lint the contents of stdin in place of the contents of the (existing) file PATH',
+    )
+    parser.add_argument(
+        'argv',
+        metavar='ARGS',
+        nargs=argparse.REMAINDER,
+        help='the arguments of [coq_lint.py] (i.e. [-- --proof-dirs theories/proof])',
+    )
+    args = parser.parse_args()
+    if not args.socket_path:
+        parser.error('no [--socket] was supplied (and $COQ_LINT_SOCKET is unset)')
+
+    argv = args.argv[1:] if args.argv[:1] == ['--'] else args.argv
+    buffers = {args.stdin_buffer: sys.stdin.read()} if args.stdin_buffer else {}
+    request = json.dumps({'argv': argv, 'cwd': os.getcwd(), 'buffers': buffers}).encode('UTF-8') + b'\n'
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(args.socket_path)
+            connection.sendall(request)
+            with connection.makefile('rb') as f:
+                response = json.loads(f.readline())
+    except (OSError, ValueError) as e:
+        print(f'{basename(__file__)}: no response from the daemon on {args.socket_path}: {e}', file=sys.stderr)
+        return 2
+
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    return response['status']
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2023 BlueRock Security, Inc.
+
+import argparse
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import traceback
+from pathlib import Path
+from os.path import basename
+import coq_lint
+from coq_lint_cache import MemoryResultCache
+from linter import VERDICT_CACHE_ENTRIES, VerdictCache
+
+DESCRIPTION = f"""
+Serve [coq_lint.py] requests on a Unix socket, keeping the compiled policies
+and the results of recently linted files warm across requests; use
+[coq_lint_client.py] to send requests.
+"""
+
+# Protocol (one request per connection): the client sends a single line of JSON
+#
+#   {"argv": [<coq_lint.py arguments>], "cwd": <directory>, "buffers": {<path>: <text>}}
+#
+# and the daemon replies with a single line of JSON
+#
+#   {"status": <exit code>, "stdout": <output>, "stderr": <output>}
+#
+# where the output is exactly that of [coq_lint.py] (run from [cwd] with [argv]).
+#
+# NOTES:
+# - requests are served concurrently (one thread per connection); the [CoqLinter]s, the
+#   [VerdictCache] and the [MemoryResultCache] are all shared by the requests
+# - the [buffers] (i.e. the unsaved buffers of an editor) are linted in place of the contents of the
+#   (existing) files at their paths
+# - the results of a file are cached by the hash of its contents (cf. [coq_lint_cache.ResultCache.key_for]),
+#   so an edited file - or buffer - is always re-linted
+# - the targets are resolved against [cwd] (cf. [coq_lint.resolve_target]), so the messages spell
+#   them as the client did; the cache directories are resolved against [cwd] up front
+# - forking from a threaded process is unsafe, so [--jobs]/[--intra-file-jobs] are ignored
+# - signals are only delivered to the main thread, so [--sentence-timeout] can't be enforced and
+#   the requests which supply it are rejected
+# - the [coq_policy.MATCHER_STATS] are shared by every request (and can't be told apart), so the
+#   requests which supply [--matcher-stats] are rejected
+# - [--stats] reports the (cumulative) statistics of the shared caches
+
+# v-- the [print]s of [coq_lint] go to [sys.stdout]/[sys.stderr], which are replaced by
+#     [RequestStream]s that write to the output of the request served by the current thread
+class RequestStream(io.TextIOBase):
+    def __init__(self, fallback):
+        self._fallback = fallback
+        self._local = threading.local()
+
+    def capture(self):
+        self._local.output = io.StringIO()
+
+    def release(self):
+        output = self._local.output
+        self._local.output = None
+        return output.getvalue()
+
+    def write(self, text):
+        output = getattr(self._local, 'output', None)
+        return (output or self._fallback).write(text)
+
+    def flush(self):
+        if getattr(self._local, 'output', None) is None:
+            self._fallback.flush()
+
+class LintRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            response = self.server.serve_request(request['argv'], request['cwd'], request.get('buffers') or {})
+        except (ValueError, KeyError, TypeError) as e:
+            response = {'status': 2, 'stdout': '', 'stderr': f'malformed request: {e}\n'}
+        self.wfile.write(json.dumps(response).encode('UTF-8') + b'\n')
+
+class LintDaemon(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    # v-- the arguments which name cache directories (cf. [coq_lint.mk_arg_parser])
+    CACHE_DIR_ARGS = ['sentence_cache_dir', 'lint_cache_dir']
+    # v-- the arguments which the daemon can't honour (cf. the notes above)
+    UNSUPPORTED_ARGS = [('sentence_timeout', '--sentence-timeout'), ('matcher_stats', '--matcher-stats')]
+
+    def __init__(self, socket_path, verdict_cache, result_cache):
+        super().__init__(str(socket_path), LintRequestHandler)
+        self._parser = coq_lint.mk_arg_parser()
+        # v-- NOTE: [None] tells an omitted [--sentence-timeout] apart from its default
+        self._parser.set_defaults(sentence_timeout=None)
+        self._verdict_cache = verdict_cache
+        self._result_cache = result_cache
+
+    def serve_request(self, argv, cwd, buffers):
+        cwd = Path(cwd)
+        buffers = {str((cwd / path).resolve()): text for path, text in buffers.items()}
+
+        sys.stdout.capture()
+        sys.stderr.capture()
+        try:
+            args = self._parser.parse_args(argv)
+            for name, flag in LintDaemon.UNSUPPORTED_ARGS:
+                if getattr(args, name): self._parser.error(f'[{flag}] is not supported by [{basename(__file__)}]')
+            for name in LintDaemon.CACHE_DIR_ARGS:
+                if getattr(args, name): setattr(args, name, cwd / getattr(args, name))
+            args.jobs = args.intra_file_jobs = 1
+            args.sentence_timeout = 0
+            status = coq_lint.run_args(
+                self._parser,
+                args,
+                verdict_cache=self._verdict_cache,
+                result_cache=self._result_cache,
+                buffers=buffers,
+                cwd=cwd,
+            )
+        except SystemExit as e:
+            status = e.code
+        except Exception:
+            traceback.print_exc()
+            status = 1
+        finally:
+            stdout = sys.stdout.release()
+            stderr = sys.stderr.release()
+
+        if status is None: status = 0
+        elif not isinstance(status, int):
+            stderr += f'{status}\n'
+            status = 1
+        return {'status': status, 'stdout': stdout, 'stderr': stderr}
+
+# Remove the socket at [socket_path] if it was left behind by a daemon which is no longer running.
+def remove_stale_socket(socket_path):
+    if not os.path.exists(socket_path): return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(socket_path))
+        except OSError:
+            os.unlink(socket_path)
+            return
+    raise RuntimeError(f'a daemon is already listening on {socket_path}')
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog=f'{basename(__file__)}',
+        description=DESCRIPTION,
+    )
+    parser.add_argument(
+        'socket_path',
+        metavar='SOCKET',
+        type=Path,
+        help='the Unix socket to listen on',
+    )
+    parser.add_argument(
+        '--verdict-cache-entries',
+        metavar='N',
+        type=int,
+        default=VERDICT_CACHE_ENTRIES,
+        dest='verdict_cache_entries',
+        help='reuse the verdicts of the N most recently seen distinct sentences across requests (0 disables the cache)',
+    )
+    parser.add_argument(
+        '--result-cache-entries',
+        metavar='N',
+        type=int,
+        default=4096,
+        dest='result_cache_entries',
+        help='reuse the errors of the N most recently linted files across requests (0 disables the cache)',
+    )
+    args = parser.parse_args()
+
+    verdict_cache = VerdictCache(max_entries=args.verdict_cache_entries) if args.verdict_cache_entries else None
+    result_cache = MemoryResultCache(max_entries=args.result_cache_entries) if args.result_cache_entries else None
+
+    try:
+        remove_stale_socket(args.socket_path)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    # v-- NOTE: [SIGTERM] unwinds [serve_forever] so that the socket is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    sys.stdout = RequestStream(sys.stdout)
+    sys.stderr = RequestStream(sys.stderr)
+    with LintDaemon(args.socket_path, verdict_cache, result_cache) as daemon:
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(args.socket_path)
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
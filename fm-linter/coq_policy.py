@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2023 BlueRock Security, Inc.
+import hashlib
+import os
+import re
+import threading
+import time
+import types
+from coq_prefilter import LiteralIndex
+from coq_regexes import FRAGMENTS, SentenceMatchers, MATCHER_REGISTRY, matcher_name
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:
+    import sre_parse, sre_constants
+
+# v-- the verdicts of a [DecisionTable]
+ALLOW = 'allow'
+DENY  = 'deny'
+
+# v-- [\(?P<name>] which isn't an escaped [(] (cf. [DecisionTable._combine])
+NAMED_GROUP = re.compile(r'(?<!\\)\(\?P<\w+>')
+# v-- leading global inline flags (i.e. [(?m)]); these are re-applied as scoped flags
+GLOBAL_FLAGS = re.compile(r'^(\(\?[aiLmsux]+\))+')
+SCOPED_FLAGS = [(re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'), (re.VERBOSE, 'x')]
+
+# v-- [SENTENCE(ANYTHING)] (cf. [accepts_any_sentence])
+ANY_SENTENCE_PATTERN = SentenceMatchers.SENTENCE(FRAGMENTS.ANYTHING).pattern
+
+# Whether [matcher] is [SENTENCE(ANYTHING)], which accepts exactly the texts that [is_any_sentence];
+# every sentence produced by [SentenceParser] ends with a [.], so this is every sentence but [.] itself.
+def accepts_any_sentence(matcher):
+    return (    isinstance(matcher, re.Pattern)
+            and matcher.pattern == ANY_SENTENCE_PATTERN
+            and matcher.flags == re.UNICODE)
+
+def is_any_sentence(text):
+    return 2 <= len(text) and text[-1] == '.'
+
+# v-- i.e. [SentenceMatchers.IMPORT] (cf. [register_matcher]), or a prefix of the pattern of [matcher]
+def describe_matcher(matcher):
+    name = matcher_name(matcher)
+    if name is not None:
+        return name
+    if accepts_any_sentence(matcher):
+        return 'SENTENCE(ANYTHING)'
+    pattern = str(getattr(matcher, 'pattern', matcher))
+    return repr(pattern if len(pattern) <= 40 else pattern[:37] + '...')
+
+# v-- two matchers with the same key accept the same sentences
+def matcher_key(matcher):
+    if isinstance(matcher, re.Pattern):
+        return (matcher.pattern, matcher.flags)
+    return id(matcher)
+
+# A digest of [policy] (cf. [mk_policy]) and [rules] (cf. [LintRule]) which only changes when they
+# might lint some file differently; it is stable across processes (cf. [coq_lint_cache.ResultCache]).
+#
+# NOTES:
+# - a regex is described by its pattern and flags, an [ErrFmt] by its attributes and a callable
+#   (i.e. the [check] of a [LintRule]) by its name and its bytecode - without line numbers, so
+#   unrelated edits to the same file don't change the digest
+# - the helpers which a callable calls are not followed; a change to one of them needs a change
+#   of [coq_lint_cache.LINT_CACHE_VERSION]
+def policy_fingerprint(policy, rules=()):
+    digest = hashlib.sha256()
+    digest.update(repr(_fingerprint_value(policy)).encode('UTF-8'))
+    digest.update(repr(_fingerprint_value(tuple(tuple(rule) for rule in rules))).encode('UTF-8'))
+    return digest.hexdigest()
+
+def _fingerprint_value(value):
+    if isinstance(value, re.Pattern):
+        return ('re', value.pattern, value.flags)
+    if isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return value
+    if hasattr(value, 'items'):
+        return ('map', tuple(sorted((str(k), _fingerprint_value(v)) for k, v in value.items())))
+    if isinstance(value, (tuple, list, set, frozenset)):
+        values = tuple(_fingerprint_value(v) for v in value)
+        return values if isinstance(value, (tuple, list)) else ('set', tuple(sorted(values, key=repr)))
+    if isinstance(value, types.CodeType):
+        return (
+            'code',
+            value.co_code,
+            value.co_names,
+            tuple(_fingerprint_value(const) for const in value.co_consts),
+        )
+    if hasattr(value, '__code__'):
+        return ('fn', value.__module__, value.__qualname__, _fingerprint_value(value.__code__))
+    if hasattr(value, '__slots__'):
+        return (type(value).__name__, tuple(_fingerprint_value(getattr(value, slot)) for slot in value.__slots__))
+    return (type(value).__qualname__, _fingerprint_value(vars(value)) if hasattr(value, '__dict__') else repr(value))
+
+# Per-matcher counters for [--matcher-stats]: the number of times each matcher was tried, the
+# number of hits, and the total/max time spent - together with the sentence behind the max time.
+#
+# NOTES:
+# - [MATCHER_STATS] is disabled (and costs a single attribute check per match) unless [enable]d
+# - only the matches which actually run are counted: a match which [SentenceKind] reuses, or a
+#   matcher which the [LiteralIndex] rules out, isn't tried at all
+# - while enabled, a [DecisionTable] tries each rule on its own rather than through a combined
+#   regex, so the time of each matcher is measured (the verdicts are unchanged)
+# - the forked workers of [LintSession.lint_parallel] [take] their records after each chunk and
+#   the parent process [merge]s them
+class MatcherStats:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        # v-- [id(matcher) -> [matcher, name, calls, hits, total time, max time, max sentence]]
+        self._records = {}
+        # v-- [name -> [calls, hits, total time, max time, max sentence]] of the forked workers
+        self._merged = {}
+        self._pid = os.getpid()
+
+    def enable(self):
+        self.enabled = True
+        return self
+
+    # [method(text, *args)] - i.e. [matcher.match(text)] - recording whether it hit and its time.
+    def call(self, matcher, method, text, *args):
+        start = time.perf_counter()
+        result = method(text, *args)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            record = self._records.get(id(matcher))
+            if record is None:
+                record = [matcher, describe_matcher(matcher), 0, 0, 0.0, 0.0, None]
+                self._records[id(matcher)] = record
+            record[2] += 1
+            if result is not None: record[3] += 1
+            record[4] += elapsed
+            if record[5] <= elapsed:
+                record[5] = elapsed
+                # v-- NOTE: [args] are the [(start, end)] of the sentence within [text]
+                record[6] = text[args[0]:args[1]] if args else text
+        return result
+
+    # In a forked worker, the records of the worker since the last [take] (which are then
+    # dropped); [None] in the process which created [MATCHER_STATS].
+    def take(self):
+        if not self.enabled or self._pid == os.getpid(): return None
+        with self._lock:
+            records = {}
+            for _, name, *counters in self._records.values():
+                MatcherStats._merge_into(records, name, counters)
+            self._records.clear()
+            return records
+
+    # Drop the records inherited from the parent process (cf. [take]).
+    def enter_worker(self):
+        if not self.enabled or self._pid == os.getpid(): return
+        with self._lock:
+            self._records.clear()
+            self._merged.clear()
+
+    def merge(self, records):
+        if not records: return
+        with self._lock:
+            for name, counters in records.items():
+                MatcherStats._merge_into(self._merged, name, counters)
+
+    def _merge_into(table, name, counters):
+        calls, hits, total, max_time, max_sentence = counters
+        merged = table.get(name)
+        if merged is None:
+            table[name] = list(counters)
+            return
+        merged[0] += calls
+        merged[1] += hits
+        merged[2] += total
+        if merged[3] <= max_time:
+            merged[3] = max_time
+            merged[4] = max_sentence
+
+    # v-- [(name, calls, hits, total time, max time, max sentence)], slowest (in total) first;
+    #     the registered matchers which were never tried are included (last)
+    def report(self):
+        with self._lock:
+            table = {name: list(counters) for name, counters in self._merged.items()}
+            for _, name, *counters in self._records.values():
+                MatcherStats._merge_into(table, name, counters)
+        for name, _ in MATCHER_REGISTRY.values():
+            table.setdefault(name, [0, 0, 0.0, 0.0, None])
+        return sorted(
+            ((name, *counters) for name, counters in table.items()),
+            key=lambda row: (-row[3], -row[1], row[0]),
+        )
+
+MATCHER_STATS = MatcherStats()
+
+# The policy of a single context compiled into one ordered list of [(matcher, verdict, err_fmt)]
+# rules - [verdict] being [ALLOW] or [DENY] (with [err_fmt] formatting the error) - such that the
+# first rule whose matcher [match]es a sentence decides it. [LintSession.check_policy_aux] checks
+# the context (then global) eager-allow, deny and allow lists in that order, so that is the order
+# of precedence of the rules.
+#
+# NOTES:
+# - rules which can never decide a sentence - i.e. repeated matchers, or those which follow
+#   [SENTENCE(ANYTHING)] - are dropped (cf. [dead_rules])
+# - the rules which can't match a sentence (cf. [LiteralIndex.candidates]) are skipped, and the
+#   remaining ones are tried with a single regex: for [re.match] an alternation of named groups
+#   [(?P<_0>rule 0)|(?P<_1>rule 1)|...] commits to the first rule (in order) which matches, and
+#   [lastgroup] names it. These combined regexes are built lazily, once per set of candidates.
+# - rules which can't be combined - i.e. non-regex matchers, [bytes] regexes, or regexes with
+#   backreferences or unsupported flags - are tried on their own (in order)
+class DecisionTable:
+    def __init__(self, rules, prefilter=None):
+        self._prefilter = prefilter
+        self._rules = []
+        # v-- cf. [dead_rules]
+        self._dead_rules = []
+        # v-- cf. [trivial]
+        self._trivial = False
+        # v-- cf. [deny_literals]
+        self._deny_literals = None
+
+        # v-- [matcher_key(matcher) -> the first rule with an equivalent matcher]
+        deciding = {}
+        universal = None
+        for rule in rules:
+            matcher = rule[0]
+            shadowing = deciding.get(matcher_key(matcher))
+            if shadowing is not None:
+                self._dead_rules.append((rule, shadowing))
+                continue
+            # v-- NOTE: only [.] itself isn't decided by the [universal] rule
+            if universal is not None and not matcher.match('.'):
+                self._dead_rules.append((rule, universal))
+                continue
+            deciding[matcher_key(matcher)] = rule
+            self._rules.append(rule)
+
+            if universal is None and accepts_any_sentence(matcher):
+                universal = rule
+                self._trivial = (
+                        rule[1] is ALLOW
+                    and all(verdict is ALLOW for _, verdict, _ in self._rules)
+                )
+                if rule[1] is ALLOW:
+                    self._deny_literals = DecisionTable._literals_of(
+                        matcher for matcher, verdict, _ in self._rules if verdict is DENY
+                    )
+        # v-- [id(candidates) -> (candidates, program)] (cf. [_program])
+        self._programs = {}
+
+    # The [DecisionTable] of [ctx_policy] (which is [None] for the toplevel context).
+    def of_policy(ctx_policy, toplevel_policy, prefilter=None):
+        subpolicies = [toplevel_policy] if ctx_policy is None else [ctx_policy, toplevel_policy]
+        rules = []
+        for subpolicy in subpolicies:
+            rules.extend((allow, ALLOW, None) for allow in subpolicy['eager_allow_list'])
+        for subpolicy in subpolicies:
+            rules.extend((disallow, DENY, err_fmt) for disallow, err_fmt in subpolicy['deny_list'])
+        for subpolicy in subpolicies:
+            rules.extend((allow, ALLOW, None) for allow in subpolicy['allow_list'])
+        return DecisionTable(rules, prefilter)
+
+    # v-- the rules which can decide a sentence, in order of precedence
+    def rules(self): return self._rules
+
+    # The [(rule, shadowing rule)] pairs of the rules which can never decide a sentence: either
+    # [shadowing rule] comes first and has an equivalent matcher (cf. [matcher_key]), or it
+    # accepts any sentence (cf. [accepts_any_sentence]).
+    def dead_rules(self): return self._dead_rules
+
+    # Whether every sentence but [.] is allowed (i.e. by an [ALLOW] rule which accepts any
+    # sentence and which only [ALLOW] rules precede), in which case [trivially_allows] decides
+    # a sentence without matching it against any rule.
+    def trivial(self): return self._trivial
+
+    def trivially_allows(self, text):
+        return self._trivial and is_any_sentence(text)
+
+    # The literals at least one of which occurs in every sentence that isn't allowed (but [.]),
+    # or [None] if there is no such set: every rule which precedes the [ALLOW] rule that accepts
+    # any sentence is an [ALLOW] rule or a [DENY] rule with a literal requirement (cf.
+    # [LiteralIndex.requirement_of]). The literals of a [trivial] table are [frozenset()].
+    def deny_literals(self): return self._deny_literals
+
+    def _literals_of(matchers):
+        literals = set()
+        for matcher in matchers:
+            requirement = LiteralIndex.requirement_of(matcher)
+            if requirement is None: return None
+            literals |= requirement
+        return frozenset(literals)
+
+    # The pattern which tries [matcher] within a combined regex, or [None] if it can't be combined.
+    def _combinable_pattern(matcher):
+        if not isinstance(matcher, re.Pattern) or not isinstance(matcher.pattern, str):
+            return None
+        flags = matcher.flags & ~re.UNICODE
+        if flags & ~(re.IGNORECASE | re.MULTILINE | re.DOTALL | re.VERBOSE):
+            return None
+        try:
+            parsed = sre_parse.parse(matcher.pattern, matcher.flags)
+        except re.error:
+            return None
+        if DecisionTable._has_backreference(parsed):
+            return None
+
+        # v-- NOTE: the group names of different rules may clash, and only [lastgroup] is needed
+        pattern = NAMED_GROUP.sub('(?:', GLOBAL_FLAGS.sub('', matcher.pattern))
+        scoped_flags = ''.join(letter for flag, letter in SCOPED_FLAGS if flags & flag)
+        return f'(?{scoped_flags}:{pattern})' if scoped_flags else pattern
+
+    def _has_backreference(items):
+        for op, av in items:
+            if op in (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS):
+                return True
+            if op is sre_constants.SUBPATTERN:
+                if DecisionTable._has_backreference(av[3]): return True
+            elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, sre_constants.POSSESSIVE_REPEAT):
+                if DecisionTable._has_backreference(av[2]): return True
+            elif op in (sre_constants.ATOMIC_GROUP, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+                if DecisionTable._has_backreference(av if op is sre_constants.ATOMIC_GROUP else av[1]):
+                    return True
+            elif op is sre_constants.BRANCH:
+                if any(DecisionTable._has_backreference(branch) for branch in av[1]): return True
+        return False
+
+    # A single regex which tries [rules] in order (cf. [DecisionTable]), or [None].
+    def _combine(rules):
+        patterns = [DecisionTable._combinable_pattern(matcher) for matcher, _, _ in rules]
+        try:
+            return re.compile('|'.join(
+                f'(?P<_{i}>{pattern})' for i, pattern in enumerate(patterns)
+            ))
+        except re.error:
+            return None
+
+    # The [(regex, rules)] segments which decide a sentence for which [candidates] are the
+    # rules which may match: runs of combinable rules share a single regex, and a segment with
+    # a single rule is tried with its own matcher.
+    def _program(self, candidates):
+        key = id(candidates)
+        cached = self._programs.get(key)
+        if cached is not None and cached[0] is candidates:
+            return cached[1]
+
+        segments = []
+        run = []
+        def flush():
+            if 1 < len(run):
+                combined = DecisionTable._combine(run)
+                if combined is not None:
+                    segments.append((combined, tuple(run)))
+                    run.clear()
+                    return
+            segments.extend((None, (rule,)) for rule in run)
+            run.clear()
+
+        for rule in candidates:
+            if DecisionTable._combinable_pattern(rule[0]) is None:
+                flush()
+                segments.append((None, (rule,)))
+            else:
+                run.append(rule)
+        flush()
+
+        self._programs[key] = (candidates, segments)
+        return segments
+
+    # The first rule which matches [kind] (a [linter.SentenceKind]), or [None].
+    #
+    # NOTE: a rule which is tried on its own reuses the matches of the context handling (cf.
+    # [SentenceKind.match_candidate]).
+    def decide(self, kind):
+        if self._prefilter is None:
+            candidates = self._rules
+        else:
+            candidates = self._prefilter.candidates(self._rules, kind.present())
+
+        if MATCHER_STATS.enabled:
+            for rule in candidates:
+                if kind.match_candidate(rule[0]):
+                    return rule
+            return None
+
+        text = None
+        for regex, rules in self._program(candidates):
+            if regex is None:
+                if kind.match_candidate(rules[0][0]):
+                    return rules[0]
+                continue
+
+            if text is None: text = kind.text()
+            match = regex.match(text)
+            if match:
+                return rules[int(match.lastgroup[1:])]
+        return None
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2023 BlueRock Security, Inc.
+import re
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+# v-- shorter literals (i.e. [.]/[:]) occur in almost every sentence, so they make poor filters
+MIN_LITERAL_LENGTH = 3
+
+# A literal prefilter for a fixed set of [SentenceMatchers] (or other compiled regexes).
+#
+# Most matchers can only match a sentence which contains some keyword (i.e. [SET] requires [Set]
+# and [LOCAL] requires [local] or [Local]). The index extracts such a requirement - a set of
+# literals, at least one of which occurs in every match - from the parsed form of each matcher;
+# [scan] then finds all of the indexed literals which occur in a sentence with a single
+# multi-literal regex, and [candidates] drops the matchers whose requirement is unmet.
+#
+# NOTES:
+# - matchers without a (useful) requirement - i.e. [SENTENCE(ANYTHING)], case-insensitive
+#   or [bytes] regexes - are always candidates.
+# - the requirement is a necessary condition only, so the candidates must still be [match]ed.
+class LiteralIndex:
+    def __init__(self, matchers):
+        # v-- [id(matcher) -> frozenset of literals] for the matchers with a requirement
+        #     NOTE: keyed by [id] since hashing a compiled regex rehashes its code; [_matchers]
+        #     keeps the indexed matchers (and so their [id]s) alive.
+        self._requirements = {}
+        self._matchers = []
+        for matcher in matchers:
+            if id(matcher) in self._requirements: continue
+            requirement = LiteralIndex.requirement_of(matcher)
+            if requirement is not None:
+                self._requirements[id(matcher)] = requirement
+                self._matchers.append(matcher)
+
+        literals = set().union(*self._requirements.values())
+        # v-- [_implied[literal]] holds every indexed literal which occurs within [literal]
+        self._implied = {
+            literal: frozenset(other for other in literals if other in literal)
+            for literal in literals
+        }
+        # v-- NOTE: longest first, so that [scan] sees the longest literal which begins at any offset
+        #     (and [_implied] accounts for the others).
+        self._scanner = re.compile('|'.join(
+            re.escape(literal) for literal in sorted(literals, key=lambda literal: (-len(literal), literal))
+        )) if literals else None
+        # v-- [(id(matchers), present) -> (matchers, candidates)] (cf. [candidates])
+        self._candidates = {}
+        # v-- [present -> excluded] (cf. [excluded])
+        self._excluded = {}
+
+    # The set of literals which [matcher] requires, or [None].
+    def requirement_of(matcher):
+        if not isinstance(matcher, re.Pattern) or not isinstance(matcher.pattern, str):
+            return None
+        if matcher.flags & re.IGNORECASE:
+            return None
+        try:
+            parsed = sre_parse.parse(matcher.pattern, matcher.flags)
+        except re.error:
+            return None
+        return LiteralIndex._sequence_requirement(parsed)
+
+    # Each item of a sequence must match, so the best requirement of any item (or literal run)
+    # is a requirement of the whole sequence.
+    def _sequence_requirement(items):
+        requirements = []
+        run = []
+        for op, av in list(items) + [(None, None)]:
+            if op is sre_parse.LITERAL:
+                run.append(chr(av))
+                continue
+            if run:
+                requirements.append(frozenset([''.join(run)]))
+                run = []
+
+            if op is sre_parse.SUBPATTERN:
+                _, add_flags, _, sub_items = av
+                if not add_flags & re.IGNORECASE:
+                    requirements.append(LiteralIndex._sequence_requirement(sub_items))
+            elif op is sre_parse.ATOMIC_GROUP:
+                requirements.append(LiteralIndex._sequence_requirement(av))
+            elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, sre_parse.POSSESSIVE_REPEAT):
+                repeat_min, _, sub_items = av
+                if 1 <= repeat_min:
+                    requirements.append(LiteralIndex._sequence_requirement(sub_items))
+            elif op is sre_parse.BRANCH:
+                # v-- NOTE: some branch must match, so every branch needs a requirement
+                branch_requirements = [
+                    LiteralIndex._sequence_requirement(branch) for branch in av[1]
+                ]
+                if all(requirement is not None for requirement in branch_requirements):
+                    requirements.append(frozenset().union(*branch_requirements))
+            # v-- NOTE: anything else (character classes, anchors, lookarounds, ...) requires no literal
+
+        requirements = [
+            requirement for requirement in requirements
+            if requirement is not None and MIN_LITERAL_LENGTH <= min(map(len, requirement))
+        ]
+        if not requirements:
+            return None
+        # v-- prefer long literals, then few alternatives
+        return max(requirements, key=lambda requirement: (min(map(len, requirement)), -len(requirement)))
+
+    # The (frozen)set of indexed literals which occur in [sentence].
+    def scan(self, sentence):
+        if self._scanner is None:
+            return frozenset()
+
+        present = set()
+        pos = 0
+        while True:
+            match = self._scanner.search(sentence, pos)
+            if not match: break
+            present.update(self._implied[match.group()])
+            # v-- NOTE: literals may overlap, so resume just after the start of the match
+            pos = match.start() + 1
+        return frozenset(present)
+
+    def may_match(self, matcher, present):
+        requirement = self._requirements.get(id(matcher))
+        return requirement is None or not requirement.isdisjoint(present)
+
+    # The [id]s of the indexed matchers which can't match a sentence containing the literals [present].
+    def excluded(self, present):
+        excluded = self._excluded.get(present)
+        if excluded is None:
+            excluded = frozenset(
+                key for key, requirement in self._requirements.items()
+                if requirement.isdisjoint(present)
+            )
+            self._excluded[present] = excluded
+        return excluded
+
+    # The sublist of [matchers] - a list of matchers or of [(matcher, ...)] tuples (i.e. a
+    # [deny_list]) - which may match a sentence containing the literals [present].
+    #
+    # NOTE: the result is cached; [matchers] must not be mutated.
+    def candidates(self, matchers, present):
+        key = (id(matchers), present)
+        cached = self._candidates.get(key)
+        if cached is not None and cached[0] is matchers:
+            return cached[1]
+
+        candidates = [
+            item for item in matchers
+            if self.may_match(item[0] if isinstance(item, tuple) else item, present)
+        ]
+        self._candidates[key] = (matchers, candidates)
+        return candidates
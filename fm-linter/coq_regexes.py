@@ -16,6 +16,9 @@ class FRAGMENTS:
 
     SENTENCE_BEGIN       = fr'^{MAYBE_SPACES}'
     SENTENCE_END         = fr'{MAYBE_SPACES}\.$'
+    # v-- NOTE: a lookahead which holds iff [SENTENCE_END] can match at the end of the sentence;
+    #     [(?s:.*)] (unlike [MAYBE_ANYTHING]) jumps straight to the end of the string.
+    SENTENCE_ENDS        = fr'(?=(?s:.*)\.$)'
 
     BEGIN_COMMENT        = fr'{MAYBE_SPACES}\(\*(\*)*'
     # NOTE: specs sometimes use mangled names of the form
@@ -25,21 +28,37 @@ class FRAGMENTS:
     # v-- Non-whitespace which is followed by some pattern.
     NON_SPACES_THEN      = lambda then_regex: fr'\S+(?={then_regex})'
     NON_SPACES           = NON_SPACES_THEN('')
+    # v-- holds just before a [:] which can begin the statement of a [SentenceMatchers.LEMMA_SHAPE]
+    VIABLE_COLON         = fr':{ANYTHING}{SENTENCE_END}'
     # v-- NOTE: matches leading whitespace
+    #     NOTE: this is linear-time despite the nested quantifiers: [\s] and [\S] are disjoint, so
+    #     each word can only be split at its final [.] (cf. [SENTENCE_END]).
     SPACED_STUFF         = fr'({SPACES}{NON_SPACES_THEN(fr"({SPACES}|{SENTENCE_END})")})+'
 
     # TODO (JH): determine the right way to set up matchers for sentences
     # that can begin with many different attributes in the same [#[...]] block.
-    ATTRIBUTE            = lambda attr_regex: fr'\s*(#\[.*{attr_regex}.*\])'
+    #
+    # NOTE: the naive [#\[.*{attr_regex}.*\]] backtracks over every (occurrence, [\]]) pair on the
+    # line. For a literal [attr_regex] the first occurrence admits every [\]] which a later one
+    # does, so we commit to it (atomically) and only the closing [\]] is searched for.
+    ATTRIBUTE            = lambda attr_regex: fr'\s*(#\[(?>[^\n]*?{attr_regex})[^\n]*\])'
+    ANY_ATTRIBUTE        = fr'\s*(#\[[^\n]*\])'
     ATTRIBUTE_ONLY       = lambda only_regex: fr'\s*(#\[.*only\({only_regex}\).*\])'
-    ONLY_SOMETHING       = ATTRIBUTE_ONLY(ANYTHING)
+    # v-- NOTE: equivalent to [ATTRIBUTE_ONLY(ANYTHING)], which is cubic; [ANYTHING] may span lines so
+    #     the [\)] is either on the line of [only(] (after at least one character) or on the line
+    #     following some later newline - and on each such line we commit to the first [\)].
+    ONLY_SOMETHING       = ''.join([
+        fr'\s*(#\[(?>[^\n]*?only\()',
+        fr'[\s\S](?:[\s\S]*\n)?(?>[^\n]*?\))',
+        fr'[^\n]*\])',
+    ])
     LOCAL                = fr'({ATTRIBUTE("local")}|Local)'
     GLOBAL               = fr'({ATTRIBUTE("global")}|Global)'
     EXPORT               = fr'({ATTRIBUTE("export")}|Export)'
     MAYBE_LOCALITY       = fr'(({LOCAL}|{GLOBAL}|{EXPORT}){SPACES})?'
     POLYMORPHIC          = fr'({ATTRIBUTE("polymorphic")}|Polymorphic)'
     MAYBE_POLYMORPHIC    = fr'(({POLYMORPHIC}){SPACES})?'
-    PROGRAM              = fr'({ATTRIBUTE("program")}|({ATTRIBUTE(".*")})?{MAYBE_SPACES}Program)'
+    PROGRAM              = fr'({ATTRIBUTE("program")}|({ANY_ATTRIBUTE})?{MAYBE_SPACES}Program)'
     MAYBE_PROGRAM        = fr'(({PROGRAM}){MAYBE_SPACES})?'
     DEFINITELY_PROGRAM   = fr'({PROGRAM}){MAYBE_SPACES}'
     BR_LOCK              = fr'br\.lock'
@@ -49,8 +68,10 @@ class FRAGMENTS:
     DEFINITELY_FROM      = fr'From{SPACED_STUFF}{SPACES}'
     MAYBE_FROM           = fr'({DEFINITELY_FROM})?'
     NES_OPEN             = fr'{MAYBE_LOCALITY}NES\.Open{SPACED_STUFF}'
-    PROOF_BEGIN          = fr'{MAYBE_SPACES}(Next{SPACES}Obligation|Proof)({SPACES}using{SPACED_STUFF})?'
-    PROOF_END            = fr'{MAYBE_SPACES}(Qed|Admitted|Abort|Defined|(Admit{SPACES}Obligations))'
+    PROOF_BEGIN_KEYWORD  = fr'(Next{SPACES}Obligation|Proof)'
+    PROOF_BEGIN          = fr'{MAYBE_SPACES}{PROOF_BEGIN_KEYWORD}({SPACES}using{SPACED_STUFF})?'
+    PROOF_END_KEYWORD    = fr'(Qed|Admitted|Abort|Defined|(Admit{SPACES}Obligations))'
+    PROOF_END            = fr'{MAYBE_SPACES}{PROOF_END_KEYWORD}'
     LEMMA                = fr'(Theorem|Lemma|Example|Corollary)'
     SPECIFY              = fr'Specify'
     DEFINITION           = fr'{MAYBE_LOCALITY}{MAYBE_BR_LOCK}{MAYBE_SPACES}Definition'
@@ -61,6 +82,8 @@ class FRAGMENTS:
     DEFINED_INSTANCE     = fr'{MAYBE_LOCALITY}{MAYBE_SPACES}(Existing|Declare){MAYBE_SPACES}Instance'
     IMPLICIT_TYPES       = fr'Implicit Types?'
     DERIVE               = fr'derive'
+    # v-- the (non-attribute) modifiers which can precede the leading keyword of a sentence
+    MODIFIER             = fr'(Local|Global|Export|Polymorphic|Monomorphic|Program|{BR_LOCK})'
 
     COLON_EQUAL_NOT_NAMED_ARGUMENT = fr':=(?!{NON_SPACES}\))'
 
@@ -101,9 +124,14 @@ class GroupNames:
     ANON_INSTANCE_ARGS_KEY = 'ANON_INSTANCE_ARGS'
     ANON_INSTANCE_STMT_KEY = 'ANON_INSTANCE_STMT'
 
+    HEAD_PREFIX_KEY  = 'HEAD_PREFIX'
+    HEAD_KEYWORD_KEY = 'HEAD_KEYWORD'
+
 class SentenceMatchers:
+    # v-- NOTE: [SENTENCE_ENDS] is implied by [SENTENCE_END], but checking it first means that a
+    #     sentence without a final [.] is rejected before [body_regex] backtracks at all.
     SENTENCE = lambda body_regex: re.compile(
-        fr'{FRAGMENTS.SENTENCE_BEGIN}{body_regex}{FRAGMENTS.SENTENCE_END}'
+        fr'{FRAGMENTS.SENTENCE_ENDS}{FRAGMENTS.SENTENCE_BEGIN}{body_regex}{FRAGMENTS.SENTENCE_END}'
     )
 
     MK_IMPORT = lambda begin_regex: ''.join([
@@ -123,6 +151,28 @@ class SentenceMatchers:
         fr'{FRAGMENTS.DEFINITELY_FROM}Extra{FRAGMENTS.SPACES}Dependency{FRAGMENTS.SPACED_STUFF}'
     )
 
+    # v-- NOTE: for [re.search]: equivalent to [re.findall(FRAGMENTS.DEFINITELY_PROGRAM, ...)] being
+    #     non-empty (i.e. [Program] or some line with [#[...program...]]), but linear-time
+    MENTIONS_PROGRAM = re.compile(r'(?m)^(?>[^\n]*?#\[)(?>[^\n]*?program)[^\n]*?\]|Program')
+
+    # v-- NOTE: for [re.match]: these only match a prefix of the sentence
+    PROGRAM_PREFIX         = re.compile(FRAGMENTS.DEFINITELY_PROGRAM)
+    EQUATIONS_PREFIX       = re.compile(fr'{FRAGMENTS.SENTENCE_BEGIN}Equations')
+    NEXT_OBLIGATION_PREFIX = re.compile(''.join([
+        FRAGMENTS.MAYBE_SPACES,
+        fr'(Fail{FRAGMENTS.SPACES})?',
+        fr'Next{FRAGMENTS.SPACES}Obligation',
+    ]))
+    # v-- NOTE: for [re.match]: the [#[...]] attributes and [FRAGMENTS.MODIFIER]s which precede the
+    #     leading keyword of a sentence (cf. [SentenceKind])
+    HEAD = re.compile(''.join([
+        FRAGMENTS.MAYBE_SPACES,
+        fr'(?P<{GroupNames.HEAD_PREFIX_KEY}>',
+        fr'(#\[[^\]\n]*\]{FRAGMENTS.MAYBE_SPACES}|{FRAGMENTS.MODIFIER}{FRAGMENTS.SPACES})*',
+        ')',
+        fr'(?P<{GroupNames.HEAD_KEYWORD_KEY}>(\w|\.\w)+)?',
+    ]))
+
     DERIVE  = SENTENCE(fr'({FRAGMENTS.ONLY_SOMETHING}{FRAGMENTS.MAYBE_SPACES})?{FRAGMENTS.DERIVE}{FRAGMENTS.ANYTHING}')
 
     SET     = SENTENCE(fr'{FRAGMENTS.MAYBE_LOCALITY}Set{FRAGMENTS.SPACED_STUFF}')
@@ -165,8 +215,18 @@ class SentenceMatchers:
     CONTEXT = SENTENCE(fr'Context{FRAGMENTS.SPACED_STUFF}')
 
     PROOF_BEGIN    = SENTENCE(fr'{FRAGMENTS.PROOF_BEGIN}{FRAGMENTS.MAYBE_ANYTHING}')
-    PROOF_END      = SENTENCE(fr'{FRAGMENTS.MAYBE_ANYTHING}{FRAGMENTS.PROOF_END}')
-    PROOF_ONELINER = SENTENCE(fr'{FRAGMENTS.MAYBE_ANYTHING}{FRAGMENTS.PROOF_BEGIN}{FRAGMENTS.MAYBE_ANYTHING}{FRAGMENTS.PROOF_END}')
+    # /-- NOTE: [SENTENCE({MAYBE_ANYTHING}{PROOF_END})] and [SENTENCE({MAYBE_ANYTHING}{PROOF_BEGIN}...)]
+    # |   are quadratic (the whitespace runs on either side of [MAYBE_ANYTHING] overlap); these
+    # |   linear-time forms accept exactly the same sentences. For [PROOF_ONELINER] the first
+    # v   [PROOF_BEGIN_KEYWORD] admits every [PROOF_END_KEYWORD] which a later one does.
+    PROOF_END      = re.compile(''.join([
+        fr'^{FRAGMENTS.MAYBE_ANYTHING}',
+        fr'{FRAGMENTS.PROOF_END_KEYWORD}{FRAGMENTS.SENTENCE_END}',
+    ]))
+    PROOF_ONELINER = re.compile(''.join([
+        fr'^(?>{FRAGMENTS.MAYBE_ANYTHING}?{FRAGMENTS.PROOF_BEGIN_KEYWORD})',
+        fr'{FRAGMENTS.MAYBE_ANYTHING}{FRAGMENTS.PROOF_END_KEYWORD}{FRAGMENTS.SENTENCE_END}',
+    ]))
 
     SPECIFY        = SENTENCE(fr'{FRAGMENTS.SPECIFY}{FRAGMENTS.ANYTHING}')
     DEFINITION     = SENTENCE(fr'{FRAGMENTS.DEFINITION}{FRAGMENTS.ANYTHING}')
@@ -189,18 +249,25 @@ class SentenceMatchers:
     )
     UNREGISTER_HINTS = SENTENCE(fr'{FRAGMENTS.MAYBE_LOCALITY}Remove Hints{FRAGMENTS.SPACED_STUFF}')
 
+    # NOTE: a greedy [ARGS] which is followed by [\s*:] always ends right before a [:] (anything
+    # it leaves to the [\s*] it could have consumed itself), so [(?=:)] prunes the rest.
     LEMMA_SHAPE = lambda NM_PAT, ARGS_PAT, STMT_PAT: (''.join([
         fr'{FRAGMENTS.MAYBE_POLYMORPHIC}',
         fr'{FRAGMENTS.MAYBE_LOCALITY}',
-        fr'(Theorem|Lemma|Example|{FRAGMENTS.INTERACTIVE_INSTANCE}){FRAGMENTS.SPACES}',
+        # v-- NOTE: possessive, since a shorter run only leaves whitespace for an (empty) [NM]
+        fr'(Theorem|Lemma|Example|{FRAGMENTS.INTERACTIVE_INSTANCE})\s++',
         fr'(?P<{GroupNames.LEMMA_NM_KEY}>{NM_PAT})',
-        fr'(?P<{GroupNames.LEMMA_ARGS_KEY}>{ARGS_PAT})?{FRAGMENTS.MAYBE_SPACES}',
+        fr'(?P<{GroupNames.LEMMA_ARGS_KEY}>{ARGS_PAT}(?=:))?{FRAGMENTS.MAYBE_SPACES}',
         fr':{FRAGMENTS.MAYBE_SPACES}(?P<{GroupNames.LEMMA_STMT_KEY}>{STMT_PAT})',
     ]))
+    # v-- NOTE: [NM] is the longest word prefix which is followed by a [VIABLE_COLON] (possibly after
+    #     [ARGS]); this is [(\S+|)] without backtracking through the word one character at a time.
     ANY_LEMMA = SENTENCE(LEMMA_SHAPE(
         ''.join([
             '(',
-            FRAGMENTS.NON_SPACES,
+            fr'(?>{FRAGMENTS.NON_SPACES})(?={FRAGMENTS.MAYBE_ANYTHING}{FRAGMENTS.VIABLE_COLON})',
+            '|',
+            FRAGMENTS.NON_SPACES_THEN(FRAGMENTS.VIABLE_COLON),
             '|)',
         ]),
         FRAGMENTS.ANYTHING,
@@ -225,10 +292,33 @@ class SentenceMatchers:
     ANY_ANONYMOUS_INSTANCE_SHAPE = lambda ARGS_PAT, STMT_PAT: (''.join([
         fr'{FRAGMENTS.MAYBE_POLYMORPHIC}',
         fr'{FRAGMENTS.MAYBE_LOCALITY}',
-        fr'{FRAGMENTS.INTERACTIVE_INSTANCE}{FRAGMENTS.MAYBE_SPACES}',
-        fr'(?P<{GroupNames.ANON_INSTANCE_ARGS_KEY}>{ARGS_PAT})?{FRAGMENTS.MAYBE_SPACES}',
+        # v-- NOTE: possessive, since starting [ARGS] within the whitespace can't reach another [:]
+        fr'{FRAGMENTS.INTERACTIVE_INSTANCE}\s*+',
+        fr'(?P<{GroupNames.ANON_INSTANCE_ARGS_KEY}>{ARGS_PAT}(?=:))?{FRAGMENTS.MAYBE_SPACES}',
         fr':{FRAGMENTS.MAYBE_SPACES}(?P<{GroupNames.ANON_INSTANCE_STMT_KEY}>{STMT_PAT})',
     ]))
     ANY_ANONYMOUS_INSTANCE = SENTENCE(
         ANY_ANONYMOUS_INSTANCE_SHAPE(FRAGMENTS.ANYTHING, FRAGMENTS.ANYTHING)
     )
+
+# The named matchers, i.e. for reporting (cf. [coq_policy.MatcherStats]): every pattern of
+# [SentenceMatchers] is registered as [SentenceMatchers.NAME], and the modules which build their
+# own patterns (i.e. [linter.CTX_KEYWORDS]) [register_matcher] them.
+#
+# v-- [id(matcher) -> (name, matcher)]
+MATCHER_REGISTRY = {}
+
+def register_matcher(name, matcher):
+    MATCHER_REGISTRY[id(matcher)] = (name, matcher)
+    return matcher
+
+# v-- the registered name of [matcher], or [None]
+def matcher_name(matcher):
+    entry = MATCHER_REGISTRY.get(id(matcher))
+    return entry[0] if entry is not None and entry[1] is matcher else None
+
+for name, matcher in list(vars(SentenceMatchers).items()):
+    # v-- NOTE: an alias keeps the name under which the matcher was first defined
+    if isinstance(matcher, re.Pattern) and matcher_name(matcher) is None:
+        register_matcher(f'SentenceMatchers.{name}', matcher)
+del name, matcher
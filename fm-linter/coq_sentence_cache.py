@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2023 BlueRock Security, Inc.
+from array import array
+from bisect import bisect_right
+import hashlib
+import os
+import sys
+import tempfile
+import zlib
+from coq_sentence_parser import PARSER_VERSION, SentenceParser
+
+# On-disk cache of the span streams produced by [SentenceParser.get_next_span] (cf. the
+# description of spans in [coq_sentence_parser.py]), keyed by the sha256 of the file contents
+# and [PARSER_VERSION].
+#
+# Each entry is a single file in [<cache dir>/<key[:2]>/<key>.spans]:
+# - [SPAN_CACHE_MAGIC]
+# - a zlib-compressed little-endian array of unsigned 64-bit integers:
+#   [n_spans, (start, body_start, end, resume, flags, n_comments, (comment_start, comment_end)*)*]
+#   where [resume] is the offset at which the parser resumes after the span (cf. [SentenceParser.offset])
+#
+# NOTES:
+# - entries are written to a temporary file which is then [os.replace]d into place, so concurrent
+#   writers (which necessarily write identical contents for a key) never expose a partial entry.
+# - the modification time of an entry records its last use; once the cache grows past [max_bytes]
+#   the least recently used entries are evicted.
+# - only complete span streams are stored; files which fail to parse are always re-parsed.
+SPAN_CACHE_MAGIC = b'CQSPAN\x00\x01'
+SPAN_FLAG_NESTED_COMMENT = 1
+# v-- the [NOLINT_*] flags of the span (cf. [coq_sentence_parser.py]) are stored above this flag
+SPAN_FLAG_NOLINT_SHIFT   = 1
+
+# A [SentenceParser] which replays a cached span stream instead of lexing [buffer].
+class ReplayingSentenceParser(SentenceParser):
+    def __init__(self, buffer, spans, resumes):
+        super().__init__(buffer)
+        self._spans = spans
+        self._resumes = resumes
+        self._index = 0
+
+    def seek(self, offset):
+        # v-- [offset] is a sentence boundary, i.e. [0] or the [resume] of some span
+        self._pos = offset
+        self._index = bisect_right(self._resumes, offset)
+
+    def get_next_span(self):
+        if self._index == len(self._spans):
+            self._pos = len(self._buffer.data())
+            return None
+        span = self._spans[self._index]
+        self._pos = self._resumes[self._index]
+        self._index += 1
+        return span
+
+# A [SentenceParser] which stores its span stream in [span_cache] once the end of the buffer
+# is reached.
+class RecordingSentenceParser(SentenceParser):
+    def __init__(self, buffer, span_cache, key):
+        super().__init__(buffer)
+        self._span_cache = span_cache
+        self._key = key
+        self._recorded = []
+
+    def seek(self, offset):
+        super().seek(offset)
+        # v-- NOTE: only streams lexed from the beginning are recorded
+        self._recorded = None
+
+    def get_next_span(self):
+        span = super().get_next_span()
+        if self._recorded is not None:
+            if span:
+                self._recorded.append((span, self._pos))
+            else:
+                self._span_cache.put(self._key, self._recorded)
+                self._recorded = None
+        return span
+
+# A directory of entries - one file per key, in [<cache dir>/<key[:2]>/<key><SUFFIX>] - which are
+# written atomically and evicted least recently used first once the directory grows past
+# [max_bytes] (cf. the notes on [SPAN_CACHE_MAGIC]).
+class DiskCache:
+    SUFFIX = None
+
+    def __init__(self, cache_dir, max_bytes=256 << 20):
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        # v-- estimate of the size of the cache directory (computed lazily)
+        self._approximate_size = None
+        self.hits = 0
+        self.misses = 0
+
+    def _path_for(self, key):
+        return os.path.join(self._cache_dir, key[:2], key + self.SUFFIX)
+
+    # v-- the contents of the entry for [key] (or [None] if there is none)
+    def _read(self, key):
+        path = self._path_for(key)
+        try:
+            with open(path, 'rb') as f:
+                contents = f.read()
+            # v-- record the access for LRU eviction
+            os.utime(path)
+        except OSError:
+            return None
+        return contents
+
+    def _write(self, key, contents):
+        path = self._path_for(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(contents)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            # v-- NOTE: the cache is best-effort; failing to store an entry only costs a recomputation
+            return
+
+        if self._approximate_size is None:
+            self._approximate_size = self._directory_size()
+        else:
+            self._approximate_size += len(contents)
+        if self._approximate_size > self._max_bytes:
+            self.evict()
+
+    def _entries(self):
+        entries = []
+        try:
+            shards = list(os.scandir(self._cache_dir))
+        except OSError:
+            return entries
+
+        for shard in shards:
+            if not shard.is_dir(): continue
+            try:
+                for entry in os.scandir(shard.path):
+                    if not entry.name.endswith(self.SUFFIX): continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        # v-- evicted concurrently
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except OSError:
+                continue
+        return entries
+
+    def _directory_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    # Evict the least recently used entries until the cache is below 90% of [max_bytes].
+    def evict(self):
+        entries = sorted(self._entries())
+        size = sum(size for _, size, _ in entries)
+        target = self._max_bytes * 9 // 10
+        for _, entry_size, path in entries:
+            if size <= target: break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            size -= entry_size
+        self._approximate_size = size
+
+class SpanCache(DiskCache):
+    SUFFIX = '.spans'
+
+    def key_for(buffer):
+        digest = hashlib.sha256(buffer.data()).hexdigest()
+        return f'{digest}-v{PARSER_VERSION}'
+
+    # A [SentenceParser] for [buffer] which is backed by this cache.
+    def parser_for(self, buffer):
+        key = SpanCache.key_for(buffer)
+        cached = self.get(key)
+        if cached is None:
+            self.misses += 1
+            return RecordingSentenceParser(buffer, self, key)
+
+        self.hits += 1
+        spans, resumes = cached
+        return ReplayingSentenceParser(buffer, spans, resumes)
+
+    def get(self, key):
+        contents = self._read(key)
+        if contents is None or not contents.startswith(SPAN_CACHE_MAGIC):
+            return None
+        try:
+            values = array('Q', zlib.decompress(contents[len(SPAN_CACHE_MAGIC):]))
+        except (zlib.error, ValueError):
+            return None
+        if sys.byteorder != 'little':
+            values.byteswap()
+
+        spans = []
+        resumes = []
+        try:
+            it = iter(values.tolist())
+            for _ in range(next(it)):
+                start, body_start, end, resume, flags, n_comments = (
+                    next(it), next(it), next(it), next(it), next(it), next(it)
+                )
+                comments = [(next(it), next(it)) for _ in range(n_comments)]
+                spans.append((
+                    start,
+                    body_start,
+                    end,
+                    comments,
+                    bool(flags & SPAN_FLAG_NESTED_COMMENT),
+                    flags >> SPAN_FLAG_NOLINT_SHIFT,
+                ))
+                resumes.append(resume)
+        except StopIteration:
+            # v-- a corrupt entry is treated as a miss
+            return None
+        return spans, resumes
+
+    # Store [recorded] - a list of [(span, resume)] pairs - for [key].
+    def put(self, key, recorded):
+        values = array('Q', [len(recorded)])
+        for (start, body_start, end, comments, nested_comment, nolint), resume in recorded:
+            flags = (
+                  (SPAN_FLAG_NESTED_COMMENT if nested_comment else 0)
+                | (nolint << SPAN_FLAG_NOLINT_SHIFT)
+            )
+            values.extend((start, body_start, end, resume, flags, len(comments)))
+            for comment_start, comment_end in comments:
+                values.extend((comment_start, comment_end))
+        if sys.byteorder != 'little':
+            values.byteswap()
+        contents = SPAN_CACHE_MAGIC + zlib.compress(values.tobytes(), 1)
+        self._write(key, contents)
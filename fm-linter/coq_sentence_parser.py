@@ -1,193 +1,405 @@
 #!/usr/bin/env python3
 
 # Copyright (c) 2023 BlueRock Security, Inc.
-from collections import deque
+from bisect import bisect_right
+import mmap
+import os
 from coq_regexes import *
 
 # TODO: use serapi/coq-lsp/etc... instead of a custom python script
 # Rodolphe: Coq bug minimizer - which splits things into sentences
 
-# [SentenceParser(f)] holds a handle to file [f] and exposes [get_next_sentence()] for stepping
-# sequentially through the file.
+# v-- NOTE: bump whenever a change to the lexer changes the spans it produces (this invalidates
+#     the entries of [coq_sentence_cache.SpanCache])
+PARSER_VERSION = 2
+
+# v-- a comment containing this marker disables linting of the sentence which follows it
+NOLINT_MARKER = b'[[NOLINT]]'
+# v-- the sentences which begin between comments containing these markers aren't linted at all,
+#     except for their context transitions (cf. [LintSession._lint_sentences])
+NOLINT_BEGIN_MARKER = b'[[NOLINT-BEGIN]]'
+NOLINT_END_MARKER   = b'[[NOLINT-END]]'
+# v-- a comment before the first sentence containing this marker disables linting of the file
+NOLINT_FILE_MARKER  = b'[[NOLINT-FILE]]'
+# v-- the common prefix of the markers
+NOLINT_MARKER_PREFIX = b'[[NOLINT'
+
+# v-- the [nolint] flags of a span (cf. [SentenceParser]); the [REGION] flags record the last
+#     region marker among the comments before/after the beginning of the sentence proper
+NOLINT_SENTENCE           = 1
+NOLINT_REGION_BEGIN       = 2
+NOLINT_REGION_END         = 4
+NOLINT_REGION_BEGIN_AFTER = 8
+NOLINT_REGION_END_AFTER   = 16
+NOLINT_REGION_BEFORE = NOLINT_REGION_BEGIN | NOLINT_REGION_END
+NOLINT_REGION_AFTER  = NOLINT_REGION_BEGIN_AFTER | NOLINT_REGION_END_AFTER
+
+# v-- files at least this large are [mmap]ed rather than read into memory
+MMAP_THRESHOLD = 1 << 20
+
+# The contents of a single file - read once (or [mmap]ed) as UTF-8 bytes - together with an
+# index of line-start offsets. Offsets into the buffer are byte offsets; text is only decoded
+# when a slice is explicitly requested.
 #
-# NOTE: [f.close()] will be invoked when the end of the file is reached; [close()] is idempotent
-# so this is compatible with a caller using [with open(...) as f:]
+# NOTES:
+# - the lexer only looks for ASCII delimiters, which never occur within multi-byte UTF-8
+#   sequences, so lexing the raw bytes is safe.
+# - a buffer is a context manager which [close()]s it on exit; [close()] is idempotent.
+class SourceBuffer:
+    def __init__(self, data, name):
+        self._data = data
+        self._name = name
+        self._line_starts = None
+
+    def from_file(f):
+        name = f.name
+        try:
+            size = os.fstat(f.fileno()).st_size
+        except (AttributeError, OSError):
+            size = 0
+
+        if size >= MMAP_THRESHOLD:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        elif hasattr(f, 'buffer'):
+            data = f.buffer.read()
+        else:
+            data = f.read().encode('UTF-8')
+        f.close()
+
+        return SourceBuffer(data, name)
+
+    def from_text(text, name='<buffer>'):
+        return SourceBuffer(text.encode('UTF-8'), name)
+
+    def name(self): return self._name
+    def data(self): return self._data
+
+    def __len__(self): return len(self._data)
+
+    # v-- releases the [mmap] (if any); the buffer can't be used afterwards
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc_info): self.close()
+
+    # v-- [line_starts[i]] is the offset of the first byte of line [i + 1]
+    def line_starts(self):
+        if self._line_starts is None:
+            self._line_starts = [0]
+            self._line_starts.extend(match.end() for match in re.finditer(b'\n', self._data))
+        return self._line_starts
+
+    def lineno(self, offset):
+        return bisect_right(self.line_starts(), offset)
+
+    def text(self, start, end):
+        return self._data[start:end].decode('UTF-8')
+
+# The lexer is a small state machine (code -> comment/string -> code) which makes a single
+# left-to-right pass over the file. Rather than stepping character-by-character in python it
+# jumps between the only characters which can cause a state transition using these regexes.
+class LEXEMES:
+    # NOTE: a [.] only ends a sentence when it is followed by whitespace (or EOF, or a comment);
+    # this excludes qualified names ([bar.baz]) and recursive notations ([x .. y]).
+    CODE_EVENT      = re.compile(rb'\(\*|\*\)|"|(?<!\.)\.(?=\s|\(\*|\Z)')
+    COMMENT_EVENT   = re.compile(rb'\(\*|\*\)|"')
+    WHITESPACE      = re.compile(rb'\s*')
+    LINE_WHITESPACE = re.compile(rb'[ \t]*')
+    # v-- proof selectors which can prefix a sentence: bullets, braces and [<goal selector>: {]
+    SELECTOR        = re.compile(b''.join([
+        rb'-+|\++|\*+(?!\))|[{}]|',
+        rb'(\d+(\s*-\s*\d+)?(\s*,\s*\d+(\s*-\s*\d+)?)*|\[\s*[^\]\s]+\s*\]|all|!)\s*:\s*\{',
+    ]))
+
+# A single sentence, stored as offsets into its [SourceBuffer]: the sentence text and the
+# text of its comments are only materialised on demand.
+#
+# NOTE: [start] already accounts for proof selectors (cf. [SentenceParser.get_next_sentence]).
+class Sentence:
+    __slots__ = (
+        'buffer',
+        'start',
+        'end',
+        'comments',
+        'starting_lineno',
+        'ending_lineno',
+        'nested_comment',
+        'nolint',
+        '_text',
+    )
+
+    def __init__(self, buffer, span, inside_interactive_proof=False):
+        start, body_start, end, comments, nested_comment, nolint = span
+
+        self.buffer          = buffer
+        self.start           = body_start if inside_interactive_proof else start
+        self.end             = end
+        self.comments        = comments
+        self.starting_lineno = buffer.lineno(self.start)
+        self.ending_lineno   = buffer.lineno(end - 1)
+        self.nested_comment  = nested_comment
+        self.nolint          = nolint
+        self._text           = None
+
+    # The sentence text which is handed to the [SentenceMatchers]: comments are erased and
+    # (for multi-line sentences) blank lines are dropped and trailing whitespace is stripped.
+    def text(self):
+        if self._text is None:
+            self._text = Sentence.text_of(self.buffer, self.start, self.end, self.comments)
+        return self._text
+
+    # NOTES:
+    # - comments outside of [start, end) are ignored.
+    # - whatever precedes [start] on its line (indentation, proof selectors, ...) is kept as spaces
+    #   so that the lines of a multi-line sentence stay aligned.
+    def text_of(buffer, start, end, comments):
+        line_start = buffer.line_starts()[buffer.lineno(start) - 1]
+        pieces = [' ' * len(buffer.text(line_start, start))]
+        pos = start
+        for comment_start, comment_end in comments:
+            if comment_start < start: continue
+            if end <= comment_start: break
+            pieces.append(buffer.text(pos, comment_start))
+            pieces.append('\n'.join(
+                ' ' * len(comment_line)
+                for comment_line in buffer.text(comment_start, comment_end).split('\n')
+            ))
+            pos = comment_end
+        pieces.append(buffer.text(pos, end))
+        sentence = ''.join(pieces)
+
+        if '\n' in sentence:
+            sentence = '\n'.join(
+                line.rstrip()
+                for line in sentence.split('\n')
+                if line and not line.isspace()
+            )
+        return sentence
+
+    # The (unmodified) text of the comments erased before/within the sentence.
+    def comment_snippets(self):
+        return [
+            self.buffer.text(comment_start, comment_end)
+            for comment_start, comment_end in self.comments
+        ]
+
+# [SentenceParser(f)] reads file [f] into a [SourceBuffer] and exposes [get_next_sentence()] for
+# stepping sequentially through its [Sentence]s; [get_next_span()]/[spans()] expose the same sentences
+# as offsets into the buffer without decoding any text.
+#
+# A span is a sextuple [(start, body_start, end, comments, nested_comment, nolint)]:
+# - [start, end) covers the sentence (including the terminating [.]) and any proof selectors
+#   (bullets/braces) which precede it; the sentence proper begins at [body_start]
+# - [comments] lists the [(start, end)] offsets of the comments erased before/within the sentence
+# - [nested_comment] records whether any of those comments contained a nested comment
+# - [nolint] holds the [NOLINT_*] flags of the markers within those comments: whether any of them
+#   contained [NOLINT_MARKER], and the last region marker before and after [body_start]
+#
+# NOTES:
+# - [f.close()] is invoked once the contents are read; [close()] is idempotent so this is
+#   compatible with a caller using [with open(...) as f:]
+# - comments are tracked with a depth counter so nested comments are handled, and strings are
+#   tracked (both in code and in comments, as [coqc] does) so that comment delimiters within
+#   strings are ignored.
+# - the lexer is context-free: proof selectors are always recognized, and are only stripped from
+#   the returned sentence if [inside_interactive_proof] is set.
 class SentenceParser:
     def __init__(self, f):
-        self._lineno = 0
-        self._comment_depth = 0
-        self._file = f
-        self._filename = f.name
-
-    # strip:
-    # - ALWAYS: trailing whitespace
-    # - INSIDE AN INTERACTIVE PROOF: proof selectors, including:
-    #   + leading/trailing curly braces
-    #   + leading sequences of [-]/[+]/[*]
-    def coq_rstrip(line, inside_interactive_proof=False):
-        if inside_interactive_proof:
-            def replace_match_with_spaces(match):
-                return ' ' * len(match.group(0))
-
-            # first, attempt to remove leading sequences of [-]/[+]/[*]
-            line = re.sub(FRAGMENTS.SENTENCE_BEGIN + fr'-+',  replace_match_with_spaces, line)
-            line = re.sub(FRAGMENTS.SENTENCE_BEGIN + fr'\++', replace_match_with_spaces, line)
-            line = re.sub(FRAGMENTS.SENTENCE_BEGIN + fr'\*+', replace_match_with_spaces, line)
-
-            # then, attempt to remove leading/trailing curly braces
-            line = re.sub(r'^\s*[{}\s]+', replace_match_with_spaces, line)
-            line = re.sub(r'[{}\s]+\s*$', replace_match_with_spaces, line)
-
-        # finally, return the [rstrip()]ped line
-        return line.rstrip()
-
-    # Skip all whitespace/comments/proof-body organization and return a triple containing the next
-    # ([rstrip()]ped) line and its line number - in addition to a list of all of the stripped comments
-    # preceeding/within the sentence.
+        self._buffer = f if isinstance(f, SourceBuffer) else SourceBuffer.from_file(f)
+        self._filename = self._buffer.name()
+        self._pos = 0
+
+    def buffer(self): return self._buffer
+
+    # NOTE: [offset()] is always a sentence boundary, so lexing can be resumed from any offset
+    # previously returned by it (cf. [CoqLinter.relint]).
+    def offset(self): return self._pos
+    def seek(self, offset): self._pos = offset
+
+    def _error(self, start, end, msg):
+        return RuntimeError(f'[{self._filename}#{start}-{end}]: {msg}')
+
+    # Return the offset just past the string which begins (with ["]) at [begin]; [""] is an
+    # escaped double-quote.
+    def _skip_string(self, begin):
+        data = self._buffer.data()
+        pos = begin + 1
+        while True:
+            end = data.find(b'"', pos)
+            if end == -1:
+                raise self._error(begin, len(data), 'unterminated string')
+            if data[end+1:end+2] == b'"':
+                pos = end + 2
+                continue
+            return end + 1
+
+    # Return the offset just past the comment which begins (with [(*]) at [begin], and whether
+    # the comment contains a nested comment.
+    def _skip_comment(self, begin):
+        data = self._buffer.data()
+        depth = 1
+        nested = False
+        pos = begin + 2
+        while True:
+            match = LEXEMES.COMMENT_EVENT.search(data, pos)
+            if not match:
+                raise self._error(begin, len(data), 'unbalanced [(*]')
+
+            event = match.group()
+            if event == b'"':
+                pos = self._skip_string(match.start())
+                continue
+            elif event == b'(*':
+                depth += 1
+                nested = True
+            else:
+                depth -= 1
+                if depth == 0:
+                    return match.end(), nested
+            pos = match.end()
+
+    # Skip the comment which begins at [begin] and record its span in [comments]; returns the offset
+    # just past the comment, whether it contains a nested comment and the [NOLINT_*] flags of the
+    # markers it contains (with the region flags of [NOLINT_REGION_BEFORE]).
+    def _take_comment(self, begin, comments):
+        end, nested = self._skip_comment(begin)
+        comments.append((begin, end))
+        return end, nested, self._markers(begin, end)
+
+    def _markers(self, begin, end):
+        data = self._buffer.data()
+        flags = 0
+        pos = data.find(NOLINT_MARKER_PREFIX, begin, end)
+        while pos != -1:
+            if data.startswith(NOLINT_MARKER, pos):
+                flags |= NOLINT_SENTENCE
+            elif data.startswith(NOLINT_BEGIN_MARKER, pos):
+                flags = (flags & ~NOLINT_REGION_BEFORE) | NOLINT_REGION_BEGIN
+            elif data.startswith(NOLINT_END_MARKER, pos):
+                flags = (flags & ~NOLINT_REGION_BEFORE) | NOLINT_REGION_END
+            pos = data.find(NOLINT_MARKER_PREFIX, pos + 1, end)
+        return flags
+
+    # Combine the [NOLINT_*] flags of a span with those of a later comment ([after] [body_start]).
+    def _add_markers(nolint, markers, after=False):
+        region = markers & NOLINT_REGION_BEFORE
+        if region:
+            if after:
+                nolint = (nolint & ~NOLINT_REGION_AFTER) | (region << 2)
+            else:
+                nolint = (nolint & ~NOLINT_REGION_BEFORE) | region
+        return nolint | (markers & ~NOLINT_REGION_BEFORE)
+
+    # Return the next span (cf. above), or [None] at the end of the buffer.
     #
-    # NOTES:
-    # - [f] is left at the beginning of the very next line (i.e. line number + 1).
-    # - [coqc] ensures that comment delimiters are properly balanced so we can rely on a
-    #   simple stack to accurately skip toplevel comments; comments which are nested within
-    #   sentences will should not impact the other matching logic.
-    def get_next_line_and_stripped_comments(self, inside_interactive_proof=False):
-        comment_snippets = list()
+    # NOTE: comments which begin on the same line as the [.] that ends a sentence are attributed
+    # to that sentence; all other comments are attributed to the sentence which follows them.
+    def get_next_span(self):
+        data = self._buffer.data()
+        size = len(data)
+        pos = self._pos
+        comments = []
+        nested_comment = False
+        nolint = 0
 
+        # 1) skip whitespace, comments and proof selectors
+        start = None
         while True:
-            self._lineno += 1
-            line = self._file.readline()
-
-            if not line:
-                if self._comment_depth != 0:
-                    raise RuntimeError(
-                        f'[{self._file.name}]: unbalanced [(*]'
-                    )
-                self._file.close()
+            pos = LEXEMES.WHITESPACE.match(data, pos).end()
+            if pos == size:
+                # v-- NOTE: dangling proof selectors (i.e. a final [}]) are dropped
+                self._pos = pos
                 return None
 
-            # Search for begin/end double-quotes in this line and use pairs to prune comment delimiters
-            # which appear within those strings.
-            #
-            # NOTES:
-            # - doesn't account for multi-line strings (i.e. ignores a single double-quote)
-            # - doesn't handle double-quotes included in strings (i.e. by [""] in Coq)
-            double_quotes = list(re.finditer('(?<!")"(?!")', line))
-            prune_comment_delimiters_in_string = len(double_quotes) != 0 and len(double_quotes) % 2 == 0
-            if prune_comment_delimiters_in_string:
-                double_quotes.sort(key=lambda match: match.start())
-                string_quotes = list(zip(double_quotes[::2], double_quotes[1::2]))
-
-            # Search for begin/end comments in this line and replace the portions of the line which
-            # are within those comments by [' '] (space character).
-            comment_start_delimiters = list(re.finditer(FRAGMENTS.BEGIN_COMMENT, line))
-            comment_end_delimiters   = list(re.finditer(FRAGMENTS.END_COMMENT, line))
-            comment_delimiters = (
-                list(zip(comment_start_delimiters, [True] * len(comment_start_delimiters))) +
-                list(zip(comment_end_delimiters, [False] * len(comment_end_delimiters)))
-            )
-            # prune comment delimiters which "look like" they are part of a string
-            if prune_comment_delimiters_in_string:
-                def delimiter_not_in_string(info):
-                    info_start, info_end = info[0].start(), info[0].end()
+            lookahead = data[pos:pos+2]
+            if lookahead == b'(*':
+                comment_end, nested, markers = self._take_comment(pos, comments)
+                nested_comment = nested_comment or nested
+                if markers: nolint = SentenceParser._add_markers(nolint, markers)
+                pos = comment_end
+                continue
+            elif lookahead == b'*)':
+                raise self._error(pos, pos + 2, 'unbalanced [*)]')
 
-                    for start_quote, end_quote in string_quotes:
-                        if info_start >= start_quote.end() and info_end < end_quote.start():
-                            return False
+            selector_match = LEXEMES.SELECTOR.match(data, pos)
+            if not selector_match: break
 
-                    return True
+            if start is None: start = pos
+            pos = selector_match.end()
 
-                comment_delimiters = list(filter(delimiter_not_in_string, comment_delimiters))
-            comment_delimiters.sort(key=lambda info: info[0].start())
+        body_start = pos
+        if start is None: start = body_start
 
-            # /-- If this line contains no comment delimiters but we're still inside of a
-            # v   comment then we simply skip the line
-            if not comment_delimiters and self._comment_depth != 0:
-                comment_snippets.append(line)
-                continue
+        # 2) scan the sentence body (skipping comments and strings) until a terminating [.]
+        while True:
+            match = LEXEMES.CODE_EVENT.search(data, pos)
+            if not match:
+                raise self._error(
+                    start, size,
+                    ' '.join([
+                        f'(line {self._buffer.lineno(start)})',
+                        'end of file reached with an unterminated sentence:',
+                        self._buffer.text(start, min(size, start + 80)),
+                    ])
+                )
+
+            event = match.group()
+            if event == b'(*':
+                comment_end, nested, markers = self._take_comment(match.start(), comments)
+                nested_comment = nested_comment or nested
+                if markers: nolint = SentenceParser._add_markers(nolint, markers, after=True)
+                pos = comment_end
+            elif event == b'"':
+                pos = self._skip_string(match.start())
+            elif event == b'*)':
+                raise self._error(match.start(), match.end(), 'unbalanced [*)]')
+            else:
+                end = match.end()
+                break
+
+        # 3) attribute comments which begin on the same line as the terminating [.]
+        pos = end
+        while True:
+            comment_start = LEXEMES.LINE_WHITESPACE.match(data, pos).end()
+            if data[comment_start:comment_start+2] != b'(*': break
+
+            comment_end, nested, markers = self._take_comment(comment_start, comments)
+            nested_comment = nested_comment or nested
+            if markers: nolint = SentenceParser._add_markers(nolint, markers, after=True)
+            pos = comment_end
+        self._pos = pos
+
+        return (start, body_start, end, comments, nested_comment, nolint)
 
-            comment_start_delimiter_lifo = deque()
-            for match, is_start_delimiter in comment_delimiters:
-                # /-- Accumulate a LIFO of comment start delimiters which can be used to cancel
-                # v   comment end delimiters as they appear
-                if is_start_delimiter:
-                    self._comment_depth += 1
-                    comment_start_delimiter_lifo.appendleft(match)
-                else:
-                    self._comment_depth -= 1
-                    if self._comment_depth < 0:
-                        raise RuntimeError(
-                            f'[{self._file.name}#{match.start()}-{match.end()}]: unbalanced [*)]: {line}'
-                        )
-
-                    # Either the /entire/ prefix of [line] is part of a comment or /a suffix/
-                    # of the prefix (bounded by [start_delimiter_lifo.popleft().start()]) is
-                    # part of a comment.
-                    if not comment_start_delimiter_lifo:
-                        match_start = 0
-                    else:
-                        if self._comment_depth == 0:
-                            match_start = comment_start_delimiter_lifo.popleft().start()
-                        else:
-                            match_start = 0
-                    comment_snippets.append(line[match_start:match.end()])
-                    line = (
-                        line[:match_start] +
-                        (' ' * (match.end() - match_start)) +
-                        line[match.end():]
-                    )
-
-            # Some comment-start delimiter is not matched with an end delimiter which means
-            # the suffix of [line] is part of a comment.
-            #
-            # NOTE: Take the outermost [re.Matcher] by popping from the back of the LIFO.
-            if comment_start_delimiter_lifo:
-                match_start = comment_start_delimiter_lifo.pop().start()
-                comment_snippets.append(line[match_start:])
-                line = line[:match_start] + (' ' * (len(line) - match_start))
-
-            stripped_line = SentenceParser.coq_rstrip(line, inside_interactive_proof=inside_interactive_proof)
-            # v-- The line only consisted of whitespace and/or comments
-            if not stripped_line: continue
-
-            # NOTE: the parser can sometimes mess up when nested comments are encountered - including
-            # part of the comment in in the following sentence. Therefore, if we detect any nested
-            # delimiters in the [comment_snippets] we return additional information to the caller
-            candidate_comment_snippets = comment_snippets[1:len(comment_snippets)-1]
-            comment_snippets_might_contain_nested_comment = bool(candidate_comment_snippets and any(map(
-                lambda comment_snippet: (
-                       re.match(FRAGMENTS.BEGIN_COMMENT, comment_snippet)
-                    or re.match(FRAGMENTS.END_COMMENT, comment_snippet)
-                ),
-                candidate_comment_snippets
-            )))
-
-            # print('-----------------------------')
-            # print(comment_snippets)
-
-            return (stripped_line, self._lineno, comment_snippets, comment_snippets_might_contain_nested_comment)
-
-    # Return a quadruple containing the next sentence and its start/end line numbers - followed by
-    # the list of comment snippets erased before/within the sentence.
+    # Whether a comment before the first sentence contains [NOLINT_FILE_MARKER]; only the
+    # leading comments of the buffer are lexed.
+    def nolint_file(self):
+        data = self._buffer.data()
+        pos = 0
+        try:
+            while True:
+                pos = LEXEMES.WHITESPACE.match(data, pos).end()
+                if data[pos:pos+2] != b'(*': return False
+
+                comment_end, _ = self._skip_comment(pos)
+                if data.find(NOLINT_FILE_MARKER, pos, comment_end) != -1: return True
+                pos = comment_end
+        except RuntimeError:
+            # v-- NOTE: the error is reported when the buffer is linted
+            return False
+
+    def spans(self):
+        while True:
+            span = self.get_next_span()
+            if not span: return
+            yield span
+
+    # Return the next [Sentence], or [None] at the end of the buffer.
     #
-    # NOTE: [f] is left at the beginning of the very next line (i.e. end line number + 1).
+    # NOTE: any proof selectors which precede the sentence are stripped if [inside_interactive_proof].
     def get_next_sentence(self, inside_interactive_proof=False):
-        result = self.get_next_line_and_stripped_comments(inside_interactive_proof=inside_interactive_proof)
-        if not result: return None
-        line, starting_lineno, comment_snippets, comment_snippets_might_contain_nested_comment = result
-        ending_lineno = starting_lineno
-
-        while not re.search(FRAGMENTS.SENTENCE_END, line):
-            result = self.get_next_line_and_stripped_comments(inside_interactive_proof=inside_interactive_proof)
-            if not result:
-                raise RuntimeError(
-                    f'[{self._filename}#{starting_lineno}-{ending_lineno}]: end of file reached with an unterminated sentence: {line}'
-                )
-            new_line, ending_lineno, new_comment_snippets, new_comment_snippets_might_contain_nested_comment = result
-            comment_snippets_might_contain_nested_comment = (
-                   comment_snippets_might_contain_nested_comment
-                or new_comment_snippets_might_contain_nested_comment
-            )
-            comment_snippets.extend(new_comment_snippets)
-            line += '\n' + new_line
-
-        return (line, starting_lineno, ending_lineno, comment_snippets, comment_snippets_might_contain_nested_comment)
+        span = self.get_next_span()
+        if not span: return None
+        return Sentence(self._buffer, span, inside_interactive_proof=inside_interactive_proof)
@@ -1,9 +1,19 @@
 #!/usr/bin/env python3
 
 # Copyright (c) 2023 BlueRock Security, Inc.
-from collections import deque
+from bisect import bisect_right
+from collections import OrderedDict, deque, namedtuple
+from types import MappingProxyType
+import multiprocessing
+import signal
+import threading
+import time
+from coq_policy import DENY, MATCHER_STATS, DecisionTable, describe_matcher, policy_fingerprint
+from coq_prefilter import LiteralIndex
 from coq_regexes import *
-from coq_sentence_parser import SentenceParser
+from coq_sentence_parser import LEXEMES, Sentence, SentenceParser, SourceBuffer
+from coq_sentence_parser import NOLINT_SENTENCE, NOLINT_REGION_BEGIN, NOLINT_REGION_END
+from coq_sentence_parser import NOLINT_REGION_BEGIN_AFTER, NOLINT_REGION_END_AFTER, NOLINT_REGION_BEFORE, NOLINT_REGION_AFTER
 from linter_util import *
 from util import *
 
@@ -13,33 +23,633 @@ class RuntimeError_PartialLint(RuntimeError):
         self.partial_linting_errors = partial_linting_errors
         self.parsing_issue = parsing_issue
 
+    # v-- NOTE: raised within the worker processes of [coq_lint.lint_coq_files] (and pickled)
+    def __reduce__(self):
+        return (RuntimeError_PartialLint, (self.args[0], self.partial_linting_errors, self.parsing_issue))
+
+class RuntimeError_SentenceTimeout(RuntimeError): pass
+
+# v-- default time budget (in seconds) for matching a single sentence (cf. [SentenceWatchdog])
+SENTENCE_TIMEOUT = 5.0
+
+# Interrupts the matching of a sentence - i.e. the code between [arm()] and [disarm()] - which
+# runs for longer than [timeout] seconds by raising [RuntimeError_SentenceTimeout].
+#
+# NOTES:
+# - [re] checks for signals while matching, so [SIGALRM] interrupts a backtracking regex; the
+#   [SentenceMatchers] are linear-time but policies may contain arbitrary regexes
+# - rather than re-arming a timer for every sentence, a single periodic [SIGALRM] fires every
+#   [timeout] seconds and the sentence is interrupted if it was already running at the previous
+#   alarm, so a runaway sentence is interrupted after between [timeout] and [2 * timeout] seconds
+# - signal handlers can only be installed from the main thread (and [setitimer] is unavailable
+#   on some platforms), so elsewhere - and for a [timeout] of [0]/[None] - the watchdog is inert
+# - on exit, the previous [SIGALRM] handler is reinstalled and the previous [ITIMER_REAL] timer
+#   (if any) is resumed with the time it had left
+class SentenceWatchdog:
+    def __init__(self, timeout):
+        self._timeout = timeout
+        self._enabled = (
+                bool(timeout)
+            and hasattr(signal, 'setitimer')
+            and threading.current_thread() is threading.main_thread()
+        )
+        self._armed = False
+        # v-- [_generation] is bumped by every [arm()]; [_alarmed_generation] is its value at the last alarm
+        self._generation = 0
+        self._alarmed_generation = None
+        self._previous_handler = None
+        # v-- [(delay, interval)] of the previous timer, and when it was suspended
+        self._previous_timer = None
+        self._started = None
+
+    def enabled(self): return self._enabled
+
+    def __enter__(self):
+        if self._enabled:
+            self._previous_handler = signal.signal(signal.SIGALRM, self._on_alarm)
+            self._started = time.monotonic()
+            self._previous_timer = signal.setitimer(signal.ITIMER_REAL, self._timeout, self._timeout)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._enabled:
+            self._armed = False
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._previous_handler)
+            delay, interval = self._previous_timer
+            if delay:
+                # v-- NOTE: a timer which would have expired in the meantime fires right away
+                delay = max(delay - (time.monotonic() - self._started), 1e-6)
+                signal.setitimer(signal.ITIMER_REAL, delay, interval)
+        return False
+
+    def _on_alarm(self, signum, frame):
+        if self._armed and self._alarmed_generation == self._generation:
+            self._armed = False
+            raise RuntimeError_SentenceTimeout()
+        self._alarmed_generation = self._generation
+
+    # NOTE: [disarm()] should be invoked within the same [try] as [arm()], since the alarm may go
+    # off just before the watchdog is disarmed.
+    def arm(self):
+        self._generation += 1
+        self._armed = True
+
+    def disarm(self):
+        self._armed = False
+
+# A single edit of a previously linted buffer: bytes [start, end) are replaced by [replacement].
+class TextEdit(namedtuple('TextEdit', ['start', 'end', 'replacement'])):
+    # The single edit which turns [old_data] into [new_data] (by trimming their common prefix
+    # and suffix); useful when an editor only supplies the new contents of a file.
+    def between(old_data, new_data):
+        old_view, new_view = memoryview(old_data), memoryview(new_data)
+        limit = min(len(old_view), len(new_view))
+
+        # v-- binary search for the longest common prefix/suffix (comparing slices in bulk)
+        def longest(common):
+            lo, hi = 0, limit
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if common(mid):
+                    lo = mid
+                else:
+                    hi = mid - 1
+            return lo
+
+        prefix = longest(lambda n: old_view[:n] == new_view[:n])
+        suffix = longest(lambda n: (
+                n <= limit - prefix
+            and old_view[len(old_view) - n:] == new_view[len(new_view) - n:]
+        ))
+
+        # v-- never split a multi-byte UTF-8 sequence
+        while 0 < prefix < len(new_view) and (new_view[prefix] & 0xC0) == 0x80:
+            prefix -= 1
+        while 0 < suffix and (new_view[len(new_view) - suffix] & 0xC0) == 0x80:
+            suffix -= 1
+
+        return TextEdit(
+            prefix,
+            len(old_view) - suffix,
+            bytes(new_view[prefix:len(new_view) - suffix]).decode('UTF-8'),
+        )
+
+# The errors (cf. [LintError]) found in [buffer] together with the checkpoints which
+# [CoqLinter.relint] uses to resume linting after an edit.
+#
+# NOTE: [checkpoints] holds, for each sentence boundary, the triple
+# [(offset, number of errors found before the boundary, LintSession._snapshot_state())].
+class LintResult:
+    def __init__(self, buffer, errors, checkpoints):
+        self._buffer = buffer
+        self._errors = errors
+        self._checkpoints = checkpoints
+        self._checkpoint_offsets = [offset for offset, _, _ in checkpoints]
+
+    def buffer(self): return self._buffer
+    def errors(self): return self._errors
+    def checkpoints(self): return self._checkpoints
+
+    # index of the checkpoint recorded at exactly [offset], or [None]
+    def checkpoint_at(self, offset):
+        i = bisect_right(self._checkpoint_offsets, offset) - 1
+        if 0 <= i and self._checkpoint_offsets[i] == offset:
+            return i
+        return None
+
+    # index of the last checkpoint from which lexing is unaffected by an edit starting at [offset]
+    #
+    # NOTE: the sentence before a checkpoint depends on a few bytes past it: the character after
+    # its [.] and any comment starting on the same line (cf. [SentenceParser.get_next_span]).
+    def last_checkpoint_before(self, offset):
+        data = self._buffer.data()
+        i = bisect_right(self._checkpoint_offsets, offset) - 1
+        while 0 < i:
+            lookahead_end = LEXEMES.LINE_WHITESPACE.match(data, self._checkpoint_offsets[i]).end() + 2
+            if lookahead_end <= offset: break
+            i -= 1
+        return max(i, 0)
+
+# The classification of a single sentence - its leading keyword, attributes and locality, the
+# name/arguments/statement it declares, its interactivity and the results of matching it against
+# the [SentenceMatchers] - which is shared by the context handling ([try_handle_ctx_entry],
+# [try_handle_ctx_exit] and [is_interactive_sentence]) and the policy ([check_policy_aux]).
+#
+# NOTES:
+# - every field is computed on demand and then cached, so the context handling tries each matcher
+#   at most once per sentence (and the policy reuses those results, cf. [match_candidate])
+# - matchers whose required literals don't occur in the sentence (cf. [LiteralIndex]) are not tried
+class SentenceKind:
+    __slots__ = ('_text', '_prefilter', '_present', '_excluded', '_matches', '_head', '_interactive', '_rules')
+
+    def __init__(self, text, prefilter=None):
+        self._text        = text
+        self._prefilter   = prefilter
+        self._present     = None
+        self._excluded    = None
+        # v-- [id(matcher) -> match]
+        self._matches     = {}
+        self._head        = None
+        self._interactive = None
+        # v-- [ctx -> the rule which decides the sentence in [ctx]] (cf. [decide])
+        self._rules       = None
+
+    # [sentence] itself if it is already classified
+    def of(sentence, prefilter=None):
+        if isinstance(sentence, SentenceKind): return sentence
+        return SentenceKind(sentence, prefilter)
+
+    def text(self): return self._text
+
+    # The literals of the [prefilter] which occur in the sentence.
+    def present(self):
+        if self._present is None:
+            self._present = self._prefilter.scan(self._text) if self._prefilter else frozenset()
+        return self._present
+
+    # v-- the [id]s of the matchers which can't match (cf. [LiteralIndex.excluded])
+    def excluded(self):
+        if self._excluded is None:
+            self._excluded = self._prefilter.excluded(self.present()) if self._prefilter else frozenset()
+        return self._excluded
+
+    def may_match(self, matcher):
+        return id(matcher) not in self.excluded()
+
+    def match(self, matcher):
+        key = id(matcher)
+        matches = self._matches
+        if key in matches: return matches[key]
+        if key in self.excluded(): return None
+
+        if MATCHER_STATS.enabled:
+            matches[key] = MATCHER_STATS.call(matcher, matcher.match, self._text)
+        else:
+            matches[key] = matcher.match(self._text)
+        return matches[key]
+
+    # [match] for a [matcher] which is known to [may_match] (i.e. one of the [LiteralIndex.candidates]).
+    #
+    # NOTE: the result isn't cached: the policy tries each matcher at most once, and most sentences are
+    # never [match]ed by the context handling.
+    def match_candidate(self, matcher):
+        matches = self._matches
+        if matches:
+            key = id(matcher)
+            if key in matches: return matches[key]
+        if MATCHER_STATS.enabled: return MATCHER_STATS.call(matcher, matcher.match, self._text)
+        return matcher.match(self._text)
+
+    def search(self, matcher):
+        if not self.may_match(matcher): return None
+        if MATCHER_STATS.enabled: return MATCHER_STATS.call(matcher, matcher.search, self._text)
+        return matcher.search(self._text)
+
+    # v-- [(attributes, modifiers, keyword)] (cf. [SentenceMatchers.HEAD])
+    def _parse_head(self):
+        if self._head is None:
+            head = SentenceMatchers.HEAD
+            if MATCHER_STATS.enabled:
+                head_match = MATCHER_STATS.call(head, head.match, self._text)
+            else:
+                head_match = head.match(self._text)
+            prefix = head_match.group(GroupNames.HEAD_PREFIX_KEY)
+            self._head = (
+                tuple(
+                    attribute.strip()
+                    for attributes in re.findall(r'#\[([^\]\n]*)\]', prefix)
+                    for attribute in attributes.split(',')
+                    if attribute.strip()
+                ),
+                tuple(re.findall(FRAGMENTS.MODIFIER, re.sub(r'#\[[^\]\n]*\]', ' ', prefix))),
+                head_match.group(GroupNames.HEAD_KEYWORD_KEY),
+            )
+        return self._head
+
+    # i.e. [('local', 'program')] for [#[local, program] Definition ...]
+    def attributes(self): return self._parse_head()[0]
+    # i.e. [('Local',)] for [Local Open Scope ...]
+    def modifiers(self):  return self._parse_head()[1]
+    # i.e. [Definition] for [#[local, program] Definition ...], or [None]
+    def keyword(self):    return self._parse_head()[2]
+
+    # One of [local]/[global]/[export] (whether given as an attribute or a modifier), or [None].
+    def locality(self):
+        for locality in self.attributes() + self.modifiers():
+            if locality.lower() in ('local', 'global', 'export'):
+                return locality.lower()
+        return None
+
+    # Whether the sentence declares a lemma or an (anonymous) instance - cf. [statement].
+    def declares_lemma(self):
+        return (   self.match(SentenceMatchers.ANY_LEMMA) is not None
+                or self.match(SentenceMatchers.ANY_ANONYMOUS_INSTANCE) is not None)
+
+    def declares_goal(self):
+        return self.match(SentenceMatchers.ANY_GOAL) is not None
+
+    # The [(name, arguments, statement)] of the lemma/instance/goal which the sentence declares, or [None].
+    def statement(self):
+        lemma_match = self.match(SentenceMatchers.ANY_LEMMA)
+        if lemma_match:
+            return (
+                lemma_match.group(GroupNames.LEMMA_NM_KEY),
+                lemma_match.group(GroupNames.LEMMA_ARGS_KEY),
+                lemma_match.group(GroupNames.LEMMA_STMT_KEY),
+            )
+
+        anonymous_instance_match = self.match(SentenceMatchers.ANY_ANONYMOUS_INSTANCE)
+        if anonymous_instance_match:
+            return (
+                '<anonymous instance>',
+                anonymous_instance_match.group(GroupNames.ANON_INSTANCE_ARGS_KEY),
+                anonymous_instance_match.group(GroupNames.ANON_INSTANCE_STMT_KEY),
+            )
+
+        goal_match = self.match(SentenceMatchers.ANY_GOAL)
+        if goal_match:
+            return ('<anonymous goal>', '', goal_match.group(GroupNames.GOAL_STMT_KEY))
+
+        return None
+
+    # Whether [LintSession.try_handle_ctx_entry]/[LintSession.try_handle_ctx_exit] can act on the sentence
+    # (cf. [CTX_MATCHERS]).
+    def may_change_ctx(self):
+        if self._prefilter is None: return True
+        return bool(self._prefilter.candidates(CTX_MATCHERS, self.present()))
+
+    # cf. [LintSession.is_interactive_sentence]
+    def interactive(self):
+        if self._interactive is None:
+            self._interactive = LintSession.is_interactive_sentence(self)
+        return self._interactive
+
+    # The rule of [decision_table] - the [DecisionTable] of [ctx] - which decides the sentence, or [None].
+    def decide(self, ctx, decision_table):
+        if self._rules is None: self._rules = {}
+        if ctx not in self._rules:
+            self._rules[ctx] = decision_table.decide(self)
+        return self._rules[ctx]
+
+# v-- the default number of sentences which a [VerdictCache] holds
+VERDICT_CACHE_ENTRIES = 1 << 16
+
+# A bounded (LRU) cache of [SentenceKind]s shared across files: most files share many sentences
+# (i.e. [Proof.], [Qed.] or [Require Import ...]), and a cached [SentenceKind] already holds both
+# their verdict in each context (cf. [SentenceKind.decide]) and the results of the [CTX_MATCHERS]
+# which determine their context transitions.
+#
+# NOTES:
+# - entries are keyed by the [CompiledPolicy] (whose prefilter the [SentenceKind] uses) and the
+#   sentence text, which is already normalised by [Sentence.text] (comments erased, blank lines
+#   dropped and trailing whitespace stripped); the text isn't normalised any further since the
+#   matchers are whitespace-sensitive
+# - the context transition itself is derived from the cached results by the context handling,
+#   since it depends on the state of the [LintSession] (and the sentence's line numbers)
+# - a [VerdictCache] may be shared by concurrent [LintSession]s
+class VerdictCache:
+    def __init__(self, max_entries=VERDICT_CACHE_ENTRIES):
+        self._max_entries = max_entries
+        # v-- [(compiled policy, text) -> SentenceKind], least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        # v-- the entries of the copies of the cache in worker processes (cf. [merge_stats])
+        self._merged_entries = 0
+
+    # The (cached) [SentenceKind] of [text] under [compiled_policy].
+    def kind(self, compiled_policy, text):
+        key = (compiled_policy, text)
+        with self._lock:
+            kind = self._entries.get(key)
+            if kind is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return kind
+            self._misses += 1
+
+        kind = SentenceKind(text, compiled_policy.prefilter())
+        with self._lock:
+            self._entries[key] = kind
+            while self._max_entries < len(self._entries):
+                self._entries.popitem(last=False)
+        return kind
+
+    # v-- [(hits, misses, entries)]
+    def stats(self):
+        with self._lock:
+            return (self._hits, self._misses, len(self._entries) + self._merged_entries)
+
+    # Count the [stats] of a worker process's copy of the cache (cf. [coq_lint.lint_coq_files]) as
+    # if they were its own; the entries of distinct workers may overlap.
+    def merge_stats(self, hits, misses, entries):
+        with self._lock:
+            self._hits += hits
+            self._misses += misses
+            self._merged_entries += entries
+
+# v-- [CoqLinter.run] only splits files of at least this size across worker processes
+PARALLEL_LINT_THRESHOLD = 4 << 20
+
+# v-- every sentence which [try_handle_ctx_entry]/[try_handle_ctx_exit] can act on contains one of
+#     these keywords (cf. the corresponding [SentenceMatchers]), so a sentence which contains none
+#     of them never changes the context (and needn't be matched against them at all)
+CTX_KEYWORDS = register_matcher('linter.CTX_KEYWORDS', re.compile(
+    rb'Theorem|Lemma|Example|Instance|Goal|Program|program|Definition|Fixpoint|Equations'
+    rb'|Next|Proof|Qed|Admit|Abort|Defined|Section|Module|NES|End'
+))
+
+# v-- the [:=]s and the delimiters which may enclose them (cf. [LintSession.is_interactive_sentence])
+ENCLOSING_TOKENS = register_matcher('linter.ENCLOSING_TOKENS', re.compile(r':=|[()\[\]{}<>|]|\blet\b|\bin\b'))
+# v-- [delimiter -> (kind, step)]: an opener steps the depth of its kind up and a closer steps it
+#     down, while [|] (a [step] of [0]) opens a [|...|] pair or closes the open one
+ENCLOSING_DELIMITERS = {
+    '(': ('()', 1),    ')': ('()', -1),
+    '[': ('[]', 1),    ']': ('[]', -1),
+    '{': ('{}', 1),    '}': ('{}', -1),
+    '<': ('<>', 1),    '>': ('<>', -1),
+    'let': ('let', 1), 'in': ('let', -1),
+    '|': ('||', 0),
+}
+
+# v-- the [SentenceMatchers] which the context handling tries (cf. [SentenceKind.match]); every
+#     one of them requires some literal (cf. [LiteralIndex]), so a sentence which contains none of
+#     those literals never changes the context
+CTX_MATCHERS = [
+    SentenceMatchers.ANY_LEMMA,
+    SentenceMatchers.ANY_ANONYMOUS_INSTANCE,
+    SentenceMatchers.ANY_GOAL,
+    SentenceMatchers.PROGRAM_PREFIX,
+    SentenceMatchers.MENTIONS_PROGRAM,
+    SentenceMatchers.DEFINITION,
+    SentenceMatchers.FIXPOINT,
+    SentenceMatchers.EQUATIONS_PREFIX,
+    SentenceMatchers.PROOF_ONELINER,
+    SentenceMatchers.PROOF_BEGIN,
+    SentenceMatchers.PROOF_END,
+    SentenceMatchers.NEXT_OBLIGATION_PREFIX,
+    SentenceMatchers.NEST_SECTION_BEGIN,
+    SentenceMatchers.NEST_MODULE_TYPE_BEGIN,
+    SentenceMatchers.NEST_MODULE_BEGIN,
+    SentenceMatchers.NEST_NES_BEGIN,
+    SentenceMatchers.NEST_END,
+]
+
+# v-- the [LintSession] whose policy [_check_chunk] applies within (forked) worker processes
+_chunk_linter = None
+
+# Check a chunk of the sentences collected by [LintSession.lint_parallel] against the policy of
+# their respective contexts; [chunk_data] holds the bytes of the buffer from offset [chunk_start]
+# (which lies on line [chunk_lineno]). Returns the [(index, error)]s together with the records of
+# [MATCHER_STATS] (cf. [MatcherStats.take]).
+def _check_chunk(chunk):
+    chunk_start, chunk_lineno, chunk_data, jobs = chunk
+    linter = _chunk_linter
+    buffer = SourceBuffer(chunk_data, linter._filename)
+
+    MATCHER_STATS.enter_worker()
+    errors = []
+    with SentenceWatchdog(linter._sentence_timeout) as watchdog:
+        for index, start, end, comments, ctx in jobs:
+            start -= chunk_start
+            end -= chunk_start
+            linter._context_stack = deque([ctx])
+            linter._errors = []
+            sentence = Sentence.text_of(
+                buffer,
+                start,
+                end,
+                [(comment_start - chunk_start, comment_end - chunk_start) for comment_start, comment_end in comments],
+            )
+            starting_lineno = chunk_lineno + buffer.lineno(start) - 1
+            ending_lineno = chunk_lineno + buffer.lineno(end - 1) - 1
+            try:
+                watchdog.arm()
+                kind = linter.classify(sentence)
+                linter.check_policy_aux(kind, starting_lineno, ending_lineno)
+                linter.check_rules(kind, ctx, starting_lineno, ending_lineno)
+                watchdog.disarm()
+            except RuntimeError_SentenceTimeout:
+                linter._errors = []
+                linter.report_sentence_timeout(sentence, starting_lineno, ending_lineno)
+            errors.extend((index, error) for error in linter._errors)
+    return errors, MATCHER_STATS.take()
+
+# v-- the contexts which [LintSession] tracks, and the subpolicy (cf. [mk_policy]) of each of them
+TOPLEVEL_CTX = 'toplevel'
+PROOF_CTX    = 'proof'
+CTX_SUBPOLICIES = {
+    TOPLEVEL_CTX:  'global_policies',
+    'section':     'section_policies',
+    'module_type': 'module_type_policies',
+    'module':      'module_policies',
+    'nes':         'nes_policies',
+    PROOF_CTX:     'proof_policies',
+}
+
+# A validated policy (cf. [mk_policy]) which is frozen and compiled once: its literal prefilter (cf.
+# [LiteralIndex]) and the [DecisionTable] of each context; together with the [LintRule]s (cf.
+# [linter_util.py]) which check the sentences they subscribe to in addition to the policy.
+#
+# NOTES:
+# - the policy is never modified, so a [CompiledPolicy] can be shared by any number of concurrent
+#   [LintSession]s (whether in threads or in [fork]ed workers)
+# - the [LiteralIndex]/[DecisionTable]s memoize some results in dictionaries; concurrent updates
+#   at worst compute the same (immutable) result twice
+class CompiledPolicy:
+    def __init__(self, policy, rules=()):
+        validate_policy_shape(policy)
+        self._policy = CompiledPolicy._freeze(policy)
+        self._rules = tuple(rules)
+        # v-- the contexts to which some rule subscribes (cf. [rules_for])
+        self._rule_contexts = frozenset(
+            ctx
+            for rule in self._rules
+            for ctx in (CTX_SUBPOLICIES.keys() if rule.contexts is None else rule.contexts)
+        )
+        # v-- [(ctx, keyword) -> rules] (cf. [rules_for])
+        self._rule_routes = {}
+        # v-- NOTE: [check_policy_aux] (and the context handling) only try the matchers whose
+        #     literals occur in the sentence (cf. [SentenceKind])
+        self._prefilter = LiteralIndex(CTX_MATCHERS + [
+            matcher
+            for subpolicy in self._policy.values()
+            for matcher in (
+                  subpolicy['eager_allow_list']
+                + subpolicy['allow_list']
+                + tuple(disallow for disallow, _ in subpolicy['deny_list'])
+            )
+        ])
+        # v-- [ctx -> DecisionTable] (cf. [LintSession.check_policy_aux])
+        self._decision_tables = {
+            ctx: DecisionTable.of_policy(
+                None if ctx == TOPLEVEL_CTX else self._policy[subpolicy_nm],
+                self._policy[CTX_SUBPOLICIES[TOPLEVEL_CTX]],
+                self._prefilter,
+            )
+            for ctx, subpolicy_nm in CTX_SUBPOLICIES.items()
+        }
+        self._proof_body_screen = self._mk_proof_body_screen()
+        # v-- cf. [fingerprint]
+        self._fingerprint = None
+
+    # v-- a read-only copy of [policy] (with its lists turned into tuples)
+    def _freeze(policy):
+        if isinstance(policy, dict):
+            return MappingProxyType({k: CompiledPolicy._freeze(v) for k, v in policy.items()})
+        if isinstance(policy, list):
+            return tuple(CompiledPolicy._freeze(v) for v in policy)
+        return policy
+
+    def policy(self):    return self._policy
+    def prefilter(self): return self._prefilter
+    def rules(self):     return self._rules
+
+    def has_rules(self, ctx): return ctx in self._rule_contexts
+
+    # v-- a digest of the policy and rules which is stable across processes (cf. [policy_fingerprint])
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = policy_fingerprint(self._policy, self._rules)
+        return self._fingerprint
+
+    # The [LintRule]s which subscribe to [kind] (a [SentenceKind]) in context [ctx], in order.
+    #
+    # NOTE: routes are keyed by the leading keyword of the sentence, which is only computed if some
+    # rule subscribes to [ctx].
+    def rules_for(self, ctx, kind):
+        if ctx not in self._rule_contexts: return ()
+
+        keyword = kind.keyword()
+        key = (ctx, keyword)
+        rules = self._rule_routes.get(key)
+        if rules is None:
+            rules = tuple(
+                rule for rule in self._rules
+                if  (rule.contexts is None or ctx in rule.contexts)
+                and (rule.keywords is None or keyword in rule.keywords)
+            )
+            self._rule_routes[key] = rules
+        return rules
+
+    # v-- the [DecisionTable] of [ctx], or [None] if [ctx] is unrecognized
+    def decision_table(self, ctx): return self._decision_tables.get(ctx)
+
+    # A [bytes] regex which finds every sentence of a proof body that needs to be classified (cf.
+    # [LintSession._skip_proof_body]): those which could change the context (cf. [CTX_KEYWORDS])
+    # and those which could be denied (cf. [DecisionTable.deny_literals]); [None] if the proof
+    # policy doesn't allow anything else, or if some [LintRule] subscribes to proofs.
+    def proof_body_screen(self): return self._proof_body_screen
+
+    def _mk_proof_body_screen(self):
+        if self.has_rules(PROOF_CTX): return None
+        deny_literals = self._decision_tables[PROOF_CTX].deny_literals()
+        # v-- NOTE: [Sentence.text] drops blank lines and trailing whitespace, which could join
+        #     the pieces of a literal that spans lines
+        if deny_literals is None or any(literal != literal.strip() or '\n' in literal for literal in deny_literals):
+            return None
+        # v-- NOTE: without literals the screen is [CTX_KEYWORDS] itself (which [re.compile] would
+        #     return from its cache anyway), which keeps its own name
+        if not deny_literals: return CTX_KEYWORDS
+        return register_matcher('CompiledPolicy.proof_body_screen', re.compile(b'|'.join(
+            [CTX_KEYWORDS.pattern] + [
+                re.escape(literal.encode('UTF-8'))
+                for literal in sorted(deny_literals, key=lambda literal: (-len(literal), literal))
+            ]
+        )))
+
+    # The findings of the static analysis of the policy, as [(ctx, message)] pairs: the contexts
+    # in which every sentence is allowed, and the rules which can never decide a sentence (cf.
+    # [DecisionTable.dead_rules]).
+    #
+    # NOTE: a rule which is repeated with the same verdict is expected (each subpolicy extends the
+    # global one, cf. [mk_policy]), so it is only reported if it follows [SENTENCE(ANYTHING)].
+    def findings(self):
+        findings = []
+        for ctx, decision_table in self._decision_tables.items():
+            if decision_table.trivial():
+                findings.append((ctx, 'every sentence is allowed, so the policy is never evaluated'))
+
+            for (matcher, verdict, _), (shadowing_matcher, shadowing_verdict, _) in decision_table.dead_rules():
+                if matcher is shadowing_matcher and verdict is shadowing_verdict: continue
+                findings.append((ctx, ' '.join([
+                    f'the {verdict} rule {describe_matcher(matcher)} is dead:',
+                    f'it is shadowed by the {shadowing_verdict} rule {describe_matcher(shadowing_matcher)}',
+                ])))
+        return findings
+
+# The state of linting a single file against a [CompiledPolicy]: the errors found so far, the
+# context stacks and the proof-line flags. [CoqLinter] uses a fresh [LintSession] for every file.
+#
 # KNOWN LIMITATIONS:
-# 1) multiple sentences on a single line
-# 2) lines ending with [.] which do not conclude a sentence
-# 3) nested comments
+# 1) sentences are split lexically (cf. [SentenceParser]), so a [.] followed by whitespace
+#    always concludes a sentence - even if [coqc] would parse it differently
 #
 # TODOS:
-# - check for conflicts between the toplevel policy and the specific
-#   subpolicies
 # - define config language/knobs in terms of invariants over stacks
 # - track specific [_XXX_errors] as opposed to just [_errors]
-class CoqLinter:
-    def __init__(self, policy):
-        validate_policy_shape(policy)
-        self._policy = policy
+class LintSession:
+    def __init__(self, compiled_policy, verdict_cache=None):
+        self._compiled_policy = compiled_policy
+        self._policy = compiled_policy.policy()
+        self._prefilter = compiled_policy.prefilter()
+        self._verdict_cache = verdict_cache
 
         self._section_ctx_nm     = 'section'
         self._module_type_ctx_nm = 'module_type'
         self._module_ctx_nm      = 'module'
         self._nes_ctx_nm         = 'nes'
         self._proof_ctx_nm       = 'proof'
-        self._toplevel_ctx_nm    = 'toplevel'
+        self._toplevel_ctx_nm    = TOPLEVEL_CTX
 
         self.reset()
 
     def reset(self):
         self._filename = None
         self._errors = []
+        self._sentence_timeout = SENTENCE_TIMEOUT
 
         # Track stacks of names for [Section]s/[Module Type]s/[Module]s/[NES]/[Proof]
         #
@@ -71,6 +681,40 @@ class CoqLinter:
         # v   chaining of these proofs.
         self._next_obligation_enter_proof_ctx = False
 
+        # v-- whether the next sentence is within a [[NOLINT-BEGIN]]/[[NOLINT-END]] region (cf. [in_nolint_region])
+        self._nolint_region = False
+
+    # An immutable copy of all of the state which [run] threads from one sentence to the next.
+    def _snapshot_state(self):
+        return (
+            tuple(self._context_stack),
+            tuple((ctx, tuple(infos)) for ctx, infos in self._info_stacks.items()),
+            tuple(self._nested_proof_stack),
+            self._program_definition,
+            self._elide_proof_line,
+            self._expect_proof_line,
+            self._proof_line_seen,
+            self._proof_line_unseen_logged,
+            self._next_obligation_enter_proof_ctx,
+            self._nolint_region,
+        )
+
+    def _restore_state(self, state):
+        (context_stack,
+         info_stacks,
+         nested_proof_stack,
+         self._program_definition,
+         self._elide_proof_line,
+         self._expect_proof_line,
+         self._proof_line_seen,
+         self._proof_line_unseen_logged,
+         self._next_obligation_enter_proof_ctx,
+         self._nolint_region) = state
+
+        self._context_stack = deque(context_stack)
+        self._info_stacks = {ctx: deque(infos) for ctx, infos in info_stacks}
+        self._nested_proof_stack = deque(nested_proof_stack)
+
     def current_ctx(self):        return self._context_stack[0]
 
     def in_toplevel_ctx(self):    return self.current_ctx() == self._toplevel_ctx_nm
@@ -206,203 +850,174 @@ class CoqLinter:
             # when exiting a context, but for now we don't check anything.
             pass
 
+    # NOTES:
+    # - [sentence] is either the text of a sentence or its [SentenceKind]
+    # - with a [VerdictCache], sentences which were already classified (in any file) are looked up
+    def classify(self, sentence):
+        if self._verdict_cache is None or isinstance(sentence, SentenceKind):
+            return SentenceKind.of(sentence, self._prefilter)
+        return self._verdict_cache.kind(self._compiled_policy, sentence)
+
+    # v-- the [DecisionTable] of the current context (cf. [ctx_policy])
+    def ctx_decision_table(self):
+        decision_table = self._compiled_policy.decision_table(self.current_ctx())
+        # v-- NOTE: [ctx_policy] reports an unrecognized context
+        return decision_table if decision_table is not None else self.ctx_policy()
+
+    # Check [sentence] against the [current_ctx] (then global) "eager_allow_list", "deny_list" and
+    # "allow_list" policies - in that order - and report it if it is denied or unrecognized.
+    #
+    # NOTE: the policies of each context are compiled into a [DecisionTable] up front, which
+    # finds the first of them to match [sentence] in a single scan (for the most part).
     def check_policy_aux(self, sentence, starting_lineno, ending_lineno):
-        toplevel_policy = self.toplevel_policy()
-        ctx_policy      = None if self.in_toplevel_ctx() else self.ctx_policy()
-
-        # 1) check [current_ctx] (then global) "eager_allow_list" policies
-        if ctx_policy:
-            for allow in ctx_policy['eager_allow_list']:
-                if allow.match(sentence):
-                    return
-        for allow in toplevel_policy['eager_allow_list']:
-            if allow.match(sentence):
-                return
-
-        # 2) check [current_ctx] (then global) "deny_list" policies
-        if ctx_policy:
-            for disallow, err_fmt in ctx_policy['deny_list']:
-                if disallow.match(sentence):
-                    self._errors.append((err_fmt(sentence), starting_lineno, ending_lineno))
-                    return
-        for disallow, err_fmt in toplevel_policy['deny_list']:
-            if disallow.match(sentence):
-                self._errors.append((err_fmt(sentence), starting_lineno, ending_lineno))
-                return
-
-        # 3) check [current_ctx] (then global) "allow_list" policies
-        if ctx_policy:
-            for allow in ctx_policy['allow_list']:
-                if allow.match(sentence):
-                    return
-        for allow in toplevel_policy['allow_list']:
-            if allow.match(sentence):
-                return
-
-
-        # 4) UNRECOGNIZED SENTENCE: update [current_ctx] and/or global policy
-        self._errors.append((
-            err_fmt_unknown(sentence),
-            starting_lineno,
-            ending_lineno
-        ))
-
-    def check_policy(self, sentence, starting_lineno, ending_lineno):
-        if (        self.in_proof_ctx()
-            and     self._expect_proof_line
-            and not self._program_definition
-            and not self._proof_line_seen
-            and not self._proof_line_unseen_logged):
+        decision_table = self.ctx_decision_table()
+        # v-- NOTE: contexts which allow anything don't need to classify/match [sentence] at all
+        if decision_table.trivial():
+            text = sentence.text() if isinstance(sentence, SentenceKind) else sentence
+            if decision_table.trivially_allows(text): return
+
+        kind = self.classify(sentence)
+        rule = kind.decide(self.current_ctx(), decision_table)
+
+        if rule is None:
+            # UNRECOGNIZED SENTENCE: update [current_ctx] and/or global policy
+            self._errors.append(LintError(err_fmt_unknown, starting_lineno, ending_lineno, kind.text()))
+            return
+
+        _, verdict, err_fmt = rule
+        if verdict is DENY:
+            self._errors.append(LintError(err_fmt, starting_lineno, ending_lineno, kind.text()))
+
+    # Check [sentence] - which occurs in context [ctx] - against the [LintRule]s which subscribe to it
+    # (cf. [CompiledPolicy.rules_for]), modifying [self._errors] if violations are found.
+    #
+    # NOTE: [sentence] is either the text of a sentence or its [SentenceKind].
+    def check_rules(self, sentence, ctx, starting_lineno, ending_lineno):
+        if not self._compiled_policy.has_rules(ctx): return
+
+        kind = self.classify(sentence)
+        for rule in self._compiled_policy.rules_for(ctx, kind):
+            error = rule.check(kind)
+            if error is not None:
+                err_fmt, args = error
+                self._errors.append(LintError(err_fmt, starting_lineno, ending_lineno, kind.text(), args))
+
+    # Whether the proof which the next (policy-checked) sentence belongs to is missing its [Proof] line.
+    def proof_line_missing(self):
+        return (    self.in_proof_ctx()
+                and     self._expect_proof_line
+                and not self._program_definition
+                and not self._proof_line_seen
+                and not self._proof_line_unseen_logged)
+
+    # NOTE: [sentence] is only used to report a missing [Proof] line (cf. [proof_line_missing]).
+    def check_proof_line(self, sentence, starting_lineno, ending_lineno):
+        if self.proof_line_missing():
             # a proof which doesn't start with a [Proof] line
-            self._errors.append((
-                # lemma name at head of proof stack -------v
-                err_fmt_missing_proof_begin(
-                    self._info_stacks[self._proof_ctx_nm][0][0],
-                    sentence
-                ),
+            self._errors.append(LintError(
+                err_fmt_missing_proof_begin,
                 starting_lineno,
-                ending_lineno
+                ending_lineno,
+                sentence,
+                # v-- lemma name at head of proof stack
+                (self._info_stacks[self._proof_ctx_nm][0][0],),
             ))
             self._proof_line_unseen_logged = True
 
         self._expect_proof_line = not self._elide_proof_line and self.in_proof_ctx()
 
+    def check_policy(self, sentence, starting_lineno, ending_lineno):
+        self.check_proof_line(sentence, starting_lineno, ending_lineno)
         self.check_policy_aux(sentence, starting_lineno, ending_lineno)
 
+    # Whether the sentence whose span has the [nolint] flags (cf. [SentenceParser]) is within a
+    # [[NOLINT-BEGIN]]/[[NOLINT-END]] region - i.e. the last region marker before the sentence
+    # proper is a [[NOLINT-BEGIN]] - in which case only its context transitions are tracked.
+    #
+    # NOTE: the markers which follow the beginning of the sentence apply from the next sentence.
+    def in_nolint_region(self, nolint):
+        if nolint & NOLINT_REGION_BEFORE:
+            self._nolint_region = bool(nolint & NOLINT_REGION_BEGIN)
+        in_region = self._nolint_region
+        if nolint & NOLINT_REGION_AFTER:
+            self._nolint_region = bool(nolint & NOLINT_REGION_BEGIN_AFTER)
+        return in_region
+
+    # Report a sentence which exhausted its [SentenceWatchdog] budget (and was skipped).
+    def report_sentence_timeout(self, sentence, starting_lineno, ending_lineno):
+        self._errors.append(LintError(
+            err_fmt_sentence_timeout,
+            starting_lineno,
+            ending_lineno,
+            sentence,
+            (self._sentence_timeout,),
+        ))
+
+    # NOTE: [sentence] is either the text of a sentence or its [SentenceKind] (cf. [SentenceKind.interactive]).
     def is_interactive_sentence(sentence):
+        kind = SentenceKind.of(sentence)
+        sentence = kind.text()
+
         # v-- NOTE: special case for [Definition ....] w/out [:=]
-        if SentenceMatchers.DEFINITION.match(sentence) or SentenceMatchers.FIXPOINT.match(sentence):
+        if kind.match(SentenceMatchers.DEFINITION) or kind.match(SentenceMatchers.FIXPOINT):
             # v-- NOTE: this might miss [Definition ... (foo:=bar) ...] w/out [:=]
             return len(re.findall(fr':=', sentence)) == 0
 
         # v-- NOTE: special case for [#[... program ...]]
-        if len(re.findall(FRAGMENTS.DEFINITELY_PROGRAM, sentence)) != 0:
+        if kind.search(SentenceMatchers.MENTIONS_PROGRAM):
             return True
 
-        def mk_pat(left_delimiter, right_delimiter, exclude_other=True):
-            if exclude_other:
-                left_contents = FRAGMENTS.ANYTHING_BUT_CHARS(right_delimiter)
-                right_contents = FRAGMENTS.ANYTHING_BUT_CHARS(left_delimiter)
-            else:
-                left_contents = FRAGMENTS.ANYTHING
-                right_contents = FRAGMENTS.ANYTHING
-
-            pat = ''.join([
-                fr'{left_delimiter}',
-                fr'{left_contents}',
-                FRAGMENTS.MAYBE_SPACES,
-                fr':=',
-                FRAGMENTS.MAYBE_SPACES,
-                fr'({right_contents}|\({right_contents}\)\%{FRAGMENTS.NON_SPACES})',
-                fr'{right_delimiter}'
-            ])
-            return pat
-
-        all_allowed_colon_equals_matches = (
-            list(re.finditer(mk_pat(r'let', r'in', exclude_other=False), sentence)) +
-            list(re.finditer(mk_pat(r'\(', r'\)'), sentence)) +
-            list(re.finditer(mk_pat(r'\[', r'\]'), sentence)) +
-            list(re.finditer(mk_pat(r'\{', r'\}'), sentence)) +
-            list(re.finditer(mk_pat(r'\<', r'\>'), sentence)) +
-            list(re.finditer(mk_pat(r'\|', r'\|'), sentence))
-        )
-        all_allowed_colon_equals_matches.sort(key=lambda match: match.start())
-
-        # NOTE: [all_allowed_colon_equals_matches] misses arguments of the form
-        # [(FOO:=...(...(BAR)...))], so we manually special-case that form here
-        # by counting parens as we walk out in either direction from the [:=]
-        # match
-        def check_allowed_special_case_nested_parens(colon_equals_match):
-            # Valid matches will be of the form:
-            # 1) open paren
-            # 2) name
-            # 3) :=
-            # 4) any valid string containing balanced parentheses
-            # 5) close paren
-
-            seen_lparen = False
-            i_left = colon_equals_match.start()
-            i_right = colon_equals_match.end()
-
-            # validate open paren
-            while 0 <= i_left:
-                c = sentence[i_left]
-                if c == '(':
-                    # open paren validated
-                    seen_lparen = True
-                    break
-                elif c == ')':
-                    # defined arguments can only have a name appear on the LHS
-                    return False
-                else:
-                    i_left -= 1
-            # NOTE: [sentence[i_left]] is the nearest open paren (w/out any intervening close paren)
-
-            if not seen_lparen: return False
-
-            open_paren_count = 0
-            while i_right < len(sentence):
-                c = sentence[i_right]
-                if c == '(':
-                    open_paren_count += 1
-                elif c == ')':
-                    if open_paren_count == 0:
-                        return True
-                    else:
-                        open_paren_count -= 1
-
-                i_right += 1
-
-            # v-- couldn't find a matching close-paren to balance the open-paren
-            return False
-
-        def check_allowed(colon_equals_match):
-            allowed = False
-
-            for allowed_colon_equals_match in all_allowed_colon_equals_matches:
-                if (colon_equals_match.start() <= allowed_colon_equals_match.start()):
-                    # NOTE: the allowed patterns containing [:=] are bigger than [:=]
-                    # so we use [<=] instead of [<].
-                    continue
-                elif (    allowed_colon_equals_match.start() <= colon_equals_match.start()
-                      and colon_equals_match.end() <= allowed_colon_equals_match.end()):
-                    allowed = True
-                    break
-                elif allowed_colon_equals_match.end() <= colon_equals_match.start():
-                    # NOTE: match spans are sorted so if we go past the end we know
-                    # we've found a [:=] which isn't allowed
-                    continue
-
-            return allowed or check_allowed_special_case_nested_parens(colon_equals_match)
-
         # If a [:=] is found which isn't "allowed", we conclude that we've found a non-interactive
-        # definition (i.e. [Module foo ... := bar.], [Instance baz : ... := _.], etc...)
-        allowed_results = map(check_allowed, re.finditer(r':=', sentence))
-        return allowed_results is not [] and all(allowed_results)
+        # definition (i.e. [Module foo ... := bar.], [Instance baz : ... := _.], etc...). A [:=] is
+        # allowed if some kind of delimiter (cf. [ENCLOSING_DELIMITERS]) is open at the [:=] and is
+        # closed after it, i.e. [(a := (f x))], [{| a := 1 |}] or [let x := 1 in x].
+        #
+        # NOTES:
+        # - a single pass over the [ENCLOSING_TOKENS]: each kind of delimiter has its own depth (so
+        #   [{x | P x} := ... | ...] encloses the [:=] within [|...|]), and a closer which has no
+        #   opener (i.e. the [>] of [->]) is ignored
+        # - [pending[kind][d - 1]] holds the (indices of the) [:=]s which are allowed once the depth
+        #   of [kind] drops below [d], so every [:=] is visited at most once per kind
+        # - strings aren't skipped
+        depths = {kind: 0 for kind, _ in ENCLOSING_DELIMITERS.values()}
+        pending = {kind: [] for kind in depths}
+        unallowed = set()
+        for index, token_match in enumerate(ENCLOSING_TOKENS.finditer(sentence)):
+            token = token_match.group()
+            if token == ':=':
+                enclosing_kinds = [kind for kind, depth in depths.items() if depth]
+                if not enclosing_kinds: return False
+                unallowed.add(index)
+                for kind in enclosing_kinds: pending[kind][-1].append(index)
+                continue
 
+            kind, step = ENCLOSING_DELIMITERS[token]
+            if step == 0: step = -1 if depths[kind] else 1
+            if 0 < step:
+                depths[kind] += 1
+                pending[kind].append([])
+            elif depths[kind]:
+                depths[kind] -= 1
+                unallowed.difference_update(pending[kind].pop())
+        return not unallowed
+
+    # NOTE: [sentence] is either the text of a sentence or its [SentenceKind].
     def try_handle_ctx_entry(self, sentence, starting_lineno, ending_lineno):
+        kind = self.classify(sentence)
+        sentence = kind.text()
+
         # Enter proof
         # NOTE: interactive [Instance]s/[Definition]s/etc... complicate things
         proof_ctx_entered = False
-        lemma_match = SentenceMatchers.ANY_LEMMA.match(sentence)
-        anonymous_instance_match = SentenceMatchers.ANY_ANONYMOUS_INSTANCE.match(sentence)
-        goal_match = SentenceMatchers.ANY_GOAL.match(sentence)
-        if lemma_match or anonymous_instance_match:
+        if kind.declares_lemma():
             # NOTE: if arguments are provided (i.e. [foo (X:=Y)] then this simple [re.search]
             # misses certain lemmas.
-            if CoqLinter.is_interactive_sentence(sentence):
-                program_definition = (re.match(FRAGMENTS.DEFINITELY_PROGRAM, sentence) is not None)
+            if kind.interactive():
+                program_definition = kind.match(SentenceMatchers.PROGRAM_PREFIX) is not None
                 # elide_proof_line = (re.match(FRAGMENTS.INTERACTIVE_INSTANCE, sentence) is not None)
                 # v-- NOTE: easier to always allow [Proof] to be elided, for now
                 elide_proof_line = True
-                if lemma_match:
-                    NM   = lemma_match.group(GroupNames.LEMMA_NM_KEY)
-                    ARGS = lemma_match.group(GroupNames.LEMMA_ARGS_KEY)
-                    STMT = lemma_match.group(GroupNames.LEMMA_STMT_KEY)
-                else:
-                    NM   = '<anonymous instance>'
-                    ARGS = anonymous_instance_match.group(GroupNames.ANON_INSTANCE_ARGS_KEY)
-                    STMT = anonymous_instance_match.group(GroupNames.ANON_INSTANCE_STMT_KEY)
+                NM, ARGS, STMT = kind.statement()
                 self.enter_proof_ctx(
                     (NM, ARGS, STMT, starting_lineno, ending_lineno),
                     starting_lineno,
@@ -414,40 +1029,30 @@ class CoqLinter:
                 # /-- NOTE: we encountered a non-interactive proof
                 # v   (i.e. [Instance foo : ... := ...])
                 return False
-        elif goal_match:
-            self.enter_proof_ctx((
-                '<anonymous goal>',
-                '',
-                goal_match.group(GroupNames.GOAL_STMT_KEY),
+        elif kind.declares_goal():
+            self.enter_proof_ctx(
+                kind.statement() + (starting_lineno, ending_lineno),
                 starting_lineno,
-                ending_lineno,
-            ), starting_lineno, elide_proof_line=True)
+                elide_proof_line=True
+            )
             proof_ctx_entered = True
-        # v-- TODO: add a regex to match [#[program]] declarations
-        elif re.match(
-                fr'{FRAGMENTS.SENTENCE_BEGIN}{FRAGMENTS.MAYBE_SPACES}{FRAGMENTS.DEFINITELY_PROGRAM}',
-                sentence
-        ):
+        elif kind.match(SentenceMatchers.PROGRAM_PREFIX):
             self.enter_proof_ctx((
                 sentence,
                 starting_lineno,
                 ending_lineno,
             ), starting_lineno, program_definition=True)
             proof_ctx_entered = True
-        elif SentenceMatchers.DEFINITION.match(sentence) or SentenceMatchers.FIXPOINT.match(sentence):
-           if CoqLinter.is_interactive_sentence(sentence):
+        elif kind.match(SentenceMatchers.DEFINITION) or kind.match(SentenceMatchers.FIXPOINT):
+           if kind.interactive():
                 self.enter_proof_ctx((
                     sentence,
                     starting_lineno,
                     ending_lineno,
                 ), starting_lineno, elide_proof_line=True)
                 proof_ctx_entered = True
-        # v-- TODO: add a regex to match [Equations] declarations
-        elif re.match(
-                fr'{FRAGMENTS.SENTENCE_BEGIN}{FRAGMENTS.MAYBE_SPACES}Equations',
-                sentence
-        ):
-           if CoqLinter.is_interactive_sentence(sentence):
+        elif kind.match(SentenceMatchers.EQUATIONS_PREFIX):
+           if kind.interactive():
                 self.enter_proof_ctx((
                     sentence,
                     starting_lineno,
@@ -458,25 +1063,15 @@ class CoqLinter:
         # NOTE: slight optimization; once a proof context is entered, only "proof"-things
         # are allowed.
         # TODO: permit linting the proof-body contents of a one-liner proof.
-        if (       SentenceMatchers.PROOF_ONELINER.match(sentence)
-                or (self._elide_proof_line and SentenceMatchers.PROOF_END.match(sentence))):
+        if (       kind.match(SentenceMatchers.PROOF_ONELINER)
+                or (self._elide_proof_line and kind.match(SentenceMatchers.PROOF_END))):
             # /-- NOTE: the proof oneline might be a [Next Obligation] which isn't first - in which
             # v   case the linter won't be in a proof ctx.
             if self.in_proof_ctx():
                 self.exit_proof_ctx(starting_lineno)
             return True
-        elif (self.in_proof_ctx() or self._next_obligation_enter_proof_ctx) and SentenceMatchers.PROOF_BEGIN.match(sentence):
-            next_obligation_match = re.match(
-                ''.join([
-                    FRAGMENTS.MAYBE_SPACES,
-                    '(Fail{FRAGMENTS.SPACES})?'
-                    ,'Next',
-                    FRAGMENTS.SPACES,
-                    'Obligation',
-                ]),
-                sentence
-            )
-            if self._next_obligation_enter_proof_ctx and next_obligation_match:
+        elif (self.in_proof_ctx() or self._next_obligation_enter_proof_ctx) and kind.match(SentenceMatchers.PROOF_BEGIN):
+            if self._next_obligation_enter_proof_ctx and kind.match(SentenceMatchers.NEXT_OBLIGATION_PREFIX):
                 self.enter_proof_ctx((
                     sentence,
                     starting_lineno,
@@ -486,7 +1081,7 @@ class CoqLinter:
             return True
         else:
             # Try to enter [Section]
-            section_match = SentenceMatchers.NEST_SECTION_BEGIN.match(sentence)
+            section_match = kind.match(SentenceMatchers.NEST_SECTION_BEGIN)
             if section_match:
                 self.enter_section_ctx((
                     section_match.group(GroupNames.SECTION_NM_KEY),
@@ -499,10 +1094,10 @@ class CoqLinter:
             #
             # NOTE: overlapping regexes between [Module]/[Module Type]; try the more
             # specific one first.
-            module_type_match = SentenceMatchers.NEST_MODULE_TYPE_BEGIN.match(sentence)
-            module_match      = SentenceMatchers.NEST_MODULE_BEGIN.match(sentence)
+            module_type_match = kind.match(SentenceMatchers.NEST_MODULE_TYPE_BEGIN)
+            module_match      = None if module_type_match else kind.match(SentenceMatchers.NEST_MODULE_BEGIN)
             if module_type_match:
-                if CoqLinter.is_interactive_sentence(sentence):
+                if kind.interactive():
                     self.enter_module_type_ctx((
                         module_type_match.group(GroupNames.MODULE_TYPE_NM_KEY),
                         module_type_match.group(GroupNames.MODULE_TYPE_SIG_KEY),
@@ -515,7 +1110,7 @@ class CoqLinter:
                     # v   (i.e. [Module Type foo : ... := ...])
                     return False
             elif module_match:
-                if CoqLinter.is_interactive_sentence(sentence):
+                if kind.interactive():
                     self.enter_module_ctx((
                         module_match.group(GroupNames.MODULE_NM_KEY),
                         module_match.group(GroupNames.MODULE_SIG_KEY),
@@ -529,7 +1124,7 @@ class CoqLinter:
                     return False
 
             # Try to enter [NES] namespace
-            nes_match = SentenceMatchers.NEST_NES_BEGIN.match(sentence)
+            nes_match = kind.match(SentenceMatchers.NEST_NES_BEGIN)
             if nes_match:
                 self.enter_nes_ctx((
                     nes_match.group(GroupNames.NES_NM_KEY),
@@ -540,14 +1135,17 @@ class CoqLinter:
 
         return proof_ctx_entered
 
+    # NOTE: [sentence] is either the text of a sentence or its [SentenceKind].
     def try_handle_ctx_exit(self, sentence, starting_lineno, ending_lineno):
+        kind = self.classify(sentence)
+
         # NOTE: [try_handle_ctx_enter] handles oneline proofs since it also scans for [Proof] -
         # which doesn't exit the proof context by itself.
-        if (SentenceMatchers.PROOF_END.match(sentence)):
+        if kind.match(SentenceMatchers.PROOF_END):
             self.exit_proof_ctx(starting_lineno)
             return True
 
-        nest_end_match = SentenceMatchers.NEST_END.match(sentence)
+        nest_end_match = kind.match(SentenceMatchers.NEST_END)
         if nest_end_match:
             if self.in_section_ctx():
                 self.exit_section_ctx(starting_lineno)
@@ -574,13 +1172,336 @@ class CoqLinter:
 
         return False
 
-    def run(self, f):
+    # NOTES:
+    # - [f] is a file (which is read and closed) or a [SourceBuffer]; a buffer read from [f] is
+    #   closed once linted, while a [SourceBuffer] is left to the caller
+    # - files of at least [PARALLEL_LINT_THRESHOLD] bytes are linted using [jobs] worker
+    #   processes (cf. [lint_parallel]).
+    # - a sentence which takes longer than [sentence_timeout] seconds to match is reported and
+    #   skipped (cf. [SentenceWatchdog]).
+    def run(self, f, span_cache=None, jobs=1, sentence_timeout=SENTENCE_TIMEOUT):
+        if not isinstance(f, SourceBuffer):
+            with SourceBuffer.from_file(f) as buffer:
+                return self.run(buffer, span_cache=span_cache, jobs=jobs, sentence_timeout=sentence_timeout)
+
+        buffer = f
+        if 1 < jobs and PARALLEL_LINT_THRESHOLD <= len(buffer):
+            return self.lint_parallel(
+                buffer,
+                jobs,
+                span_cache=span_cache,
+                sentence_timeout=sentence_timeout,
+            ).errors()
+        return self.lint(buffer, span_cache=span_cache, sentence_timeout=sentence_timeout).errors()
+
+    # Lint [buffer] from the beginning; if [record_checkpoints] then the returned [LintResult]
+    # can be passed to [relint].
+    #
+    # NOTE: if a [coq_sentence_cache.SpanCache] is supplied then the sentences of [buffer] are
+    # replayed from (or recorded into) that cache.
+    def lint(self, buffer, record_checkpoints=False, span_cache=None, sentence_timeout=SENTENCE_TIMEOUT):
+        self.reset()
+        self._filename = buffer.name()
+        self._sentence_timeout = sentence_timeout
+        checkpoints = [] if record_checkpoints else None
+
+        sentence_parser = span_cache.parser_for(buffer) if span_cache else SentenceParser(buffer)
+        if sentence_parser.nolint_file(): return LintResult(buffer, [], [])
+        self._lint_sentences(sentence_parser, checkpoints)
+        return LintResult(buffer, self._errors, checkpoints or [])
+
+    # Lint [buffer] - with exactly the same result as [lint] - using [jobs] worker processes:
+    # 1) the (context-free) sentence boundaries of the whole buffer are found up front
+    # 2) a sequential pass runs [try_handle_ctx_entry]/[try_handle_ctx_exit] on the sentences which
+    #    could change the context (cf. [CTX_KEYWORDS]), which fixes the context - and proof-line
+    #    state - under which every remaining sentence must be checked
+    # 3) the remaining sentences are split into contiguous chunks which are decoded and checked
+    #    against the policy of their context by [_check_chunk] in a process pool
+    # 4) the errors are merged back into sentence order
+    #
+    # NOTE: the workers inherit [self] by [fork]ing; where [fork] is unavailable the buffer is
+    # linted sequentially.
+    def lint_parallel(self, buffer, jobs, span_cache=None, sentence_timeout=SENTENCE_TIMEOUT):
+        global _chunk_linter
+
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            return self.lint(buffer, span_cache=span_cache, sentence_timeout=sentence_timeout)
+
+        self.reset()
+        self._filename = buffer.name()
+        self._sentence_timeout = sentence_timeout
+        data = buffer.data()
+
+        # 1) find the sentence boundaries
+        sentence_parser = span_cache.parser_for(buffer) if span_cache else SentenceParser(buffer)
+        if sentence_parser.nolint_file(): return LintResult(buffer, [], [])
+        spans = []
+        failure = None
+        try:
+            for span in sentence_parser.spans():
+                spans.append(span)
+        except RuntimeError as e:
+            failure = RuntimeError_PartialLint(e, None, parsing_issue=True)
+
+        # 2) track the context; [indexed_errors] holds [(sentence index, error)] pairs and [pending]
+        #    holds [(sentence index, start, end, comments, ctx)] for the
+        #    sentences which remain to be checked
+        indexed_errors = []
+        pending = []
+        proof_body_screen = self._compiled_policy.proof_body_screen()
+        with SentenceWatchdog(sentence_timeout) as watchdog:
+            for index, span in enumerate(spans):
+                start, body_start, end, comments, _, nolint = span
+                ctx = self.current_ctx()
+                in_nolint_region = self.in_nolint_region(nolint)
+                nolint = in_nolint_region or nolint & NOLINT_SENTENCE
+                inside_interactive_proof = self.in_proof_ctx()
+                if inside_interactive_proof: start = body_start
+
+                if MATCHER_STATS.enabled:
+                    mentions_ctx_keyword = MATCHER_STATS.call(CTX_KEYWORDS, CTX_KEYWORDS.search, data, start, end)
+                else:
+                    mentions_ctx_keyword = CTX_KEYWORDS.search(data, start, end)
+                if mentions_ctx_keyword:
+                    sentence = Sentence(buffer, span, inside_interactive_proof=inside_interactive_proof)
+                    text = sentence.text()
+                    rollback_state = self._snapshot_state() if watchdog.enabled() else None
+                    try:
+                        watchdog.arm()
+                        kind = self.classify(text)
+                        handled = (   self.try_handle_ctx_entry(kind, sentence.starting_lineno, sentence.ending_lineno)
+                                   or self.try_handle_ctx_exit(kind, sentence.starting_lineno, sentence.ending_lineno))
+                        watchdog.disarm()
+                    except RuntimeError_PartialLint as e:
+                        failure = e
+                        break
+                    except RuntimeError_SentenceTimeout:
+                        self._restore_state(rollback_state)
+                        self.report_sentence_timeout(text, sentence.starting_lineno, sentence.ending_lineno)
+                        indexed_errors.append((index, self._errors[-1]))
+                        continue
+                    if handled:
+                        # v-- NOTE: the [LintRule]s still check the sentence (in its original context)
+                        if not nolint and self._compiled_policy.has_rules(ctx):
+                            error_count = len(self._errors)
+                            try:
+                                watchdog.arm()
+                                self.check_rules(kind, ctx, sentence.starting_lineno, sentence.ending_lineno)
+                                watchdog.disarm()
+                            except RuntimeError_SentenceTimeout:
+                                del self._errors[error_count:]
+                                self.report_sentence_timeout(text, sentence.starting_lineno, sentence.ending_lineno)
+                            indexed_errors.extend((index, error) for error in self._errors[error_count:])
+                        continue
+
+                if nolint: continue
+
+                if self.proof_line_missing():
+                    sentence = Sentence(buffer, span, inside_interactive_proof=inside_interactive_proof)
+                    self.check_proof_line(sentence.text(), sentence.starting_lineno, sentence.ending_lineno)
+                    indexed_errors.append((index, self._errors[-1]))
+                else:
+                    # v-- NOTE: no error can be reported, so the sentence itself isn't needed
+                    self.check_proof_line(None, None, None)
+
+                # v-- NOTE: the sentences of contexts which allow anything (and to which no rule
+                #     subscribes) needn't be checked
+                decision_table = self.ctx_decision_table()
+                if decision_table.trivial() and not self._compiled_policy.has_rules(ctx):
+                    if decision_table.trivially_allows(Sentence.text_of(buffer, start, end, comments)): continue
+                # v-- NOTE: ... nor can the sentences of a proof body which can't be denied (cf. [_skip_proof_body])
+                if inside_interactive_proof and proof_body_screen is not None and 2 <= end - start:
+                    if MATCHER_STATS.enabled:
+                        screen_match = MATCHER_STATS.call(proof_body_screen, proof_body_screen.search, data, start, end)
+                    else:
+                        screen_match = proof_body_screen.search(data, start, end)
+                    if not screen_match: continue
+
+                pending.append((index, start, end, comments, self.current_ctx()))
+
+        # 3) check the remaining sentences in parallel
+        chunks = []
+        chunk_size = max(256, -(-len(pending) // (4 * jobs)))
+        for i in range(0, len(pending), chunk_size):
+            chunk_jobs = pending[i:i+chunk_size]
+            # v-- NOTE: a chunk begins at a line start (cf. [Sentence.text_of])
+            chunk_start = buffer.line_starts()[buffer.lineno(chunk_jobs[0][1]) - 1]
+            chunk_end = chunk_jobs[-1][2]
+            chunks.append((
+                chunk_start,
+                buffer.lineno(chunk_start),
+                data[chunk_start:chunk_end],
+                chunk_jobs,
+            ))
+
+        _chunk_linter = self
+        try:
+            if len(chunks) <= 1:
+                chunk_errors = list(map(_check_chunk, chunks))
+            else:
+                with multiprocessing.get_context('fork').Pool(min(jobs, len(chunks))) as pool:
+                    chunk_errors = pool.map(_check_chunk, chunks)
+        finally:
+            _chunk_linter = None
+
+        # 4) merge the errors; [sorted] is stable, so a missing [Proof] line is still reported before
+        #    a policy violation of the same sentence
+        for errors, matcher_records in chunk_errors:
+            indexed_errors.extend(errors)
+            MATCHER_STATS.merge(matcher_records)
+        indexed_errors.sort(key=lambda indexed_error: indexed_error[0])
+        self._errors = [error for _, error in indexed_errors]
+
+        if failure:
+            failure.partial_linting_errors = self._errors
+            raise failure
+        return LintResult(buffer, self._errors, [])
+
+    # Lint the result of applying [edit] to [previous_result.buffer()]: linting resumes from the
+    # last checkpoint before the edit (with the linter state restored from that checkpoint) and
+    # stops as soon as it reaches a checkpoint - past the edit - whose state matches the previous
+    # run, at which point the remaining errors and checkpoints are reused (shifted by the size of
+    # the edit).
+    def relint(self, previous_result, edit, sentence_timeout=SENTENCE_TIMEOUT):
+        old_buffer = previous_result.buffer()
+        old_data = old_buffer.data()
+        replacement = edit.replacement.encode('UTF-8')
+        new_buffer = SourceBuffer(
+            old_data[:edit.start] + replacement + old_data[edit.end:],
+            old_buffer.name(),
+        )
+
+        # v-- NOTE: a file with a [[NOLINT-FILE]] header records no checkpoints
+        if not previous_result.checkpoints() or SentenceParser(new_buffer).nolint_file():
+            return self.lint(new_buffer, record_checkpoints=True, sentence_timeout=sentence_timeout)
+
+        offset_delta = len(replacement) - (edit.end - edit.start)
+        lineno_delta = replacement.count(b'\n') - old_data.count(b'\n', edit.start, edit.end)
+        new_edit_end = edit.start + len(replacement)
+
+        old_errors = previous_result.errors()
+        old_checkpoints = previous_result.checkpoints()
+        resume_index = previous_result.last_checkpoint_before(edit.start)
+        resume_offset, resume_error_count, resume_state = old_checkpoints[resume_index]
+
         self.reset()
-        self._filename = f.name
-        sentence_parser = SentenceParser(f)
+        self._filename = new_buffer.name()
+        self._sentence_timeout = sentence_timeout
+        self._restore_state(resume_state)
+        self._errors = old_errors[:resume_error_count]
+        checkpoints = old_checkpoints[:resume_index]
+
+        # v-- splice in the tail of [previous_result] once linting resynchronizes with it
+        def try_converge(offset, state):
+            if offset <= new_edit_end: return False
+
+            i = previous_result.checkpoint_at(offset - offset_delta)
+            if i is None: return False
+
+            _, old_error_count, old_state = old_checkpoints[i]
+            if old_state != state: return False
+
+            error_count_delta = len(self._errors) - old_error_count
+            self._errors.extend(
+                error._replace(
+                    starting_lineno=error.starting_lineno + lineno_delta,
+                    ending_lineno=error.ending_lineno + lineno_delta,
+                )
+                for error in old_errors[old_error_count:]
+            )
+            checkpoints.extend(
+                (old_offset + offset_delta, old_error_count + error_count_delta, new_state)
+                for (old_offset, old_error_count, _), new_state in zip(
+                    old_checkpoints[i:],
+                    LintSession._shift_states(
+                        [old_state for _, _, old_state in old_checkpoints[i:]],
+                        lineno_delta,
+                    ),
+                )
+            )
+            return True
 
+        sentence_parser = SentenceParser(new_buffer)
+        sentence_parser.seek(resume_offset)
+        self._lint_sentences(sentence_parser, checkpoints, try_converge=try_converge)
+        return LintResult(new_buffer, self._errors, checkpoints)
+
+    # Shift the line numbers of the [_info_stacks] entries in [states] (cf. [_snapshot_state]) which
+    # were pushed after the first state by [lineno_delta]; the entries which are present throughout
+    # (i.e. never popped) are left untouched.
+    def _shift_states(states, lineno_delta):
+        if not lineno_delta:
+            yield from states
+            return
+
+        def shift(info):
+            return tuple(x + lineno_delta if type(x) is int else x for x in info)
+
+        min_depths = None
+        previous_state = shifted_state = None
+        for state in states:
+            # v-- NOTE: consecutive checkpoints share their state when nothing changes
+            if state is not previous_state:
+                info_stacks = state[1]
+                if min_depths is None:
+                    min_depths = {ctx: len(infos) for ctx, infos in info_stacks}
+                for ctx, infos in info_stacks:
+                    min_depths[ctx] = min(min_depths[ctx], len(infos))
+
+                shifted_state = (
+                    state[0],
+                    tuple(
+                        (ctx, tuple(
+                            shift(info) if i < len(infos) - min_depths[ctx] else info
+                            for i, info in enumerate(infos)
+                        ))
+                        for ctx, infos in info_stacks
+                    ),
+                ) + state[2:]
+                previous_state = state
+            yield shifted_state
+
+    # Skip the sentences of the current proof body which can neither change the context nor be
+    # denied - without decoding or classifying them - and return the span of the next sentence
+    # which must be linted (or [None] at the end of the buffer).
+    #
+    # NOTES:
+    # - a sentence is skipped if the [CompiledPolicy.proof_body_screen] doesn't find anything
+    #   within its body (or in the comments erased from it, which only skips fewer sentences); the
+    #   screen is searched once per run of skipped sentences rather than once per sentence
+    # - a skipped sentence is allowed and checks its (elided) [Proof] line exactly as
+    #   [check_policy] would, which is why the first sentence of a proof which expects a [Proof]
+    #   line is never skipped
+    def _skip_proof_body(self, sentence_parser):
+        screen = self._compiled_policy.proof_body_screen()
+        if screen is None: return sentence_parser.get_next_span()
+
+        data = sentence_parser.buffer().data()
+        # v-- the offset of the next match of [screen] (at or past [stop] nothing is skipped)
+        stop = -1
+        while True:
+            span = sentence_parser.get_next_span()
+            if not span or self.proof_line_missing(): return span
+
+            _, body_start, end, _, _, nolint = span
+            # v-- NOTE: the [[NOLINT-BEGIN]]/[[NOLINT-END]] regions are tracked by [_lint_sentences]
+            if self._nolint_region or nolint & (NOLINT_REGION_BEFORE | NOLINT_REGION_AFTER): return span
+            if stop < body_start:
+                if MATCHER_STATS.enabled:
+                    screen_match = MATCHER_STATS.call(screen, screen.search, data, body_start, len(data))
+                else:
+                    screen_match = screen.search(data, body_start)
+                stop = screen_match.start() if screen_match else len(data)
+            # v-- NOTE: [.] itself is unrecognized rather than allowed (cf. [is_any_sentence])
+            if stop < end or end - body_start < 2: return span
+
+            if not nolint & NOLINT_SENTENCE: self.check_proof_line(None, None, None)
+
+    def _lint_sentences(self, sentence_parser, checkpoints=None, try_converge=None):
         # Psueodocode of loop (for each non-[None] [result]):
-        # 1) Check if the [comment_snippets] contain a [NOLINT] substring
+        # 0) Record a checkpoint (if requested) - reusing the previous state if nothing changed
+        # 1) Check if the comments preceding the sentence contain a [NOLINT] substring - or if the
+        #    sentence lies within a [NOLINT-BEGIN]/[NOLINT-END] region
         # 2) Check if a new context was entered and if so, push info onto the appropiate stack
         #    and continue
         # 3) Check if the existing context was exited and if so, pop from the appropriate stack
@@ -588,38 +1509,148 @@ class CoqLinter:
         # 4) check the current sentence against the (contextual) policy - if linting hasn't been disabled
         #
         # NOTE: [coqc] ensures that things are properly bracketed/nested.
-        while True:
-            try:
-                result = sentence_parser.get_next_sentence(inside_interactive_proof=self.in_proof_ctx())
-            except RuntimeError as e:
-                raise RuntimeError_PartialLint(e, self._errors, parsing_issue=True)
-
-            if not result: break
-            sentence, starting_lineno, ending_lineno, comment_snippets, maybe_nested_comment = result
-
-            # 1) Check if the [comment_snippets] contain a "[[NOLINT]]" substring
-            #
-            # NOTE: in the future we could attempt to disable linting for entire
-            # modules/sections/etc...
-            nolint_next_sentence = any(map(
-                lambda comment_snippet: '[[NOLINT]]' in comment_snippet,
-                comment_snippets
-            ))
-
-            # print('~~~~~~~~~~~~~~~~~~~~~~~~~~')
-            # print(self._context_stack)
-            # print(self._program_definition)
-            # print(self._next_obligation_enter_proof_ctx)
-            # print(sentence)
-            # print(comment_snippets)
-
-            # 3/4): check for context entry/exit and continue if found.
-            if (   self.try_handle_ctx_entry(sentence, starting_lineno, ending_lineno)
-                or self.try_handle_ctx_exit(sentence, starting_lineno, ending_lineno)):
-                continue
-            else:
-                # 5) check the current sentence against the (contextual) policy (if linting hasn't been disabled
+        state = None
+        with SentenceWatchdog(self._sentence_timeout) as watchdog:
+            while True:
+                # 0) Record a checkpoint
+                if checkpoints is not None:
+                    offset = sentence_parser.offset()
+                    new_state = self._snapshot_state()
+                    if new_state != state: state = new_state
+
+                    if try_converge and try_converge(offset, state): break
+                    checkpoints.append((offset, len(self._errors), state))
+
+                try:
+                    # v-- NOTE: checkpoints are recorded for every sentence, so [relint] never skips
+                    if checkpoints is None and self.in_proof_ctx():
+                        span = self._skip_proof_body(sentence_parser)
+                    else:
+                        span = sentence_parser.get_next_span()
+                except RuntimeError as e:
+                    raise RuntimeError_PartialLint(e, self._errors, parsing_issue=True)
+
+                if not span: break
+
+                # v-- NOTE: the sentences within a [[NOLINT-BEGIN]]/[[NOLINT-END]] region are skipped
+                #     unless they might enter/exit a context
+                in_nolint_region = self.in_nolint_region(span[5])
+                if in_nolint_region:
+                    data = sentence_parser.buffer().data()
+                    if MATCHER_STATS.enabled:
+                        mentions_ctx_keyword = MATCHER_STATS.call(CTX_KEYWORDS, CTX_KEYWORDS.search, data, span[0], span[2])
+                    else:
+                        mentions_ctx_keyword = CTX_KEYWORDS.search(data, span[0], span[2])
+                    if not mentions_ctx_keyword: continue
+
+                result = Sentence(sentence_parser.buffer(), span, inside_interactive_proof=self.in_proof_ctx())
+                sentence = result.text()
+                # v-- NOTE: the context handling and the policy share the classification of the sentence
+                kind = self.classify(sentence)
+                starting_lineno = result.starting_lineno
+                ending_lineno = result.ending_lineno
+                # v-- NOTE: the [LintRule]s check the sentence in the context in which it occurs
+                ctx = self.current_ctx()
+
+                # 1) Check if the preceding comments contain a "[[NOLINT]]" substring (which the
+                #    parser records while lexing)
+                #
+                # NOTE: in the future we could attempt to disable linting for entire
+                # modules/sections/etc...
+                nolint_next_sentence = in_nolint_region or result.nolint & NOLINT_SENTENCE
+
+                # print('~~~~~~~~~~~~~~~~~~~~~~~~~~')
+                # print(self._context_stack)
+                # print(self._program_definition)
+                # print(self._next_obligation_enter_proof_ctx)
+                # print(sentence)
+                # print(result.comment_snippets())
+
+                # 3/4): check for context entry/exit and continue if found.
+                #
+                # NOTES:
+                # - only sentences which contain the literals of some [CTX_MATCHERS] can enter/exit
+                #   a context (cf. [SentenceKind.may_change_ctx])
+                # - a sentence which exhausts the budget of the [SentenceWatchdog] is reported and
+                #   skipped, undoing any changes it made to the context
+                handled = False
+                if kind.may_change_ctx():
+                    rollback_state = None
+                    if watchdog.enabled():
+                        rollback_state = state if checkpoints is not None else self._snapshot_state()
+                    try:
+                        watchdog.arm()
+                        handled = (   self.try_handle_ctx_entry(kind, starting_lineno, ending_lineno)
+                                   or self.try_handle_ctx_exit(kind, starting_lineno, ending_lineno))
+                        watchdog.disarm()
+                    except RuntimeError_SentenceTimeout:
+                        self._restore_state(rollback_state)
+                        self.report_sentence_timeout(sentence, starting_lineno, ending_lineno)
+                        continue
+
+                # 5) check the current sentence against the (contextual) policy - unless it entered/exited
+                #    a context - and against the [LintRule]s which subscribe to it (if linting hasn't
+                #    been disabled)
                 if not nolint_next_sentence:
-                    self.check_policy(sentence, starting_lineno, ending_lineno)
+                    if not handled:
+                        self.check_proof_line(sentence, starting_lineno, ending_lineno)
+                    error_count = len(self._errors)
+                    try:
+                        watchdog.arm()
+                        if not handled:
+                            self.check_policy_aux(kind, starting_lineno, ending_lineno)
+                        self.check_rules(kind, ctx, starting_lineno, ending_lineno)
+                        watchdog.disarm()
+                    except RuntimeError_SentenceTimeout:
+                        del self._errors[error_count:]
+                        self.report_sentence_timeout(sentence, starting_lineno, ending_lineno)
+
+# Lints files against a [CompiledPolicy] (compiled from [policy] and [rules] unless one is supplied).
+#
+# NOTES:
+# - each [run]/[lint]/[lint_parallel]/[relint] uses a fresh [LintSession], so a [CoqLinter] holds
+#   no per-file state and can be shared (i.e. by concurrent threads)
+# - the sessions classify sentences through [verdict_cache] (a [VerdictCache]) if one is supplied
+class CoqLinter:
+    def __init__(self, policy, rules=()):
+        self._compiled_policy = policy if isinstance(policy, CompiledPolicy) else CompiledPolicy(policy, rules)
+
+    def compiled_policy(self): return self._compiled_policy
+    def session(self, verdict_cache=None):
+        return LintSession(self._compiled_policy, verdict_cache=verdict_cache)
+
+    # v-- cf. [CompiledPolicy.findings]
+    def policy_findings(self): return self._compiled_policy.findings()
+
+    # v-- cf. [LintSession.run]
+    def run(self, f, span_cache=None, jobs=1, sentence_timeout=SENTENCE_TIMEOUT, verdict_cache=None):
+        return self.session(verdict_cache).run(f, span_cache=span_cache, jobs=jobs, sentence_timeout=sentence_timeout)
+
+    # v-- cf. [LintSession.lint]
+    def lint(
+            self,
+            buffer,
+            record_checkpoints=False,
+            span_cache=None,
+            sentence_timeout=SENTENCE_TIMEOUT,
+            verdict_cache=None,
+    ):
+        return self.session(verdict_cache).lint(
+            buffer,
+            record_checkpoints=record_checkpoints,
+            span_cache=span_cache,
+            sentence_timeout=sentence_timeout,
+        )
+
+    # v-- cf. [LintSession.lint_parallel]
+    def lint_parallel(self, buffer, jobs, span_cache=None, sentence_timeout=SENTENCE_TIMEOUT, verdict_cache=None):
+        return self.session(verdict_cache).lint_parallel(
+            buffer,
+            jobs,
+            span_cache=span_cache,
+            sentence_timeout=sentence_timeout,
+        )
 
-        return self._errors
+    # v-- cf. [LintSession.relint]
+    def relint(self, previous_result, edit, sentence_timeout=SENTENCE_TIMEOUT, verdict_cache=None):
+        return self.session(verdict_cache).relint(previous_result, edit, sentence_timeout=sentence_timeout)
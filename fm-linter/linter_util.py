@@ -1,23 +1,83 @@
 #!/usr/bin/env python3
 
 # Copyright (c) 2023 BlueRock Security, Inc.
+from collections import namedtuple
 from copy import deepcopy
 from coq_regexes import *
-from util import format_ansi_msg, ANSI_RED, ANSI_MAGENTA
+from util import format_ansi_msg, strip_ansi, ANSI_RED, ANSI_MAGENTA
 
 # TODOS:
 # - hyperlink errors
 # - use standard coq error format
 
+# A kind of error: [msg] describes it - as a [str.format] template over the arguments of the
+# error, if it has any - and [rule_id] names it (i.e. [prohibited_use_of_from] for
+# [err_fmt_prohibited_use_of_from], cf. the end of the definitions below).
+#
+# NOTES:
+# - calling an [ErrFmt] with the arguments of the error and the offending sentence formats the
+#   error (cf. [render_error]), so a policy may also use any such callable as an [err_fmt].
+# - the [ERR_FMTS] are singletons (cf. [coq_lint_cache.ResultCache]): a copy of a policy (cf.
+#   [extend_allow_deny_policy]) shares them, and so do the errors which a worker process sends back
+class ErrFmt:
+    __slots__ = ('msg', 'ansi_color', 'rule_id')
+
+    def __init__(self, msg, ansi_color=ANSI_RED, rule_id=None):
+        self.msg        = msg
+        self.ansi_color = ansi_color
+        self.rule_id    = rule_id
+
+    def message(self, args=()):
+        return self.msg.format(*args) if args else self.msg
+
+    def __call__(self, *args_then_sentence):
+        *args, sentence = args_then_sentence
+        return render_error(LintError(self, -1, -1, sentence, tuple(args)))
+
+    def __deepcopy__(self, memo): return self
+
+    def __reduce__(self):
+        if ERR_FMTS.get(self.rule_id) is self:
+            return (err_fmt_of, (self.rule_id,))
+        return (ErrFmt, (self.msg, self.ansi_color, self.rule_id))
+
 def ERR_FMT(msg, ANSI_COLOR=ANSI_RED):
-    def callback(sentence):
-        formatted_sentence = sentence.replace('\n', '\n|')
-        return f'{format_ansi_msg(msg + ":", ANSI_COLOR)}\n|{formatted_sentence}'
+    return ErrFmt(msg, ANSI_COLOR)
+
+# An error found by the linter, which is only formatted when it is reported (cf. [render_error]):
+# the [err_fmt] which describes it, its lines ([-1] if unknown), the offending [sentence], the
+# arguments of [err_fmt] and the category of the file (cf. [coq_lint.lint_coq_file]).
+#
+# NOTE: [sentence] is shared with the linter (and with the [linter.VerdictCache]), so a record
+# costs little more than the tuple itself.
+LintError = namedtuple(
+    'LintError',
+    ['err_fmt', 'starting_lineno', 'ending_lineno', 'sentence', 'args', 'category'],
+    defaults=[(), None],
+)
+
+# v-- i.e. [prohibited_use_of_from], or [None] for an [err_fmt] which isn't an [ErrFmt]
+def error_rule_id(error):
+    return getattr(error.err_fmt, 'rule_id', None)
 
-    return callback
+# v-- the message of [error] without the sentence (or ANSI escapes)
+def error_message(error):
+    if isinstance(error.err_fmt, ErrFmt):
+        return error.err_fmt.message(error.args)
+    return strip_ansi(error.err_fmt(*error.args, error.sentence)).split('\n', 1)[0].removesuffix(':')
 
-def err_fmt_missing_proof_begin(lemma_nm, sentence):
-    return ERR_FMT(f'Expected [Proof] line for [{lemma_nm}] but found')(sentence)
+# Format [error] as the message followed by the sentence (each line prefixed with [|]); if
+# [plain] then no ANSI escapes are used.
+def render_error(error, plain=False):
+    if not isinstance(error.err_fmt, ErrFmt):
+        formatted = error.err_fmt(*error.args, error.sentence)
+        return strip_ansi(formatted) if plain else formatted
+
+    msg = error.err_fmt.message(error.args) + ':'
+    formatted_sentence = error.sentence.replace('\n', '\n|')
+    return f'{msg if plain else format_ansi_msg(msg, error.err_fmt.ansi_color)}\n|{formatted_sentence}'
+
+err_fmt_missing_proof_begin      = ERR_FMT('Expected [Proof] line for [{0}] but found')
 err_fmt_prohibited_use_of_from   = ERR_FMT(f'The [From] keyword should not be used; prefer fully qualified [Import]s/[Export]s')
 err_fmt_set_outside_prelude      = ERR_FMT(f'Flags should be set in a prelude file')
 err_fmt_open_outside_prelude     = ERR_FMT(f'Scopes should be opened in a prelude file')
@@ -36,12 +96,27 @@ err_fmt_unwanted_hint            = ERR_FMT(f'If hints aren\'t used they shouldn\
 err_fmt_non_spec_ok_proof        = ERR_FMT(
     f'Code proof files should only contain C++ code proofs; upstream this'
 )
-def err_fmt_spec_ok_name_mismatch(lhs_spec_nm, rhs_spec_nm, sentence):
-    return ERR_FMT(
-        f'The lemma should be named [{rhs_spec_nm}_ok] rather than [{lhs_spec_nm}_ok]'
-    )(sentence)
+# v-- [(lhs_spec_nm, rhs_spec_nm)]
+err_fmt_spec_ok_name_mismatch    = ERR_FMT(
+    'The lemma should be named [{1}_ok] rather than [{0}_ok]'
+)
 err_fmt_unknown = ERR_FMT(f'the linting policy needs to be extended', ANSI_MAGENTA)
-err_fmt_likely_nested_comment = ERR_FMT(f'the sentence and/or file likely contains a nested comment (which the regex-based parser can not handle)', ANSI_MAGENTA)
+# v-- [(sentence_timeout,)]
+err_fmt_sentence_timeout = ERR_FMT(
+    'matching this sentence took longer than {0}s, so it was skipped (cf. [--sentence-timeout])',
+    ANSI_MAGENTA
+)
+err_fmt_parsing_issue = ERR_FMT(f'the file could not be split into sentences (unbalanced comment/string or unterminated sentence)', ANSI_MAGENTA)
+
+# v-- [rule_id -> ErrFmt] for the formats above (cf. [coq_lint_cache.ResultCache])
+ERR_FMTS = {}
+for name, err_fmt in list(globals().items()):
+    if isinstance(err_fmt, ErrFmt) and err_fmt.rule_id is None:
+        err_fmt.rule_id = name.removeprefix('err_fmt_')
+        ERR_FMTS[err_fmt.rule_id] = err_fmt
+del name, err_fmt
+
+def err_fmt_of(rule_id): return ERR_FMTS[rule_id]
 
 # extend [base_policy] with [policy_extensions] - failing if there are conflicting
 # allow/deny policies (permissible overrides: eager allow -> deny -> allow) and otherwise
@@ -177,6 +252,30 @@ def validate_policy_shape(policy):
             ])
             raise RuntimeError(msg)
 
+# A check which the linter routes only the sentences it subscribes to - those whose leading
+# keyword (cf. [SentenceKind.keyword]) is one of [keywords], and which occur in one of the
+# [contexts] (cf. [CTX_SUBPOLICIES]); [None] subscribes to every keyword/context. [check] maps
+# the [SentenceKind] of a sentence to the [(err_fmt, args)] of an error (cf. [LintError]), or
+# [None].
+#
+# NOTES:
+# - rules are checked in addition to the policy (which decides whether a sentence is allowed at
+#   all), including for the sentences which enter/exit a context
+# - prefer a rule over a new [SentenceMatcher] when the check needs more than a single verdict
+#   (i.e. comparing the parts of a sentence)
+LintRule = namedtuple('LintRule', ['name', 'check', 'keywords', 'contexts'], defaults=[None, None])
+
+def check_spec_ok_name(kind):
+    match = kind.match(SentenceMatchers.SPEC_OK)
+    if match is None: return None
+
+    lhs_spec_nm = match.group(GroupNames.SPEC_OK_LHS_NM_KEY)
+    rhs_spec_nm = match.group(GroupNames.SPEC_OK_RHS_NM_KEY)
+    if lhs_spec_nm == rhs_spec_nm: return None
+    return (err_fmt_spec_ok_name_mismatch, (lhs_spec_nm, rhs_spec_nm))
+
+# v-- i.e. [Lemma foo_ok : denote_module M |-- bar.] should be named [bar_ok]
+rule_spec_ok_name = LintRule('spec_ok_name', check_spec_ok_name, keywords=('Lemma', 'Theorem'))
 
 # NOTE: the following [SentenceMatchers] are handled specially:
 # - PROOF_BEGIN/PROOF_END (when the proof is not a oneliner)
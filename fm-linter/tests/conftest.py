@@ -0,0 +1,6 @@
+# Copyright (c) 2023 BlueRock Security, Inc.
+import sys
+from pathlib import Path
+
+# v-- the linter modules live (unpackaged) in the parent directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,10 @@
+(*
+ * Copyright (c) 2023 BlueRock Security, Inc.
+ * This software is distributed under the terms of the BedRock Open-Source License.
+ * See the LICENSE-BedRock file in the repository root for details.
+ *)
+
+Section indented.
+  From Coq Require Import
+    ZArith.
+End indented.
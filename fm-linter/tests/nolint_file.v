@@ -0,0 +1,11 @@
+(*
+ * Copyright (c) 2023 BlueRock Security, Inc.
+ * This software is distributed under the terms of the BedRock Open-Source License.
+ * See the LICENSE-BedRock file in the repository root for details.
+ *)
+
+(* [[NOLINT-FILE]] *)
+
+Set Nested Proofs Allowed.
+Section nolint.
+  #[local] Open Scope N_scope.
@@ -0,0 +1,17 @@
+(*
+ * Copyright (c) 2023 BlueRock Security, Inc.
+ * This software is distributed under the terms of the BedRock Open-Source License.
+ * See the LICENSE-BedRock file in the repository root for details.
+ *)
+
+Set Nested Proofs Allowed.
+(* [[NOLINT-BEGIN]] *)
+Set Printing All.
+Section nolint.
+  #[local] Open Scope N_scope.
+(* [[NOLINT-END]] *)
+  #[local] Open Scope Z_scope.
+End nolint.
+(* [[NOLINT]] *)
+Set Printing Coercions.
+Set Printing Implicit.
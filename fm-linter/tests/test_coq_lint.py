@@ -0,0 +1,176 @@
+# Copyright (c) 2023 BlueRock Security, Inc.
+import json
+import re
+from pathlib import Path
+import pytest
+import coq_lint
+import linter
+from util import changed_coq_files, run_git
+
+TESTS_DIR = Path(__file__).resolve().parent
+
+def run_coq_lint(*argv):
+    parser = coq_lint.mk_arg_parser()
+    return coq_lint.run_args(parser, parser.parse_args([str(arg) for arg in argv]))
+
+def test_extra_code_proofs(capsys):
+    assert run_coq_lint('--use-ci-output-format', '--extra-code-proofs', TESTS_DIR / 'simple_fail.v') == 1
+    output = capsys.readouterr().out
+    assert 'simple_fail.v' in output
+    assert '[line 9] Scopes should be opened in a prelude file:' in output
+
+    assert run_coq_lint('--extra-code-proofs', TESTS_DIR / 'simple_pass.v') == 0
+
+# v-- [--check-policies] reports the findings of the policies (without ANSI escapes for the CI)
+def test_check_policies(capsys):
+    assert run_coq_lint('--use-ci-output-format', '--check-policies') == 0
+    output = capsys.readouterr().out
+    assert '- proof\n' in output
+    assert '\x1b' not in output
+
+    assert run_coq_lint('--check-policies') == 0
+    assert '\x1b' in capsys.readouterr().out
+
+# v-- only the sentences outside of the [[NOLINT]]s are reported, whether the files are linted
+#     sequentially or in parallel
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_nolint(monkeypatch, capsys, jobs):
+    monkeypatch.setattr(linter, 'PARALLEL_LINT_THRESHOLD', 0)
+    assert run_coq_lint(
+        '--use-ci-output-format',
+        '--intra-file-jobs', jobs,
+        '--extra-code-proofs', TESTS_DIR / 'nolint_regions.v', TESTS_DIR / 'nolint_file.v',
+    ) == 1
+    output = capsys.readouterr().out
+    assert re.findall(r'\[line (\d+)\]', output) == ['7', '13', '17']
+    assert 'nolint_file.v' not in output
+
+# v-- [--format jsonl] streams the findings of the text report (then a summary), whatever [--jobs]
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_jsonl(capsys, jobs):
+    targets = [TESTS_DIR / name for name in ['simple_fail.v', 'nolint_regions.v', 'simple_pass.v', 'missing.v']]
+    status = run_coq_lint('--use-ci-output-format', '--extra-code-proofs', *targets)
+    report = capsys.readouterr().out
+    assert run_coq_lint('--format', 'jsonl', '--jobs', jobs, '--extra-code-proofs', *targets) == status == 1
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert records[0] == {'type': 'argument_error', 'kind': 'missing_target', 'path': str(targets[3])}
+    findings = [record for record in records if record['type'] == 'finding']
+    assert sorted(
+        (Path(finding['path']).name, finding['starting_lineno'], finding['message'])
+        for finding in findings
+    ) == sorted(
+        (Path(path).name, int(lineno), message)
+        for path, findings_report in re.findall(r'^- (\S+)\n((?:\t.*\n)*)', report, re.MULTILINE)
+        for lineno, message in re.findall(r'\[line (\d+)\] (.*):', findings_report)
+    )
+
+    summary = records[-1]
+    assert summary['type'] == 'summary' and records.count(summary) == 1
+    assert (summary['files'], summary['files_with_findings'], summary['findings']) == (3, 2, len(findings))
+    assert summary['status'] == 1
+
+# v-- the files of a proof directory are linted (and reported) in order, whatever the hash seed
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_proof_dir_order(tmp_path, capsys, jobs):
+    proof_dir = tmp_path / 'proof'
+    for relative_path in ['spec/b.v', 'spec/a.v', 'model/c.v', 'proof/a.v', 'proof/z/b.v', 'proof/b.v', 'other.v']:
+        (proof_dir / relative_path).parent.mkdir(parents=True, exist_ok=True)
+        (proof_dir / relative_path).write_bytes((TESTS_DIR / 'simple_fail.v').read_bytes())
+
+    targets = coq_lint.proof_dir_targets(proof_dir.resolve())
+    assert [filepath for filepath, _ in targets] == sorted(proof_dir.resolve().rglob('*.v'))
+
+    assert run_coq_lint('--use-ci-output-format', '--jobs', jobs, '--proof-dirs', proof_dir) == 1
+    paths = re.findall(r'^\t\+ (\S+\.v)$', capsys.readouterr().out, re.MULTILINE)
+    assert paths == sorted(paths) and 3 <= len(paths)
+
+# v-- the files of a git repository in [tmp_path] (cf. [test_changed_since]) and whether each of
+#     them changed since [main] (i.e. since the merge base of [main] and [HEAD])
+CHANGED_SINCE_FILES = {
+    'proof/spec/modified.v':      True,
+    'proof/proof/unchanged.v':    False,
+    'proof/model/added.v':        True,
+    'proof/proof/untracked.v':    True,
+    'proof/spec/deleted.v':       False,
+    'proof/proof/renamed.v':      False,
+    'proof/proof/edited.v':       True,
+    'proof/main_only.v':          False,
+    'proof/notes.txt':            False,
+    'other/modified.v':           False,
+}
+
+@pytest.fixture
+def changed_since_repo(tmp_path):
+    repo = tmp_path / 'repo'
+    repo.mkdir()
+    git = lambda *args: run_git(repo, *args)
+    # v-- NOTE: the contents of the files differ, so that git doesn't pair them up as renames
+    write = lambda name, suffix='': (repo / name).write_text(
+        f'(* {name} *)\n' + (TESTS_DIR / 'simple_pass.v').read_text() + suffix,
+    )
+    git('init', '-q')
+    git('config', 'user.name', 'test')
+    git('config', 'user.email', 'test@example.com')
+    git('config', 'commit.gpgsign', 'false')
+    git('checkout', '-q', '-b', 'main')
+
+    for name in ['proof/spec/modified.v', 'proof/proof/unchanged.v', 'proof/spec/deleted.v', 'proof/proof/moved.v',
+                 'proof/proof/to_edit.v', 'proof/notes.txt', 'other/modified.v']:
+        (repo / name).parent.mkdir(parents=True, exist_ok=True)
+        write(name)
+    git('add', '-A')
+    git('commit', '-q', '-m', 'base')
+
+    # v-- NOTE: the changes which [main] gained since the branch forked off don't count
+    git('checkout', '-q', '-b', 'branch')
+    git('checkout', '-q', 'main')
+    write('proof/proof/unchanged.v', '\n(* main *)\n')
+    write('proof/main_only.v')
+    git('add', '-A')
+    git('commit', '-q', '-m', 'main')
+    git('checkout', '-q', 'branch')
+
+    (repo / 'proof/model').mkdir()
+    write('proof/model/added.v')
+    git('add', '-A')
+    git('commit', '-q', '-m', 'added')
+    write('proof/spec/modified.v', '\n(* modified *)\n')
+    write('proof/notes.txt', '\n(* modified *)\n')
+    write('other/modified.v', '\n(* modified *)\n')
+    write('proof/proof/untracked.v')
+    (repo / 'proof/proof/untracked.vo').write_bytes(b'\0')
+    git('rm', '-q', 'proof/spec/deleted.v')
+    git('mv', 'proof/proof/moved.v', 'proof/proof/renamed.v')
+    git('mv', 'proof/proof/to_edit.v', 'proof/proof/edited.v')
+    write('proof/proof/edited.v', '\n(* edited *)\n')
+    return repo
+
+# v-- with [--changed-since], only the added or modified [.v] files within the targets are linted,
+#     each with the category it would otherwise get
+@pytest.mark.parametrize('mode', ['proof_dirs', 'common'])
+def test_changed_since(monkeypatch, capsys, changed_since_repo, mode):
+    repo = changed_since_repo.resolve()
+    expected = {repo / name for name, changed in CHANGED_SINCE_FILES.items() if changed}
+    assert changed_coq_files('main', [repo / 'proof']) == expected
+
+    linted = []
+    lint_coq_files = coq_lint.lint_coq_files
+    def recording_lint_coq_files(targets, *args, **kwargs):
+        linted.extend(targets)
+        return lint_coq_files(targets, *args, **kwargs)
+    monkeypatch.setattr(coq_lint, 'lint_coq_files', recording_lint_coq_files)
+
+    if mode == 'proof_dirs':
+        assert run_coq_lint('--changed-since', 'main', '--proof-dirs', repo / 'proof') == 0
+        assert linted == [target for target in coq_lint.proof_dir_targets(repo / 'proof') if target[0] in expected]
+        assert {category for _, category in linted} == {'spec', 'model', 'proof'}
+    else:
+        assert run_coq_lint('--changed-since', 'main', repo / 'proof') == 1
+        assert sorted(linted) == sorted((filepath, coq_lint.IMPORT_EXPORT_PASS_CATEGORY) for filepath in expected)
+
+    # v-- an unknown revision is an error (rather than a reason to lint every file)
+    with pytest.raises(SystemExit) as exc_info:
+        run_coq_lint('--changed-since', 'no-such-rev', repo / 'proof')
+    assert exc_info.value.code == 2
+    assert 'no-such-rev' in capsys.readouterr().err
@@ -0,0 +1,46 @@
+# Copyright (c) 2023 BlueRock Security, Inc.
+import sys
+import pytest
+from coq_lint_daemon import LintDaemon, RequestStream
+from coq_policy import MATCHER_STATS
+from test_coq_lint import TESTS_DIR, run_coq_lint
+
+@pytest.fixture
+def daemon(tmp_path):
+    with LintDaemon(tmp_path / 'lint.sock', None, None) as daemon:
+        yield daemon
+
+# v-- the response of [daemon] to a request (cf. [coq_lint_daemon.main])
+def serve(monkeypatch, daemon, argv, cwd):
+    monkeypatch.setattr(sys, 'stdout', RequestStream(sys.stdout))
+    monkeypatch.setattr(sys, 'stderr', RequestStream(sys.stderr))
+    return daemon.serve_request(argv, str(cwd), {})
+
+# v-- a request is answered exactly as [coq_lint.py] would answer it (run from the [cwd] of the
+#     request), including the spelling of the targets
+@pytest.mark.parametrize('argv', [
+    ['--use-ci-output-format', '--extra-code-proofs', 'simple_fail.v', 'missing.v', '../tests/simple_pass.v'],
+    ['--use-ci-output-format', 'simple_pass.v', 'missing.v'],
+    ['--format', 'jsonl', '--extra-code-proofs', 'simple_fail.v', 'missing.v'],
+])
+def test_request(tmp_path, monkeypatch, capsys, daemon, argv):
+    monkeypatch.chdir(TESTS_DIR)
+    status = run_coq_lint(*argv)
+    stdout = capsys.readouterr().out
+
+    monkeypatch.chdir(tmp_path)
+    response = serve(monkeypatch, daemon, argv, TESTS_DIR)
+    assert response['status'] == status
+    assert 'missing.v' in response['stdout'] and str(TESTS_DIR / 'missing.v') not in response['stdout']
+    if '--format' in argv:
+        # v-- NOTE: the summary records the time taken
+        stdout, response['stdout'] = [output.rsplit('\n', 2)[0] for output in (stdout, response['stdout'])]
+    assert response['stdout'] == stdout
+
+# v-- the arguments which the daemon can't honour are rejected (rather than ignored)
+@pytest.mark.parametrize('flags', [['--matcher-stats'], ['--sentence-timeout', '5']])
+def test_unsupported_args(monkeypatch, daemon, flags):
+    response = serve(monkeypatch, daemon, flags + ['simple_pass.v'], TESTS_DIR)
+    assert response['status'] == 2
+    assert f'[{flags[0]}] is not supported' in response['stderr']
+    assert not MATCHER_STATS.enabled
@@ -0,0 +1,29 @@
+# Copyright (c) 2023 BlueRock Security, Inc.
+from pathlib import Path
+import pytest
+from coq_lint import IMPORT_EXPORT_PASS_CATEGORY, lint_coq_file, lint_coq_files
+from coq_lint_cache import MemoryResultCache, ResultCache
+
+TESTS_DIR = Path(__file__).resolve().parent
+
+# v-- a finding within a [Section] (i.e. checked against a copy of the global policy) is cached
+@pytest.mark.parametrize('mk_result_cache', [ResultCache, lambda _: MemoryResultCache()])
+def test_section_finding_is_cached(tmp_path, mk_result_cache):
+    result_cache = mk_result_cache(str(tmp_path))
+    path = TESTS_DIR / 'indented_sentence.v'
+
+    errors = lint_coq_file(path, IMPORT_EXPORT_PASS_CATEGORY, result_cache=result_cache)
+    assert errors and (result_cache.hits, result_cache.misses) == (0, 1)
+    assert lint_coq_file(path, IMPORT_EXPORT_PASS_CATEGORY, result_cache=result_cache) == errors
+    assert (result_cache.hits, result_cache.misses) == (1, 1)
+
+# v-- the errors which the [--jobs] workers find (and cache) are those of a sequential run
+def test_parallel_results_are_cached(tmp_path):
+    targets = [(path, 'proof') for path in sorted(TESTS_DIR.glob('*.v'))]
+    expected = lint_coq_files(targets)
+
+    result_cache = ResultCache(str(tmp_path))
+    assert lint_coq_files(targets, jobs=2, result_cache=result_cache) == expected
+    assert (result_cache.hits, result_cache.misses) == (0, len(targets))
+    assert lint_coq_files(targets, result_cache=result_cache) == expected
+    assert (result_cache.hits, result_cache.misses) == (len(targets), len(targets))
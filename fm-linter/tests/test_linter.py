@@ -0,0 +1,315 @@
+# Copyright (c) 2023 BlueRock Security, Inc.
+import re
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import linter
+from coq_policy import MatcherStats
+from coq_lint import COQ_LINTERS, GENERIC_COQ_LINTER_COMMON, GENERIC_COQ_LINTER_NO_RESTRICTIONS, GLOBAL_ALLOW_DENY_POLICY_NO_RESTRICTIONS
+from coq_sentence_parser import SentenceParser, SourceBuffer
+from linter import VERDICT_CACHE_ENTRIES, CoqLinter, CompiledPolicy, LintSession, TextEdit, VerdictCache
+from coq_regexes import SentenceMatchers
+from linter_util import err_fmt_prohibited_use_of_from, err_fmt_sentence_timeout, err_fmt_spec_ok_name_mismatch
+from linter_util import mk_allow_deny_policy, mk_policy, render_error, rule_spec_ok_name
+from test_matchers import corpus_texts
+
+LINTERS = dict(COQ_LINTERS, common=GENERIC_COQ_LINTER_COMMON)
+
+# v-- the verdicts of the [mk_pat] classifier which [is_interactive_sentence] replaced
+@pytest.mark.parametrize('sentence, interactive', [
+    ('Lemma x : True.', True),
+    ('Instance x : C := _.', False),
+    ('Instance x : C (a := 1).', True),
+    ('Instance x : C [a := 1].', True),
+    ('Instance x : C := {| a := 1 |}.', False),
+    ('Instance x : C {| a := 1 |}.', True),
+    ('Instance x : C <a := 1>.', True),
+    ('Instance x : C |a := 1|.', True),
+    ('Instance x : C "a := b".', False),
+    ('Instance x : C (a := (f (g y))).', True),
+    ('Instance x : C (a := (1)%Z).', True),
+    ('Lemma x : let y := 1 in y = 1.', True),
+    ('Instance i : {x | P x} := match x with | A => 1 end.', True),
+    ('Definition x : nat.', True),
+    ('Definition x := 1.', False),
+    ('#[program] Instance x : C := _.', True),
+    ('Module M := N.', False),
+])
+def test_is_interactive_sentence(sentence, interactive):
+    assert LintSession.is_interactive_sentence(sentence) == interactive
+
+# v-- [is_interactive_sentence] takes linear time: quadrupling the sentence (at most) quadruples
+#     the time, up to noise (a quadratic scan would take sixteen times as long)
+@pytest.mark.parametrize('mk_sentence', [
+    lambda n: 'Instance x : ' + '(a ' * n + ':= b.',
+    lambda n: 'let ' * n + ':= b.',
+    lambda n: 'Instance x : C {| ' + 'a := (f x); ' * n + '|}.',
+    lambda n: 'Instance x : ' + '<a | b := ' * n + 'c.',
+])
+def test_is_interactive_sentence_scaling(mk_sentence):
+    def time_of(n):
+        sentence = mk_sentence(n)
+        times = []
+        for _ in range(3):
+            started = time.perf_counter()
+            LintSession.is_interactive_sentence(sentence)
+            times.append(time.perf_counter() - started)
+        return min(times)
+    assert time_of(20000) < 8 * time_of(5000)
+
+# v-- the errors of [text] (or the message of the [RuntimeError] raised instead)
+def lint_text(session, text, **kwargs):
+    try:
+        return session.run(SourceBuffer.from_text(text, '<corpus>'), **kwargs)
+    except RuntimeError as e:
+        return str(e)
+
+# v-- concurrent [LintSession]s which share a [CompiledPolicy] find the same errors as sequential ones
+@pytest.mark.parametrize('linter_nm', sorted(LINTERS))
+def test_concurrent_sessions(linter_nm):
+    linter = LINTERS[linter_nm]
+    texts = corpus_texts(files=8) * 2
+    expected = [lint_text(linter.session(), text) for text in texts]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(lambda text: lint_text(linter.session(), text), texts)) == expected
+
+# v-- a [VerdictCache] shared across files (and policies) changes none of their errors
+@pytest.mark.parametrize('max_entries', [16, VERDICT_CACHE_ENTRIES])
+def test_verdict_cache(max_entries):
+    verdict_cache = VerdictCache(max_entries=max_entries)
+    texts = corpus_texts(files=8)
+    for linter_nm in sorted(LINTERS):
+        linter = LINTERS[linter_nm]
+        expected = [lint_text(linter.session(), text) for text in texts]
+        assert [lint_text(linter.session(verdict_cache), text) for text in texts] == expected, linter_nm
+
+    hits, misses, entries = verdict_cache.stats()
+    assert 0 < hits and entries <= max_entries
+
+# v-- skipping the proof bodies which can't be denied (cf. [CompiledPolicy.proof_body_screen])
+#     changes none of the errors, whether a file is linted sequentially or in parallel
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_proof_body_screen(monkeypatch, jobs):
+    monkeypatch.setattr(linter, 'PARALLEL_LINT_THRESHOLD', 0)
+    texts = corpus_texts(files=8)
+    linters = dict(LINTERS, no_restrictions=GENERIC_COQ_LINTER_NO_RESTRICTIONS)
+    screened = {
+        linter_nm: [lint_text(linters[linter_nm].session(), text, jobs=jobs) for text in texts]
+        for linter_nm in sorted(linters)
+    }
+
+    monkeypatch.setattr(CompiledPolicy, 'proof_body_screen', lambda self: None)
+    for linter_nm in sorted(linters):
+        unscreened = [lint_text(linters[linter_nm].session(), text, jobs=jobs) for text in texts]
+        assert screened[linter_nm] == unscreened, linter_nm
+
+# v-- [rule_spec_ok_name] reports (only) the [Lemma]s/[Theorem]s named after the wrong spec,
+#     whether a file is linted sequentially or in parallel
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_rule_spec_ok_name(monkeypatch, jobs):
+    monkeypatch.setattr(linter, 'PARALLEL_LINT_THRESHOLD', 0)
+    session = CoqLinter(mk_policy(GLOBAL_ALLOW_DENY_POLICY_NO_RESTRICTIONS), [rule_spec_ok_name]).session()
+    errors = lint_text(session, '\n'.join([
+        'Section S.',
+        'Lemma foo_ok : denote_module M |-- bar.',
+        'Proof. auto. Qed.',
+        'Theorem bar_ok : denote_module M |-- bar.',
+        'Proof. auto. Qed.',
+        'Theorem baz_ok : denote_module M |-- qux.',
+        'Proof. auto. Qed.',
+        'End S.',
+    ]) + '\n', jobs=jobs)
+    assert [(error.starting_lineno, error.err_fmt, error.args) for error in errors] == [
+        (2, err_fmt_spec_ok_name_mismatch, ('foo', 'bar')),
+        (6, err_fmt_spec_ok_name_mismatch, ('baz', 'qux')),
+    ]
+    assert render_error(errors[0], plain=True).startswith('The lemma should be named [bar_ok] rather than [foo_ok]:')
+
+    # v-- without the rule, the same text is allowed
+    assert lint_text(GENERIC_COQ_LINTER_NO_RESTRICTIONS.session(), 'Lemma foo_ok : denote_module M |-- bar.\n') == []
+
+# v-- [--matcher-stats] records the searches of [CTX_KEYWORDS] within [[NOLINT-BEGIN]]/[[NOLINT-END]]
+#     regions and those of the [CompiledPolicy.proof_body_screen] (under its own name)
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_matcher_stats(monkeypatch, jobs):
+    monkeypatch.setattr(linter, 'PARALLEL_LINT_THRESHOLD', 0)
+    monkeypatch.setattr(linter, 'MATCHER_STATS', MatcherStats().enable())
+    assert COQ_LINTERS['proof'].compiled_policy().proof_body_screen() is not linter.CTX_KEYWORDS
+    lint_text(COQ_LINTERS['proof'].session(), '\n'.join([
+        '(* [[NOLINT-BEGIN]] *)',
+        'Set Printing All.',
+        '(* [[NOLINT-END]] *)',
+        'Lemma x : True.',
+        'Proof.',
+        '  auto.',
+        '  trivial.',
+        'Qed.',
+    ]) + '\n', jobs=jobs)
+
+    calls = {name: calls for name, calls, *_ in linter.MATCHER_STATS.report()}
+    assert 0 < calls['linter.CTX_KEYWORDS'] and 0 < calls['CompiledPolicy.proof_body_screen']
+
+# v-- a file of [blocks] blocks, each of which has a proof, a [Section]/[Module] and a NOLINT region
+#     (and errors within all but the region) for the proof policy
+def relint_text(blocks=20):
+    return ''.join(
+        '\n'.join([
+            f'Section s{i}.',
+            f'  #[local] Open Scope N_scope.',
+            f'  Lemma l{i} : True.',
+            f'  Proof.',
+            f'    auto.',
+            f'  Qed.',
+            f'  Module m{i}.',
+            f'    Set Nested Proofs Allowed.',
+            f'  End m{i}.',
+            f'  (* [[NOLINT-BEGIN]] *)',
+            f'  Set Printing All.',
+            f'  (* [[NOLINT-END]] *)',
+            f'End s{i}.',
+        ]) + '\n'
+        for i in range(blocks)
+    )
+
+# v-- [(old, new)] edits of the block in the middle of [relint_text] - and whether the rest of the
+#     file is unaffected by the edit (so [relint] should splice in the tail of the previous result)
+RELINT_EDITS = [
+    # v-- before the proof
+    ('  Lemma l10 :',                       '  #[local] Open Scope Z_scope.\n\n  Lemma l10 :',          True),
+    ('Open Scope N_scope.\n  Lemma l10',    'Open Scope Z_scope.\n  Lemma l10',                      True),
+    # v-- inside the proof
+    ('  Proof.\n    auto.\n  Qed.\n  Module m10', '  Proof.\n    admit.\n    auto.\n  Qed.\n  Module m10',  True),
+    # v-- NOTE: the missing [Proof] line is only logged once per file
+    ('Lemma l10 : True.\n  Proof.\n',       'Lemma l10 : True.\n',                                   False),
+    ('  Qed.\n  Module m10',                '  Admitted.\n  Module m10',                             True),
+    # v-- after the proof
+    ('  Module m10.',                       '  Set Printing All.\n  Module m10.',                    True),
+    # v-- inside the [Module]/[Section]
+    ('  Module m10.\n',                     '  Module m10.\n    Set Printing Coercions.\n\n',        True),
+    ('  End m10.\n',                        '',                                                      False),
+    ('Section s10.\n',                      'Section s10.\n  Section t10.\n  End t10.\n',             True),
+    ('End s10.\n',                          'End s10.\nModule n10.\n',                               False),
+    # v-- inside the NOLINT region
+    ('Set Nested Proofs Allowed.\n  End m10.\n  (* [[NOLINT-BEGIN]] *)\n',
+     'Set Nested Proofs Allowed.\n  End m10.\n  (* [[NOLINT-BEGIN]] *)\n  Set Printing Implicit.\n\n', True),
+    ('  Set Printing All.\n  (* [[NOLINT-END]] *)\nEnd s10.',  '  (* [[NOLINT-END]] *)\nEnd s10.',       True),
+    # v-- NOTE: the region then ends at the [[NOLINT-END]] of the next block
+    ('  (* [[NOLINT-END]] *)\nEnd s10.',    'End s10.',                                              True),
+]
+
+# v-- [relint] finds the same errors (and checkpoints) as linting the edited buffer afresh and,
+#     unless the edit affects the rest of the file, only re-lints the sentences around the edit
+@pytest.mark.parametrize('old, new, converges', RELINT_EDITS)
+def test_relint(monkeypatch, old, new, converges):
+    proof_linter = COQ_LINTERS['proof']
+    old_text = relint_text()
+    assert old_text.count(old) == 1
+    new_text = old_text.replace(old, new)
+
+    previous_result = proof_linter.lint(SourceBuffer.from_text(old_text, '<relint>'), record_checkpoints=True)
+    edit = TextEdit.between(old_text.encode('UTF-8'), new_text.encode('UTF-8'))
+    assert edit.start and edit.end < len(old_text)
+
+    spans = []
+    get_next_span = SentenceParser.get_next_span
+    monkeypatch.setattr(SentenceParser, 'get_next_span', lambda self: spans.append(get_next_span(self)) or spans[-1])
+    result = proof_linter.relint(previous_result, edit)
+    monkeypatch.undo()
+
+    expected = proof_linter.lint(SourceBuffer.from_text(new_text, '<relint>'), record_checkpoints=True)
+    assert result.buffer().data() == expected.buffer().data()
+    assert result.errors() == expected.errors()
+    assert result.checkpoints() == expected.checkpoints()
+
+    # v-- NOTE: linting resumes shortly before the edit, and the errors past it are reused
+    assert 0 < len(spans)
+    assert (len(spans) < len(expected.checkpoints()) // 4) == converges
+    if converges and new.count('\n') != old.count('\n'):
+        assert result.errors()[-1].starting_lineno != previous_result.errors()[-1].starting_lineno
+
+# v-- [relint] falls back to linting the edited buffer afresh when [previous_result] has no checkpoints
+#     - i.e. it wasn't recorded, or the file had a [[NOLINT-FILE]] header - or the edit adds one
+@pytest.mark.parametrize('old_header, new_header, record_checkpoints', [
+    ('',                           '',                           False),
+    ('(* [[NOLINT-FILE]] *)\n',    '',                           True),
+    ('',                           '(* [[NOLINT-FILE]] *)\n',    True),
+])
+def test_relint_fallback(old_header, new_header, record_checkpoints):
+    proof_linter = COQ_LINTERS['proof']
+    old_text = old_header + relint_text(blocks=3)
+    new_text = new_header + relint_text(blocks=3).replace('N_scope', 'Z_scope', 1)
+
+    previous_result = proof_linter.lint(
+        SourceBuffer.from_text(old_text, '<relint>'),
+        record_checkpoints=record_checkpoints,
+    )
+    assert bool(previous_result.checkpoints()) == (record_checkpoints and not old_header)
+    result = proof_linter.relint(
+        previous_result,
+        TextEdit.between(old_text.encode('UTF-8'), new_text.encode('UTF-8')),
+    )
+
+    expected = proof_linter.lint(SourceBuffer.from_text(new_text, '<relint>'), record_checkpoints=True)
+    assert result.errors() == expected.errors()
+    assert result.checkpoints() == expected.checkpoints()
+    assert bool(result.errors()) == (not new_header)
+
+# v-- a sentence which exhausts its [--sentence-timeout] budget (cf. [SentenceWatchdog]) is reported
+#     and skipped - undoing any change it made to the context - and the rest of the file is linted
+#     as if the sentence weren't there; the previous [SIGALRM] handler and timer are then restored
+WATCHDOG_TEXT = '\n'.join([
+    'Section s.',
+    '  Lemma slow : True.',
+    '  Check b ' + 'a' * 40 + '.',
+    '  Set Nested Proofs Allowed.',
+    '  Definition c := 1.',
+    'End s.',
+    'Lemma x : True.',
+    'Proof. auto. Qed.',
+    'Set Printing All.',
+]) + '\n'
+
+@pytest.fixture
+def alarm_sentinel():
+    def sentinel(signum, frame): pass
+    previous_handler = signal.signal(signal.SIGALRM, sentinel)
+    signal.setitimer(signal.ITIMER_REAL, 1000)
+    yield sentinel
+    signal.setitimer(signal.ITIMER_REAL, 0)
+    signal.signal(signal.SIGALRM, previous_handler)
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_sentence_timeout(monkeypatch, alarm_sentinel, jobs):
+    monkeypatch.setattr(linter, 'PARALLEL_LINT_THRESHOLD', 0)
+    # v-- NOTE: [(a+)+b] backtracks catastrophically over [a...a.]
+    session = CoqLinter(mk_policy(mk_allow_deny_policy(
+        deny_list=[
+            (re.compile(r'\s*Check b (a+)+b'), err_fmt_prohibited_use_of_from),
+            (SentenceMatchers.SET, err_fmt_prohibited_use_of_from),
+        ],
+        allow_list=[re.compile(r'.')],
+    ))).session()
+
+    # v-- the [Lemma] enters a proof context, then stalls (and so must leave the context again)
+    try_handle_ctx_entry = LintSession.try_handle_ctx_entry
+    def slow_try_handle_ctx_entry(self, sentence, starting_lineno, ending_lineno):
+        handled = try_handle_ctx_entry(self, sentence, starting_lineno, ending_lineno)
+        if handled and starting_lineno == 2: time.sleep(10)
+        return handled
+    monkeypatch.setattr(LintSession, 'try_handle_ctx_entry', slow_try_handle_ctx_entry)
+
+    errors = lint_text(session, WATCHDOG_TEXT, jobs=jobs, sentence_timeout=0.2)
+    assert [(error.starting_lineno, error.err_fmt) for error in errors if error.err_fmt is err_fmt_sentence_timeout] == [
+        (2, err_fmt_sentence_timeout),
+        (3, err_fmt_sentence_timeout),
+    ]
+
+    monkeypatch.setattr(LintSession, 'try_handle_ctx_entry', try_handle_ctx_entry)
+    expected_text = WATCHDOG_TEXT.replace('Lemma slow : True.', '').replace('Check b', 'Check d')
+    expected = lint_text(session, expected_text, jobs=jobs, sentence_timeout=0)
+    assert [error for error in errors if error.err_fmt is not err_fmt_sentence_timeout] == expected
+    assert [error.starting_lineno for error in expected] == [4, 9]
+
+    assert signal.getsignal(signal.SIGALRM) is alarm_sentinel
+    assert 900 < signal.getitimer(signal.ITIMER_REAL)[0] <= 1000
@@ -0,0 +1,89 @@
+# Copyright (c) 2023 BlueRock Security, Inc.
+import argparse
+import random
+import re
+from pathlib import Path
+import pytest
+import coq_corpus_gen
+import coq_regexes
+import reference_regexes
+from coq_sentence_parser import SentenceParser, SourceBuffer
+
+TESTS_DIR = Path(__file__).resolve().parent
+
+# v-- sentences which the fixtures and the generated corpus don't cover
+EXTRA_SENTENCES = [
+    '#[local] Hint Resolve foo : core.', '#[global] Instance x : Y := {}.', '#[program] Definition x := 1.',
+    '#[local,program] Definition x := 1.', '#[export,local] Hint Unfold x : core.', '#[local] Existing Instance foo.',
+    '#[only(foo)] Derive bar.', '#[only(foo),\n  local] Derive bar for baz.', 'Local Set Foo.', 'Local Open Scope Z.',
+    'Lemma foo_ok : denote_module M |-- bar_spec.', 'Lemma x (y:=1) : True.', 'Theorem x: True.', 'Polymorphic Lemma x : True.',
+    'Lemma x :\n  forall y : nat,\n    y = y.', 'Instance : Foo.', 'Instance x : C <a := 1>.', 'Global Instance x : Y.',
+    'Program Instance x : Y.', 'Proof. auto. Qed.', 'Proof using Type*.', 'Next Obligation.', 'Admit Obligations.',
+    'Module Type X := Y.', 'Equations f (n : nat) : nat := f 0 := 0.', 'From A Require Import\n  B.', 'Require Export a.b.',
+    'From A Require Export b.', 'Include Foo.', 'From elpi Extra Dependency "x.elpi".', 'derive foo.',
+    '#[only(foo)] derive bar.', '#[only(foo),\n  local] derive bar for baz.', 'Close Scope Z.', 'Local Close Scope Z.',
+    '#[local] Set BR Work Timeout 10.', 'Local Notation x := y.', '#[local] NES.Open foo.', 'Context {A : Type}.',
+    'Specify foo.', 'Local Fixpoint f n := n.', 'Inductive t := A | B.', 'Variant t := A.', 'Ltac foo := idtac.',
+    'Ltac foo ::= idtac.', 'Implicit Types x : nat.', 'Goal True.', '#[local] Goal forall x, x = x.',
+    'Instance x : Y := {| a := 1 |}.', 'Lemma foo_ok :\n  denote_module M |-- foo_spec.',
+]
+# v-- the tokens of the fuzzed sentences
+ATOMS = [
+    'x', ':', ':=', '(', ')', '[', ']', '#[', 'local', 'program', 'only(', '|', '.', '\n', ' ', 'Lemma',
+    'Instance', 'Program', 'Proof', 'Qed', 'Next Obligation', 'Definition', 'From', 'Require', 'Import',
+]
+
+# v-- the contents of the [.v] fixtures followed by those of [files] generated files (cf. [coq_corpus_gen])
+def corpus_texts(files=4, file_kb=16):
+    args = argparse.Namespace(
+        seed=0,
+        comment_density=0.1,
+        max_comment_depth=3,
+        string_density=0.2,
+        sentence_words=6,
+        proof_length=10,
+        obligations=3,
+        max_nesting_depth=3,
+        mix=coq_corpus_gen.parse_mix(coq_corpus_gen.DEFAULT_MIX),
+    )
+    texts = [path.read_text(encoding='UTF-8') for path in sorted(TESTS_DIR.glob('*.v'))]
+    texts += [coq_corpus_gen.mk_file(args, i, file_kb * 1024) for i in range(files)]
+    return texts
+
+def corpus_sentences():
+    buffers = [SourceBuffer.from_text(text) for text in corpus_texts()]
+
+    sentences = list(EXTRA_SENTENCES)
+    for buffer in buffers:
+        parser = SentenceParser(buffer)
+        while (sentence := parser.get_next_sentence()) is not None:
+            sentences.append(sentence.text())
+
+    rng = random.Random(0)
+    for _ in range(2000):
+        sentences.append(''.join(rng.choice(ATOMS) + rng.choice(['', ' ']) for _ in range(rng.randint(1, 12))) + '.')
+    return sentences
+
+SENTENCES = corpus_sentences()
+
+@pytest.mark.parametrize('name', [
+    name for name, matcher in vars(reference_regexes.SentenceMatchers).items()
+    if isinstance(matcher, re.Pattern)
+])
+def test_matcher_equivalence(name):
+    reference = getattr(reference_regexes.SentenceMatchers, name)
+    matcher = getattr(coq_regexes.SentenceMatchers, name)
+    for sentence in SENTENCES:
+        reference_match = reference.match(sentence)
+        match = matcher.match(sentence)
+        assert (reference_match is None) == (match is None), sentence
+        if match:
+            assert reference_match.groupdict() == match.groupdict(), sentence
+
+# v-- [MENTIONS_PROGRAM] replaces [re.findall(DEFINITELY_PROGRAM, ...)] (cf. [is_interactive_sentence])
+def test_mentions_program():
+    for sentence in SENTENCES:
+        assert (
+            bool(re.findall(reference_regexes.FRAGMENTS.DEFINITELY_PROGRAM, sentence))
+            == bool(coq_regexes.SentenceMatchers.MENTIONS_PROGRAM.search(sentence))
+        ), sentence
@@ -0,0 +1,39 @@
+# Copyright (c) 2023 BlueRock Security, Inc.
+import pytest
+from coq_lint import COQ_LINTERS, GENERIC_COQ_LINTER_COMMON
+from coq_policy import ALLOW, DENY, MATCHER_STATS
+from linter import CTX_SUBPOLICIES, TOPLEVEL_CTX
+from test_matchers import SENTENCES
+
+LINTERS = dict(COQ_LINTERS, common=GENERIC_COQ_LINTER_COMMON)
+
+# The [(verdict, err_fmt)] of [text] in context [ctx] (or [None] if it is unrecognized), found by
+# walking the lists of [policy] as [check_policy_aux] did before it used [DecisionTable]s.
+def reference_decision(policy, ctx, text):
+    subpolicies = [policy[CTX_SUBPOLICIES[ctx]]] if ctx != TOPLEVEL_CTX else []
+    subpolicies.append(policy[CTX_SUBPOLICIES[TOPLEVEL_CTX]])
+
+    for subpolicy in subpolicies:
+        for allow in subpolicy['eager_allow_list']:
+            if allow.match(text): return (ALLOW, None)
+    for subpolicy in subpolicies:
+        for disallow, err_fmt in subpolicy['deny_list']:
+            if disallow.match(text): return (DENY, err_fmt)
+    for subpolicy in subpolicies:
+        for allow in subpolicy['allow_list']:
+            if allow.match(text): return (ALLOW, None)
+    return None
+
+# v-- [MATCHER_STATS] tries the rules one at a time rather than with the combined regexes
+@pytest.mark.parametrize('matcher_stats', [False, True])
+@pytest.mark.parametrize('linter_nm', sorted(LINTERS))
+def test_decision_table(monkeypatch, linter_nm, matcher_stats):
+    monkeypatch.setattr(MATCHER_STATS, 'enabled', matcher_stats)
+    compiled_policy = LINTERS[linter_nm].compiled_policy()
+    session = LINTERS[linter_nm].session()
+    for ctx in CTX_SUBPOLICIES:
+        decision_table = compiled_policy.decision_table(ctx)
+        for text in SENTENCES:
+            rule = session.classify(text).decide(ctx, decision_table)
+            decision = None if rule is None else rule[1:]
+            assert decision == reference_decision(compiled_policy.policy(), ctx, text), (ctx, text)
@@ -0,0 +1,165 @@
+# Copyright (c) 2023 BlueRock Security, Inc.
+import os
+import zlib
+import pytest
+import coq_sentence_cache
+from coq_sentence_cache import SPAN_CACHE_MAGIC, ReplayingSentenceParser, RecordingSentenceParser, SpanCache
+from coq_sentence_parser import NOLINT_REGION_BEGIN_AFTER, NOLINT_REGION_END, NOLINT_SENTENCE, SentenceParser, SourceBuffer
+from test_coq_lint import TESTS_DIR, run_coq_lint
+
+# v-- comments (nested or not) and [[NOLINT]] markers before, within and after sentences
+MARKERS_TEXT = '\n'.join([
+    '(* (* nested *) [[NOLINT]] *) Set Printing All.',
+    'Lemma x : True. (* [[NOLINT-BEGIN]] *)',
+    'Proof. (* a *) auto. (* b (* c *) *) Qed.',
+    '(* [[NOLINT-END]] *) Definition y (* [[NOLINT]] *) := 1.',
+    'Goal True. (* trailing *)',
+])
+
+TEXTS = [MARKERS_TEXT] + [path.read_text() for path in sorted(TESTS_DIR.glob('*.v'))]
+
+# v-- the [(span, resume)] pairs of [sentence_parser] (from its current offset)
+def stream(sentence_parser):
+    recorded = []
+    while True:
+        span = sentence_parser.get_next_span()
+        if not span: return recorded
+        recorded.append((span, sentence_parser.offset()))
+
+# v-- a replayed span stream is the one lexed from the buffer (including its comments and flags)
+@pytest.mark.parametrize('text', TEXTS)
+def test_round_trip(tmp_path, text):
+    span_cache = SpanCache(str(tmp_path))
+    buffer = SourceBuffer.from_text(text)
+    expected = stream(SentenceParser(buffer))
+
+    recording_parser = span_cache.parser_for(buffer)
+    assert isinstance(recording_parser, RecordingSentenceParser)
+    assert stream(recording_parser) == expected
+
+    replaying_parser = span_cache.parser_for(buffer)
+    assert isinstance(replaying_parser, ReplayingSentenceParser)
+    assert stream(replaying_parser) == expected
+    assert replaying_parser.offset() == len(buffer.data())
+    assert (span_cache.hits, span_cache.misses) == (1, 1)
+
+def test_round_trip_flags(tmp_path):
+    span_cache = SpanCache(str(tmp_path))
+    buffer = SourceBuffer.from_text(MARKERS_TEXT)
+    stream(span_cache.parser_for(buffer))
+    spans = [span for span, _ in stream(span_cache.parser_for(buffer))]
+
+    assert [nested_comment for _, _, _, _, nested_comment, _ in spans] == [True, False, False, True, False, False, False]
+    assert [nolint for _, _, _, _, _, nolint in spans] == [
+        NOLINT_SENTENCE,
+        NOLINT_REGION_BEGIN_AFTER,
+        0, 0, 0,
+        NOLINT_SENTENCE | NOLINT_REGION_END,
+        0,
+    ]
+    assert [len(comments) for _, _, _, comments, _, _ in spans] == [1, 1, 1, 1, 0, 2, 1]
+
+# v-- a replaying parser resumes from any sentence boundary, as a lexing one does
+def test_replaying_seek(tmp_path):
+    span_cache = SpanCache(str(tmp_path))
+    buffer = SourceBuffer.from_text(MARKERS_TEXT)
+    expected = stream(SentenceParser(buffer))
+    stream(span_cache.parser_for(buffer))
+
+    replaying_parser = span_cache.parser_for(buffer)
+    for offset in [0] + [resume for _, resume in expected]:
+        replaying_parser.seek(offset)
+        lexing_parser = SentenceParser(buffer)
+        lexing_parser.seek(offset)
+        assert stream(replaying_parser) == stream(lexing_parser)
+
+# v-- only the streams lexed from the beginning (to the end) are recorded
+def test_recording_stops_after_seek(tmp_path):
+    span_cache = SpanCache(str(tmp_path))
+    buffer = SourceBuffer.from_text(MARKERS_TEXT)
+    resume = stream(SentenceParser(buffer))[0][1]
+
+    recording_parser = span_cache.parser_for(buffer)
+    recording_parser.get_next_span()
+    recording_parser.seek(resume)
+    stream(recording_parser)
+    assert span_cache.get(SpanCache.key_for(buffer)) is None
+
+    recording_parser = span_cache.parser_for(buffer)
+    recording_parser.get_next_span()
+    assert span_cache.get(SpanCache.key_for(buffer)) is None
+    assert isinstance(span_cache.parser_for(buffer), RecordingSentenceParser)
+
+# v-- a truncated or corrupt entry is a miss (and is then overwritten by a complete one)
+@pytest.mark.parametrize('corrupt', [
+    lambda contents: contents[:len(contents) // 2],
+    lambda contents: contents[:len(SPAN_CACHE_MAGIC)],
+    lambda contents: b'garbage' + contents,
+    lambda contents: SPAN_CACHE_MAGIC + b'not zlib',
+    # v-- a valid stream which claims more spans than it has
+    lambda contents: SPAN_CACHE_MAGIC + zlib.compress((1000).to_bytes(8, 'little')),
+])
+def test_corrupt_entry(tmp_path, corrupt):
+    span_cache = SpanCache(str(tmp_path))
+    buffer = SourceBuffer.from_text(MARKERS_TEXT)
+    expected = stream(SentenceParser(buffer))
+    stream(span_cache.parser_for(buffer))
+
+    path = span_cache._path_for(SpanCache.key_for(buffer))
+    with open(path, 'rb') as f:
+        contents = f.read()
+    with open(path, 'wb') as f:
+        f.write(corrupt(contents))
+
+    assert span_cache.get(SpanCache.key_for(buffer)) is None
+    recording_parser = span_cache.parser_for(buffer)
+    assert isinstance(recording_parser, RecordingSentenceParser)
+    assert stream(recording_parser) == expected
+    assert stream(span_cache.parser_for(buffer)) == expected
+
+# v-- once the cache grows past [max_bytes], the least recently used entries are evicted
+def test_eviction(tmp_path):
+    texts = [f'Definition x{i} := {i}.\n' * (i + 1) for i in range(20)]
+    entry_size = len(SPAN_CACHE_MAGIC) + 64
+    span_cache = SpanCache(str(tmp_path), max_bytes=10 * entry_size)
+
+    keys = []
+    for i, text in enumerate(texts):
+        buffer = SourceBuffer.from_text(text)
+        stream(span_cache.parser_for(buffer))
+        keys.append(SpanCache.key_for(buffer))
+        # v-- NOTE: the modification time of an entry records its last use
+        os.utime(span_cache._path_for(keys[-1]), (i, i))
+
+    sizes = [os.path.getsize(path) for _, _, path in span_cache._entries()]
+    assert sum(sizes) <= 10 * entry_size
+    # v-- the most recently used entries survive
+    assert span_cache.get(keys[-1]) is not None
+    assert span_cache.get(keys[0]) is None
+
+# v-- a change to the lexer (cf. [PARSER_VERSION]) invalidates every entry
+def test_parser_version(tmp_path, monkeypatch):
+    span_cache = SpanCache(str(tmp_path))
+    buffer = SourceBuffer.from_text(MARKERS_TEXT)
+    stream(span_cache.parser_for(buffer))
+    key = SpanCache.key_for(buffer)
+    assert isinstance(span_cache.parser_for(buffer), ReplayingSentenceParser)
+
+    monkeypatch.setattr(coq_sentence_cache, 'PARSER_VERSION', coq_sentence_cache.PARSER_VERSION + 1)
+    assert SpanCache.key_for(buffer) != key
+    assert isinstance(span_cache.parser_for(buffer), RecordingSentenceParser)
+
+# v-- [--sentence-cache] changes none of the output of [coq_lint.py]
+def test_sentence_cache_flag(tmp_path, capsys):
+    targets = [TESTS_DIR / 'simple_fail.v', TESTS_DIR / 'nolint_regions.v', TESTS_DIR / 'comment_test.v']
+    status = run_coq_lint('--use-ci-output-format', '--extra-code-proofs', *targets)
+    expected = capsys.readouterr().out
+
+    for _ in range(2):
+        assert run_coq_lint(
+            '--use-ci-output-format',
+            '--sentence-cache', tmp_path,
+            '--extra-code-proofs', *targets,
+        ) == status
+        assert capsys.readouterr().out == expected
+    assert len(SpanCache(str(tmp_path))._entries()) == len(targets)
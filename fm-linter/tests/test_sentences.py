@@ -0,0 +1,31 @@
+# Copyright (c) 2023 BlueRock Security, Inc.
+from pathlib import Path
+from coq_lint import GENERIC_COQ_LINTER_COMMON
+from linter_util import render_error
+
+TESTS_DIR = Path(__file__).resolve().parent
+
+# v-- the lines of a reported multi-line sentence keep their (relative) indentation
+def test_indented_sentence():
+    errors = GENERIC_COQ_LINTER_COMMON.run(open(TESTS_DIR / 'indented_sentence.v'))
+    assert [(error.starting_lineno, error.ending_lineno) for error in errors] == [(8, 9)]
+    assert render_error(errors[0], plain=True).splitlines()[1:] == [
+        '|  From Coq Require Import',
+        '|    ZArith.',
+    ]
+
+# v-- a file which is [mmap]ed to be linted is unmapped afterwards
+def test_mmaped_buffer_is_closed(monkeypatch):
+    import coq_sentence_parser
+    from coq_sentence_parser import SourceBuffer
+
+    buffers = []
+    from_file = SourceBuffer.from_file
+    def recording_from_file(f):
+        buffers.append(from_file(f))
+        return buffers[-1]
+
+    monkeypatch.setattr(coq_sentence_parser, 'MMAP_THRESHOLD', 0)
+    monkeypatch.setattr(SourceBuffer, 'from_file', recording_from_file)
+    GENERIC_COQ_LINTER_COMMON.run(open(TESTS_DIR / 'simple_pass.v'))
+    assert [buffer.data().closed for buffer in buffers] == [True]
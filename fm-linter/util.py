@@ -3,6 +3,8 @@
 # Copyright (c) 2023 BlueRock Security, Inc.
 
 from pathlib import Path
+import re
+import subprocess
 from os import listdir
 from os.path import abspath, isabs, isdir, join
 
@@ -16,6 +18,10 @@ ANSI_MAGENTA  = f'{ANSI_ESCAPE}[95m'
 def format_ansi_msg(msg, ANSI_CODE):
     return f'{ANSI_CODE}{msg}{ANSI_ENDC}'
 
+# v-- the SGR (i.e. colour) and hyperlink (cf. [format_hyperlink]) escape sequences
+ANSI_ESCAPES = re.compile(r'\033(\[[0-9;]*m|\]8;[^\033]*\033\\)')
+def strip_ansi(text): return ANSI_ESCAPES.sub('', text)
+
 # v-- cf. https://gist.github.com/egmontkob/eb114294efbcd5adb1944c9f3cb5feda
 def format_hyperlink(hyperlink_open_uri, msg, no_hyperlinks=False):
     if no_hyperlinks: return msg
@@ -175,3 +181,48 @@ def enumerate_coq_file_hierarchy(resolved_dirpath):
             hierarchy['<UNRECOGNIZED>'].add(resolved_coq_filepath)
 
     return hierarchy
+
+# v-- the output of [git *args] within [cwd] (raising a [RuntimeError] if git fails)
+def run_git(cwd, *args):
+    try:
+        completed = subprocess.run(['git', *args], cwd=cwd, capture_output=True, text=True)
+    except OSError as e:
+        completed = None
+        stderr = str(e)
+    else:
+        stderr = completed.stderr.strip()
+    if completed is None or completed.returncode != 0:
+        msg = ' '.join([
+            format_ansi_msg('Error:', ANSI_RED),
+            f'[git {" ".join(args)}] failed within {cwd}: {stderr}',
+        ])
+        raise RuntimeError(msg)
+    return completed.stdout
+
+# The resolved [.v] files within [resolved_targets] (files or directories) which were added or
+# modified since [rev] according to the local git repositories of the targets.
+#
+# NOTES:
+# - the working tree is compared against the merge base of [rev] and [HEAD], so the changes which
+#   [rev] gained since the branch forked off aren't included (as in a merge request); untracked
+#   files count as added
+# - a file which was only renamed (i.e. whose contents are unchanged) doesn't count, but a renamed
+#   file which was also edited counts as added (and a deleted file can't be linted)
+# - no remote is contacted, so [rev] must already be known locally (i.e. [origin/main])
+def changed_coq_files(rev, resolved_targets):
+    # v-- [repository root -> targets]
+    repositories = {}
+    for resolved_target in resolved_targets:
+        cwd = resolved_target if resolved_target.is_dir() else resolved_target.parent
+        toplevel = run_git(cwd, 'rev-parse', '--show-toplevel').rstrip('\n')
+        repositories.setdefault(toplevel, []).append(str(resolved_target))
+
+    changed = set()
+    for toplevel, pathspecs in repositories.items():
+        merge_base = run_git(toplevel, 'merge-base', rev, 'HEAD').strip()
+        names = run_git(
+            toplevel, 'diff', '--name-only', '--find-renames=100%', '--diff-filter=AM', '-z', merge_base, '--', *pathspecs,
+        ).split('\0')
+        names += run_git(toplevel, 'ls-files', '--others', '--exclude-standard', '-z', '--', *pathspecs).split('\0')
+        changed.update(Path(toplevel, name).resolve() for name in names if name.endswith('.v'))
+    return changed